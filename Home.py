@@ -9,9 +9,11 @@ import os
 # Add utils directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
 
-from yfinance_util import IPODataFetcher, format_market_cap, format_percentage
+from yfinance_util import format_market_cap, format_percentage
 from database import IPODatabase
-from enhanced_global_loader import load_comprehensive_global_ipo_data
+from refresh_service import request_refresh
+from refresh_coordinator import RefreshCoordinator
+from refresh_planner import RefreshPlanner
 from ai_commentary import get_ipo_commentary
 from ipo_news import get_ipo_news
 from enhanced_regional_mapping import (
@@ -19,9 +21,7 @@ from enhanced_regional_mapping import (
     get_countries_by_region, get_exchanges_by_region
 )
 from db_util import (
-    remote_db_available, init_remote_database,
-    get_ipo_data_remote, insert_ipo_records_remote,
-    log_refresh_remote, get_last_refresh_remote,
+    remote_db_available, get_ipo_data_remote, get_last_refresh_remote,
     insert_signup_email_remote
 )
 
@@ -77,14 +77,12 @@ if 'data_loaded' not in st.session_state:
 if 'ipo_data' not in st.session_state:
     st.session_state.ipo_data = pd.DataFrame()
 
-# Initialize database and data fetcher
+# Initialize database; data fetching runs in the refresh service
 @st.cache_resource
 def init_components():
-    db = IPODatabase()
-    fetcher = IPODataFetcher()
-    return db, fetcher
+    return IPODatabase()
 
-db, fetcher = init_components()
+db = init_components()
 
 # Main header
 st.markdown('<div class="main-header">IPO Map - Global Market Heatmap</div>', unsafe_allow_html=True)
@@ -97,77 +95,24 @@ with st.sidebar:
     selected_timeframe = "Last 3 years"
     years_to_include = [current_year, current_year - 1, current_year - 2]
 
-    # Data refresh button
+    # Data refresh button; ingestion runs in a background refresh_service process
     if st.button("🔄 Refresh IPO Data", type="primary"):
-        with st.spinner("Fetching global IPO data from market sources..."):
-            try:
-                # Log refresh start
-                refresh_start = datetime.now().isoformat()
-                
-                # Load comprehensive global IPO data from all regions
-                records_loaded = load_comprehensive_global_ipo_data(max_per_region=100)
-                
-                # Also fetch some real US data for recent years
-                all_ipo_records = []
-                for year in years_to_include[-2:]:  # Last 2 years only for real data
-                    year_records = fetcher.get_nasdaq_nyse_ipos(year=year)
-                    if year_records:
-                        all_ipo_records.extend(year_records)
-                
-                ipo_records = all_ipo_records
-                
-                # Log refresh and store to remote DB if available, otherwise local
-                if remote_db_available():
-                    init_remote_database()
-                    if ipo_records:
-                        insert_ipo_records_remote(ipo_records)
-                    log_refresh_remote(
-                        refresh_type="GLOBAL_IPO_DATA_REFRESH",
-                        status="SUCCESS",
-                        records_processed=records_loaded + len(ipo_records),
-                        started_at=refresh_start
-                    )
-                else:
-                    db.log_refresh(
-                        refresh_type="GLOBAL_IPO_DATA_REFRESH",
-                        status="SUCCESS",
-                        records_processed=records_loaded,
-                        started_at=refresh_start
-                    )
-                
-                if ipo_records:
-                    if remote_db_available():
-                        st.success(f"✅ Loaded {records_loaded} global IPOs + {len(ipo_records)} recent US IPOs to remote DB!")
-                    else:
-                        records_inserted = db.insert_ipo_data(ipo_records)
-                        st.success(f"✅ Successfully loaded {records_loaded} global IPO records + {records_inserted} recent US IPOs!")
-                else:
-                    st.success(f"✅ Successfully loaded {records_loaded} global IPO records!")
-                
-                st.session_state.data_loaded = True
-                
-                # Force rerun to update the display
-                st.rerun()
-                    
-            except Exception as e:
-                error_msg = str(e)
-                st.error(f"❌ Error refreshing data: {error_msg}")
-                if remote_db_available():
-                    log_refresh_remote(
-                        refresh_type="GLOBAL_IPO_DATA_REFRESH",
-                        status="ERROR",
-                        records_processed=0,
-                        error_message=error_msg,
-                        started_at=refresh_start
-                    )
-                else:
-                    db.log_refresh(
-                        refresh_type="GLOBAL_IPO_DATA_REFRESH",
-                        status="ERROR",
-                        records_processed=0,
-                        error_message=error_msg,
-                        started_at=refresh_start
-                    )
+        try:
+            refresh = request_refresh("full")
+            if refresh['status'] == 'started':
+                st.success("✅ Refresh started in the background. New data appears once it finishes.")
+        except Exception as e:
+            st.error(f"❌ Error starting refresh: {str(e)}")
+
+    # Any click while a refresh runs attaches to it instead of starting another
+    running_refresh = RefreshCoordinator().current("full")
+    if running_refresh:
+        committed = running_refresh['progress'].get('records_committed')
+        hosts = running_refresh['progress'].get('concurrency', {}).values()
+        st.info(f"⏳ Refresh running since {running_refresh['started_at'][11:16]}"
+                + (f", {committed} records saved so far" if committed is not None else "")
+                + "".join(f" · {stats['concurrency']} concurrent requests, "
+                          f"{stats['recent_error_rate']:.0%} errors" for stats in hosts))
 
     # Email sign-up
     st.markdown("---")
@@ -301,6 +246,12 @@ if not df.empty:
         (df['sector'].isin(selected_sectors))
     ]
     
+    # Tell the background refresh which tickers are on screen so they are quoted first
+    visible_tickers = frozenset(filtered_df['ticker'])
+    if st.session_state.get('visible_tickers') != visible_tickers:
+        RefreshPlanner().mark_visible(visible_tickers)
+        st.session_state.visible_tickers = visible_tickers
+    
     # Check if filtered data is available
     if filtered_df.empty:
         st.warning("⚠️ No data matches the selected filters. Please adjust your filter criteria.")
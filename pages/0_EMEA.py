@@ -10,7 +10,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 from yfinance_util import IPODataFetcher, format_market_cap, format_percentage
 from database import IPODatabase
-from enhanced_global_loader import load_comprehensive_global_ipo_data
+from refresh_service import request_refresh
+from refresh_coordinator import RefreshCoordinator
 from enhanced_regional_mapping import add_regional_data
 
 REGION = 'EMEA'
@@ -41,31 +42,22 @@ with st.sidebar:
     years_to_include = [current_year, current_year - 1, current_year - 2]
 
     if st.button("🔄 Refresh Global IPO Data", type="primary"):
-        with st.spinner("Fetching global IPO data..."):
-            try:
-                refresh_start = datetime.now().isoformat()
-                records_loaded = load_comprehensive_global_ipo_data(max_per_region=100)
-
-                # Also fetch some recent US data for completeness
-                all_ipo_records = []
-                for year in years_to_include[-2:]:
-                    year_records = fetcher.get_nasdaq_nyse_ipos(year=year)
-                    if year_records:
-                        all_ipo_records.extend(year_records)
-
-                db.log_refresh(
-                    refresh_type="GLOBAL_IPO_DATA_REFRESH",
-                    status="SUCCESS",
-                    records_processed=records_loaded + len(all_ipo_records),
-                    started_at=refresh_start
-                )
-
-                if all_ipo_records:
-                    db.insert_ipo_data(all_ipo_records)
-                st.success(f"✅ Loaded global data. Use the main page refresh if needed.")
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Error refreshing data: {str(e)}")
+        try:
+            refresh = request_refresh("full")
+            if refresh['status'] == 'started':
+                st.success("✅ Refresh started in the background. New data appears once it finishes.")
+        except Exception as e:
+            st.error(f"❌ Error starting refresh: {str(e)}")
+
+    # Any click while a refresh runs attaches to it instead of starting another
+    running_refresh = RefreshCoordinator().current("full")
+    if running_refresh:
+        committed = running_refresh['progress'].get('records_committed')
+        hosts = running_refresh['progress'].get('concurrency', {}).values()
+        st.info(f"⏳ Refresh running since {running_refresh['started_at'][11:16]}"
+                + (f", {committed} records saved so far" if committed is not None else "")
+                + "".join(f" · {stats['concurrency']} concurrent requests, "
+                          f"{stats['recent_error_rate']:.0%} errors" for stats in hosts))
 
 @st.cache_data
 def load_ipo_data(years):
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the recent IPO refresh in IPODataFetcher
+
+Replays recorded Yahoo Finance responses with a fixed per-request latency and
+compares the old per-year, per-ticker refresh against the batched
+get_recent_ipos_by_year path.
+
+Usage:
+    python playground/benchmark_us_refresh.py --record     # capture fixtures (needs network)
+    python playground/benchmark_us_refresh.py              # replay and time both paths
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+import yfinance_util
+import ipo_anchor
+from yfinance_util import IPODataFetcher, RECENT_IPO_TICKERS
+from fetch_engine import YAHOO_HOST, get_fetch_engine
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'us_refresh')
+HISTORY_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _fixture_path(ticker):
+    return os.path.join(FIXTURE_DIR, f"{ticker}.json")
+
+
+def record_fixtures():
+    """Capture info and 1y history for every ticker from Yahoo Finance"""
+    import yfinance as yf
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    recorded = 0
+    for ticker in RECENT_IPO_TICKERS:
+        try:
+            stock = yf.Ticker(ticker)
+            hist = stock.history(period="1y")
+            fixture = {
+                'info': {k: v for k, v in stock.info.items() if isinstance(v, (str, int, float, bool))},
+                'history': {
+                    'index': [ts.isoformat() for ts in hist.index],
+                    **{field: hist[field].tolist() for field in HISTORY_FIELDS if field in hist}
+                }
+            }
+            with open(_fixture_path(ticker), 'w') as f:
+                json.dump(fixture, f)
+            recorded += 1
+            print(f"  recorded {ticker} ({len(hist)} bars)")
+        except Exception as e:
+            print(f"  failed to record {ticker}: {e}")
+    print(f"Recorded {recorded} fixtures to {FIXTURE_DIR}")
+
+
+def load_fixtures():
+    fixtures = {}
+    for ticker in RECENT_IPO_TICKERS:
+        path = _fixture_path(ticker)
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            raw = json.load(f)
+        hist = raw['history']
+        index = pd.DatetimeIndex([datetime.fromisoformat(ts) for ts in hist['index']])
+        frame = pd.DataFrame({field: hist.get(field, []) for field in HISTORY_FIELDS}, index=index)
+        fixtures[ticker] = {'info': raw['info'], 'history': frame}
+    return fixtures
+
+
+class ReplayYF:
+    """Minimal stand-in for the yfinance module serving recorded fixtures"""
+
+    def __init__(self, fixtures, latency):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.requests = 0
+
+    def _wait(self):
+        self.requests += 1
+        time.sleep(self.latency)
+
+    def Ticker(self, ticker, session=None):
+        replay = self
+
+        class _Ticker:
+            @property
+            def info(self):
+                replay._wait()
+                return dict(replay.fixtures.get(ticker, {}).get('info', {}))
+
+            def history(self, period=None, start=None, end=None, **kwargs):
+                replay._wait()
+                fixture = replay.fixtures.get(ticker)
+                if not fixture:
+                    return pd.DataFrame(columns=HISTORY_FIELDS)
+                hist = fixture['history']
+                if start:
+                    hist = hist[(hist.index >= pd.Timestamp(start)) & (hist.index < pd.Timestamp(end))]
+                return hist.copy()
+
+            def get_history_metadata(self):
+                replay._wait()
+                fixture = replay.fixtures.get(ticker)
+                return {'firstTradeDate': fixture['history'].index[0] if fixture else None}
+
+        return _Ticker()
+
+    def download(self, tickers, period=None, group_by='column', **kwargs):
+        self._wait()
+        frames = {t: self.fixtures[t]['history'] for t in tickers if t in self.fixtures}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+
+def legacy_refresh(replay, years):
+    """Request pattern of the refresh before batching: every year re-fetches every ticker"""
+    records = 0
+    for year in years:
+        for ticker in RECENT_IPO_TICKERS:
+            stock = replay.Ticker(ticker)
+            info = stock.info
+            hist = stock.history(period="1y")
+            if len(hist) == 0 or hist.index[0].year != year:
+                continue
+            records += 1
+            time.sleep(0.1)  # Rate limiting
+    return records
+
+
+def batched_refresh(years, db_path):
+    fetcher = IPODataFetcher(db_path=db_path)
+    by_year = fetcher.get_recent_ipos_by_year(years)
+    return sum(len(records) for records in by_year.values())
+
+
+def run_benchmark(latency, rate=None):
+    fixtures = load_fixtures()
+    if not fixtures:
+        sys.exit(f"No fixtures found in {FIXTURE_DIR}; run with --record first")
+
+    current_year = datetime.now().year
+    years = [current_year - 1, current_year]
+
+    replay = ReplayYF(fixtures, latency)
+    start = time.perf_counter()
+    legacy_records = legacy_refresh(replay, years)
+    legacy_time = time.perf_counter() - start
+    legacy_requests = replay.requests
+
+    replay = ReplayYF(fixtures, latency)
+    yfinance_util.yf = replay
+    ipo_anchor.yf = replay
+    if rate:
+        get_fetch_engine().host_limits[YAHOO_HOST] = {'rate': rate, 'burst': int(rate * 2)}
+    db_path = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    start = time.perf_counter()
+    batched_records = batched_refresh(years, db_path)
+    batched_time = time.perf_counter() - start
+    cold_requests = replay.requests
+
+    # Second run against the same database: anchors and metadata are cached
+    start = time.perf_counter()
+    warm_records = batched_refresh(years, db_path)
+    warm_time = time.perf_counter() - start
+
+    print(f"Fixtures: {len(fixtures)} tickers, {latency * 1000:.0f} ms simulated latency, years {years}")
+    print(f"  before:      {legacy_time:6.2f}s  {legacy_requests:4d} requests  {legacy_records} records")
+    print(f"  after, cold: {batched_time:6.2f}s  {cold_requests:4d} requests  {batched_records} records")
+    print(f"  after, warm: {warm_time:6.2f}s  {replay.requests - cold_requests:4d} requests  {warm_records} records")
+    if warm_time > 0:
+        print(f"  warm speedup: {legacy_time / warm_time:.1f}x")
+
+    # A refresh that found nothing was not exercised, so its timing means nothing
+    if batched_records == 0 or warm_records == 0:
+        sys.exit("Batched refresh returned no records; the replay did not reach the fetch path")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--record', action='store_true', help='Record fixtures from Yahoo Finance')
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated seconds per request')
+    parser.add_argument('--rate', type=float, default=None, help='Override the Yahoo requests/sec allowance')
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures()
+    else:
+        run_benchmark(args.latency, args.rate)
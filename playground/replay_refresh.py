@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Record or replay the global refresh and IPO research pipelines
+
+Record once with network access, then replay offline to profile or
+regression-test the pipelines against the same provider responses.
+Each run uses a fresh temporary database so the price and metadata caches
+start empty and request the same calls that were recorded.
+
+Usage:
+    python playground/replay_refresh.py --mode record
+    python playground/replay_refresh.py --mode replay --latency 0.2 --error-rate 0.05
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from transport import configure_transport, DEFAULT_FIXTURE_DIR
+from enhanced_global_loader import load_comprehensive_global_ipo_data
+from yfinance_util import IPODataFetcher
+from ipo_research import IPOResearcher
+
+
+def run_pipelines(max_per_region):
+    db_path = os.path.join(tempfile.mkdtemp(), 'replay.db')
+    timings = {}
+
+    start = time.perf_counter()
+    global_records = load_comprehensive_global_ipo_data(max_per_region=max_per_region, db_path=db_path)
+    timings['global refresh'] = (time.perf_counter() - start, global_records)
+
+    start = time.perf_counter()
+    by_year = IPODataFetcher(db_path).get_recent_ipos_by_year([datetime.now().year - 1, datetime.now().year])
+    timings['recent US/EU refresh'] = (time.perf_counter() - start, sum(len(r) for r in by_year.values()))
+
+    start = time.perf_counter()
+    research = IPOResearcher().get_comprehensive_ipo_data()
+    timings['IPO research'] = (time.perf_counter() - start, research['summary']['total_upcoming_ipos'])
+
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', choices=['record', 'replay'], default='replay')
+    parser.add_argument('--fixture-dir', default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument('--latency', type=float, default=0.0, help='Injected seconds per replayed call')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of replayed calls that fail')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-per-region', type=int, default=30)
+    args = parser.parse_args()
+
+    configure_transport(args.mode, fixture_dir=args.fixture_dir, latency=args.latency,
+                        error_rate=args.error_rate, seed=args.seed)
+
+    print(f"Running pipelines in {args.mode} mode (fixtures: {args.fixture_dir})")
+    for name, (elapsed, count) in run_pipelines(args.max_per_region).items():
+        print(f"  {name:22s} {elapsed:7.2f}s  {count} records")
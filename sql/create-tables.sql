@@ -44,10 +44,13 @@ CREATE TABLE IF NOT EXISTS refresh_log (
     status VARCHAR,
     records_processed INTEGER,
     error_message TEXT,
+    skipped_tickers TEXT,
     started_at VARCHAR,
     completed_at VARCHAR
 );
 
+ALTER TABLE refresh_log ADD COLUMN IF NOT EXISTS skipped_tickers TEXT;
+
 CREATE TABLE IF NOT EXISTS sign_up (
     id SERIAL PRIMARY KEY,
     email VARCHAR NOT NULL UNIQUE,
@@ -1,6 +1,6 @@
 import sqlite3
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 from pathlib import Path
@@ -68,11 +68,41 @@ class IPODatabase:
                     status TEXT,
                     records_processed INTEGER,
                     error_message TEXT,
+                    skipped_tickers TEXT,
                     started_at TEXT,
                     completed_at TEXT
                 )
             ''')
             
+            # Add columns introduced after the table was first created
+            cursor.execute("PRAGMA table_info(refresh_log)")
+            refresh_log_columns = [row[1] for row in cursor.fetchall()]
+            if 'skipped_tickers' not in refresh_log_columns:
+                cursor.execute("ALTER TABLE refresh_log ADD COLUMN skipped_tickers TEXT")
+            
+            # Job keys committed by an in-progress refresh, so an interrupted run can resume
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS refresh_checkpoint (
+                    checkpoint_name TEXT NOT NULL,
+                    job_key TEXT NOT NULL,
+                    committed_at TEXT NOT NULL,
+                    PRIMARY KEY (checkpoint_name, job_key)
+                )
+            ''')
+
+            # One metrics row per ticker; older databases appended a row per run, keep the latest
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_performance_metrics_ticker'"
+            )
+            if cursor.fetchone() is None:
+                cursor.execute('''
+                    DELETE FROM performance_metrics
+                    WHERE id NOT IN (SELECT MAX(id) FROM performance_metrics GROUP BY ticker)
+                ''')
+                cursor.execute(
+                    'CREATE UNIQUE INDEX idx_performance_metrics_ticker ON performance_metrics (ticker)'
+                )
+
             # Create indexes for better performance
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_ticker ON ipo_data (ticker)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_sector ON ipo_data (sector)')
@@ -115,42 +145,79 @@ class IPODatabase:
             
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
-            
-            inserted_count = 0
-            for record in ipo_records:
-                try:
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO ipo_data 
-                        (ticker, company_name, sector, industry, exchange, country, region, ipo_date, 
-                         ipo_price, current_price, market_cap, price_change_since_ipo, 
-                         volume, last_updated)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        record['ticker'],
-                        record['company_name'],
-                        record['sector'],
-                        record['industry'],
-                        record['exchange'],
-                        record.get('country', 'Unknown'),
-                        record.get('region', 'Other'),
-                        record['ipo_date'],
-                        record['ipo_price'],
-                        record['current_price'],
-                        record['market_cap'],
-                        record['price_change_since_ipo'],
-                        record['volume'],
-                        record['last_updated']
-                    ))
-                    inserted_count += 1
-                except Exception as e:
-                    logger.error(f"Error inserting record for {record.get('ticker', 'unknown')}: {str(e)}")
-                    
+            inserted_count = self._write_ipo_rows(cursor, ipo_records)
             conn.commit()
             logger.info(f"Inserted/updated {inserted_count} IPO records")
             return inserted_count
-    
+
+    def insert_ipo_batch(self, ipo_records: List[Dict], checkpoint_name: str,
+                         checkpoint_keys: List[str]) -> int:
+        """
+        Insert a batch of IPO records and checkpoint their job keys in one transaction
+
+        An interrupted refresh can then resume by skipping every key returned
+        by get_checkpoint(checkpoint_name).
+        """
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            cursor = conn.cursor()
+            inserted_count = self._write_ipo_rows(cursor, ipo_records)
+            committed_at = datetime.now().isoformat()
+            cursor.executemany('''
+                INSERT OR REPLACE INTO refresh_checkpoint (checkpoint_name, job_key, committed_at)
+                VALUES (?, ?, ?)
+            ''', [(checkpoint_name, key, committed_at) for key in checkpoint_keys])
+            conn.commit()
+            return inserted_count
+
+    def _write_ipo_rows(self, cursor, ipo_records: List[Dict]) -> int:
+        inserted_count = 0
+        for record in ipo_records:
+            try:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO ipo_data
+                    (ticker, company_name, sector, industry, exchange, country, region, ipo_date,
+                     ipo_price, current_price, market_cap, price_change_since_ipo,
+                     volume, last_updated)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    record['ticker'],
+                    record['company_name'],
+                    record['sector'],
+                    record['industry'],
+                    record['exchange'],
+                    record.get('country', 'Unknown'),
+                    record.get('region', 'Other'),
+                    record['ipo_date'],
+                    record['ipo_price'],
+                    record['current_price'],
+                    record['market_cap'],
+                    record['price_change_since_ipo'],
+                    record['volume'],
+                    record['last_updated']
+                ))
+                inserted_count += 1
+            except Exception as e:
+                logger.error(f"Error inserting record for {record.get('ticker', 'unknown')}: {str(e)}")
+        return inserted_count
+
+    def get_checkpoint(self, checkpoint_name: str, max_age_hours: float = 24) -> set:
+        """Job keys committed by an unfinished run, ignoring checkpoints older than max_age_hours"""
+        cutoff = (datetime.now() - timedelta(hours=max_age_hours)).isoformat()
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute('''
+                SELECT job_key FROM refresh_checkpoint
+                WHERE checkpoint_name = ? AND committed_at >= ?
+            ''', (checkpoint_name, cutoff)).fetchall()
+        return {row[0] for row in rows}
+
+    def clear_checkpoint(self, checkpoint_name: str):
+        """Drop a run's checkpoint once it has finished"""
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.execute("DELETE FROM refresh_checkpoint WHERE checkpoint_name = ?", (checkpoint_name,))
+            conn.commit()
+
     def insert_performance_metrics(self, ticker: str, metrics: Dict) -> bool:
-        """Insert performance metrics for a ticker"""
+        """Insert or replace the performance metrics of a ticker"""
         if not metrics:
             return False
             
@@ -163,6 +230,15 @@ class IPODatabase:
                     (ticker, total_return, annualized_volatility, max_drawdown, 
                      days_since_ipo, high_52w, low_52w, avg_volume)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(ticker) DO UPDATE SET
+                        total_return = excluded.total_return,
+                        annualized_volatility = excluded.annualized_volatility,
+                        max_drawdown = excluded.max_drawdown,
+                        days_since_ipo = excluded.days_since_ipo,
+                        high_52w = excluded.high_52w,
+                        low_52w = excluded.low_52w,
+                        avg_volume = excluded.avg_volume,
+                        calculated_at = CURRENT_TIMESTAMP
                 ''', (
                     ticker,
                     metrics.get('total_return'),
@@ -179,7 +255,44 @@ class IPODatabase:
                 logger.error(f"Error inserting performance metrics for {ticker}: {str(e)}")
                 return False
     
-    def get_ipo_data(self, year: int = None, exchange: str = None, 
+    def insert_performance_metrics_bulk(self, rows: List[tuple], checkpoint_name: str = None) -> int:
+        """
+        Insert or replace performance metrics for many tickers in one statement
+
+        Each row is (ticker, total_return, annualized_volatility, max_drawdown,
+        days_since_ipo, high_52w, low_52w, avg_volume). With checkpoint_name the
+        tickers are checkpointed in the same transaction (see get_checkpoint).
+        """
+        if not rows:
+            return 0
+
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.executemany('''
+                INSERT INTO performance_metrics
+                (ticker, total_return, annualized_volatility, max_drawdown,
+                 days_since_ipo, high_52w, low_52w, avg_volume)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(ticker) DO UPDATE SET
+                    total_return = excluded.total_return,
+                    annualized_volatility = excluded.annualized_volatility,
+                    max_drawdown = excluded.max_drawdown,
+                    days_since_ipo = excluded.days_since_ipo,
+                    high_52w = excluded.high_52w,
+                    low_52w = excluded.low_52w,
+                    avg_volume = excluded.avg_volume,
+                    calculated_at = CURRENT_TIMESTAMP
+            ''', rows)
+            if checkpoint_name:
+                committed_at = datetime.now().isoformat()
+                conn.executemany('''
+                    INSERT OR REPLACE INTO refresh_checkpoint (checkpoint_name, job_key, committed_at)
+                    VALUES (?, ?, ?)
+                ''', [(checkpoint_name, row[0], committed_at) for row in rows])
+            conn.commit()
+        logger.info(f"Inserted performance metrics for {len(rows)} tickers")
+        return len(rows)
+
+    def get_ipo_data(self, year: int = None, exchange: str = None,
                      sector: str = None, limit: int = None) -> pd.DataFrame:
         """Retrieve IPO data with optional filters"""
         
@@ -310,7 +423,8 @@ class IPODatabase:
         return df
     
     def log_refresh(self, refresh_type: str, status: str, records_processed: int = 0, 
-                   error_message: str = None, started_at: str = None) -> int:
+                   error_message: str = None, started_at: str = None,
+                   skipped_tickers: str = None) -> int:
         """Log data refresh operations"""
         
         with sqlite3.connect(self.db_path) as conn:
@@ -318,13 +432,15 @@ class IPODatabase:
             
             cursor.execute('''
                 INSERT INTO refresh_log 
-                (refresh_type, status, records_processed, error_message, started_at, completed_at)
-                VALUES (?, ?, ?, ?, ?, ?)
+                (refresh_type, status, records_processed, error_message, skipped_tickers,
+                 started_at, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (
                 refresh_type,
                 status,
                 records_processed,
                 error_message,
+                skipped_tickers,
                 started_at or datetime.now().isoformat(),
                 datetime.now().isoformat()
             ))
@@ -333,17 +449,25 @@ class IPODatabase:
             conn.commit()
             return log_id
     
-    def get_last_refresh(self) -> Optional[Dict]:
-        """Get information about the last data refresh"""
+    def get_last_refresh(self, refresh_type: str = None, status: str = None) -> Optional[Dict]:
+        """Get information about the last data refresh, optionally of one refresh type and status"""
+        
+        query = "SELECT * FROM refresh_log"
+        conditions, params = [], []
+        if refresh_type:
+            conditions.append("refresh_type = ?")
+            params.append(refresh_type)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY completed_at DESC LIMIT 1"
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT * FROM refresh_log 
-                ORDER BY completed_at DESC 
-                LIMIT 1
-            ''')
+            cursor.execute(query, params)
             
             row = cursor.fetchone()
             if row:
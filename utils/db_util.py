@@ -66,6 +66,7 @@ refresh_log = Table(
     Column("status", String),
     Column("records_processed", Integer),
     Column("error_message", Text),
+    Column("skipped_tickers", Text),
     Column("started_at", String),
     Column("completed_at", String),
 )
@@ -84,10 +85,29 @@ def remote_db_available() -> bool:
     return engine is not None
 
 
+_local_engines: Dict[str, Engine] = {}
+
+
+def get_coordination_engine(db_path: str = "data/ipo_analytics.db") -> Engine:
+    """
+    Engine for tables that coordinate refreshes across processes and hosts
+
+    The remote database when one is configured, so every host shares the
+    same rows; otherwise the local SQLite file, which coordinates one host.
+    """
+    if remote_db_available():
+        return engine
+    if db_path not in _local_engines:
+        _local_engines[db_path] = create_engine(f"sqlite:///{db_path}", connect_args={'timeout': 30})
+    return _local_engines[db_path]
+
+
 def init_remote_database() -> None:
     if not remote_db_available():
         return
     metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE refresh_log ADD COLUMN IF NOT EXISTS skipped_tickers TEXT"))
 
 
 def insert_ipo_records_remote(records: List[Dict]) -> int:
@@ -152,7 +172,8 @@ def get_ipo_data_remote(year: Optional[int] = None, exchange: Optional[str] = No
 
 
 def log_refresh_remote(refresh_type: str, status: str, records_processed: int = 0,
-                       error_message: Optional[str] = None, started_at: Optional[str] = None) -> int:
+                       error_message: Optional[str] = None, started_at: Optional[str] = None,
+                       skipped_tickers: Optional[str] = None) -> int:
     if not remote_db_available():
         return 0
     init_remote_database()
@@ -163,6 +184,7 @@ def log_refresh_remote(refresh_type: str, status: str, records_processed: int =
                 status=status,
                 records_processed=records_processed,
                 error_message=error_message,
+                skipped_tickers=skipped_tickers,
                 started_at=started_at or datetime.utcnow().isoformat(),
                 completed_at=datetime.utcnow().isoformat(),
             )
@@ -0,0 +1,140 @@
+"""
+EDGAR Response Cache for IPO Analytics
+On-disk cache of SEC EDGAR JSON responses that revalidates with ETag and
+Last-Modified, so repeated research runs mostly get 304s or local hits, with
+every request paced by the fetch engine's SEC rate limit, which is shared
+by all processes on the machine
+"""
+
+import os
+import json
+import hashlib
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+
+from fetch_engine import SEC_HOST, get_fetch_engine
+from transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.environ.get('IPO_EDGAR_CACHE_DIR', "data/cache/edgar")
+
+# Cached responses younger than this are served without asking the SEC at all
+FRESH_FOR = timedelta(minutes=int(os.environ.get('IPO_EDGAR_FRESH_MINUTES', 10)))
+
+
+class EdgarResponseCache:
+    """Conditional-request cache of EDGAR JSON responses, one file per URL"""
+
+    def __init__(self, session: requests.Session, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.session = session
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the hit, revalidation and download counters"""
+        with self._lock:
+            self.stats = {'fresh_hits': 0, 'not_modified': 0, 'downloads': 0}
+
+    @contextmanager
+    def track(self):
+        """Count the requests made on this thread inside the block, apart from the shared stats"""
+        counts = {'fresh_hits': 0, 'not_modified': 0, 'downloads': 0}
+        self._local.counts = counts
+        try:
+            yield counts
+        finally:
+            self._local.counts = None
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+        counts = getattr(self._local, 'counts', None)
+        if counts is not None:
+            counts[outcome] += 1
+
+    def _path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha1(url.encode()).hexdigest()}.json"
+
+    def _read(self, path: Path) -> Optional[Dict]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path: Path, entry: Dict):
+        # Write then rename, so a concurrent reader never sees a partial file
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def get_json(self, url: str, headers: Optional[Dict] = None, timeout: float = 10) -> Any:
+        """
+        GET a JSON document through the cache
+
+        A cached copy within FRESH_FOR is returned directly. An older one is
+        revalidated with If-None-Match / If-Modified-Since and reused on 304.
+
+        Args:
+            url: EDGAR URL
+            headers: Extra request headers (e.g. the SEC User-Agent)
+            timeout: Request timeout in seconds
+
+        Returns:
+            Parsed JSON body
+        """
+        path = self._path(url)
+        cached = self._read(path)
+        now = datetime.now()
+
+        if cached and now - datetime.fromisoformat(cached['fetched_at']) < FRESH_FOR:
+            self._count('fresh_hits')
+            get_transport().mark_cache_hit()
+            return cached['body']
+
+        request_headers = dict(headers or {})
+        if cached and cached.get('etag'):
+            request_headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            request_headers['If-Modified-Since'] = cached['last_modified']
+
+        get_fetch_engine().throttle(SEC_HOST)
+        response = self.session.get(url, headers=request_headers, timeout=timeout)
+
+        if response.status_code == 304 and cached:
+            self._count('not_modified')
+            cached['fetched_at'] = now.isoformat()
+            self._write(path, cached)
+            return cached['body']
+
+        response.raise_for_status()
+        body = response.json()
+        self._count('downloads')
+        self._write(path, {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': now.isoformat(),
+            'body': body,
+        })
+        return body
+
+    def report(self, stats: Optional[Dict] = None) -> Dict:
+        """Log and return how EDGAR requests were served since the last reset, or the given counts"""
+        if stats is None:
+            with self._lock:
+                stats = dict(self.stats)
+        logger.info(f"EDGAR cache: {stats['fresh_hits']} fresh hits, "
+                    f"{stats['not_modified']} not modified, {stats['downloads']} downloads")
+        return stats
@@ -8,62 +8,166 @@ import os
 sys.path.append(os.path.dirname(__file__))
 
 from global_yfinance_util import GlobalIPODataFetcher
+from yfinance_util import IPODataFetcher
 from database import IPODatabase
+from quote_refresh import ipo_symbols
+from panel_metrics import METRIC_COLUMNS
+from metric_state import IncrementalMetrics
+from db_util import remote_db_available, insert_ipo_records_remote, log_refresh_remote
+from fetch_engine import get_fetch_engine
+from http_client import connection_stats
 import logging
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 logger = logging.getLogger(__name__)
 
-def load_comprehensive_global_ipo_data(max_per_region: int = 100) -> int:
+def load_comprehensive_global_ipo_data(max_per_region: int = 100,
+                                      db_path: str = "data/ipo_analytics.db") -> int:
     """
     Load comprehensive global IPO data from all regions using yfinance
     
     Args:
         max_per_region: Maximum number of IPOs to fetch per region
+        db_path: SQLite database to load into
         
     Returns:
         Number of records successfully loaded
     """
+    return run_global_ipo_load(max_per_region, db_path)['records_loaded']
+
+# Records are written through to the database in batches of this size as fetches complete
+INGEST_BATCH_SIZE = 25
+
+# Checkpoint used to resume an interrupted global load
+GLOBAL_LOAD_CHECKPOINT = "global_ipo_load"
+
+class IPOBatchWriter:
+    """Buffers fetched records and commits them with their checkpoint keys in bounded batches"""
+    
+    def __init__(self, db: IPODatabase, checkpoint_name: str, batch_size: int = INGEST_BATCH_SIZE):
+        self.db = db
+        self.checkpoint_name = checkpoint_name
+        self.batch_size = batch_size
+        self.records_written = 0
+        self.batches_written = 0
+        self._buffer = []
+        self._keys = []
+    
+    @staticmethod
+    def encode_key(key: Tuple) -> str:
+        return '|'.join(str(part) for part in key)
+    
+    @staticmethod
+    def decode_key(key: str) -> Tuple:
+        return tuple(key.split('|'))
+    
+    def add(self, key: Tuple, record: Dict):
+        """Buffer one record, committing the batch once it is full"""
+        self._buffer.append(record)
+        self._keys.append(self.encode_key(key))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Commit buffered records and their checkpoint keys"""
+        if not self._buffer:
+            return
+        self.records_written += self.db.insert_ipo_batch(self._buffer, self.checkpoint_name, self._keys)
+        self.batches_written += 1
+        logger.info(f"Committed batch {self.batches_written} ({len(self._buffer)} records, "
+                    f"{self.records_written} total)")
+        self._buffer = []
+        self._keys = []
+
+def run_global_ipo_load(max_per_region: int = 100,
+                        db_path: str = "data/ipo_analytics.db",
+                        resume: bool = True) -> Dict:
+    """
+    Load comprehensive global IPO data and return a summary of the run
+    
+    Records are committed in batches as fetches complete, each batch together
+    with a checkpoint of its tickers. If a run is interrupted, the next run
+    skips tickers already committed (within the last 24 hours) unless resume
+    is False. The checkpoint is cleared once a run finishes.
+    
+    Args:
+        max_per_region: Maximum number of IPOs to fetch per region
+        db_path: SQLite database to load into
+        resume: Whether to continue from an interrupted run's checkpoint
+        
+    Returns:
+        Dictionary with records_loaded, records_resumed, region_summary,
+        interrupted (True if the run stopped early and kept its checkpoint) with error,
+        skipped_tickers (a refresh_log-ready description of tickers left out, or None)
+        concurrency (per-host concurrency and error rates of the fetch engine)
+        and connections (per-host connection reuse of the shared HTTP sessions)
+    """
     logger.info("Starting comprehensive global IPO data loading")
     
     # Initialize components
-    fetcher = GlobalIPODataFetcher()
-    db = IPODatabase()
+    fetcher = GlobalIPODataFetcher(db_path)
+    db = IPODatabase(db_path)
+    writer = IPOBatchWriter(db, GLOBAL_LOAD_CHECKPOINT)
+    
+    result = {
+        'records_loaded': 0,
+        'records_resumed': 0,
+        'region_summary': {},
+        'interrupted': False,
+        'error': None,
+        'skipped_tickers': None,
+        'concurrency': {},
+        'connections': {}
+    }
     
-    total_loaded = 0
+    completed_keys = set()
+    if resume:
+        completed_keys = {writer.decode_key(key) for key in db.get_checkpoint(GLOBAL_LOAD_CHECKPOINT)}
+        result['records_resumed'] = len(completed_keys)
+    else:
+        db.clear_checkpoint(GLOBAL_LOAD_CHECKPOINT)
     
     try:
-        # Fetch data from all regions
+        # Fetch data from all regions, writing through to the database as results arrive
         logger.info("Fetching IPO data from all global regions")
-        all_ipos = fetcher.fetch_all_global_ipos(max_per_region)
+        region_summary = fetcher.stream_all_global_ipos(max_per_region, writer.add, completed_keys)
+        writer.flush()
+        db.clear_checkpoint(GLOBAL_LOAD_CHECKPOINT)
         
-        if not all_ipos:
-            logger.warning("No IPO data fetched")
-            return 0
-        
-        # Insert data into database
-        logger.info(f"Inserting {len(all_ipos)} IPO records into database")
-        records_inserted = db.insert_ipo_data(all_ipos)
-        
-        total_loaded = records_inserted
-        logger.info(f"Successfully loaded {total_loaded} global IPO records")
-        
-        # Log summary by region
-        region_summary = {}
-        for ipo in all_ipos:
-            region = ipo.get('region', 'Unknown')
-            region_summary[region] = region_summary.get(region, 0) + 1
+        result['region_summary'] = region_summary
+        logger.info(f"Successfully loaded {writer.records_written} global IPO records "
+                    f"in {writer.batches_written} batches")
         
         logger.info("Regional distribution:")
         for region, count in region_summary.items():
             logger.info(f"  {region}: {count} IPOs")
         
-        return total_loaded
-        
     except Exception as e:
         logger.error(f"Error loading global IPO data: {e}")
-        return 0
+        result['interrupted'] = True
+        result['error'] = str(e)
+        # Keep whatever was fetched; the checkpoint lets the next run pick up from here
+        try:
+            writer.flush()
+        except Exception as flush_error:
+            logger.error(f"Error committing final batch: {flush_error}")
+        logger.info(f"Checkpoint kept with {writer.records_written} records from this run")
+    
+    result['records_loaded'] = writer.records_written
+    result['skipped_tickers'] = fetcher.ticker_health.skipped_summary()
+    result['concurrency'] = get_fetch_engine().telemetry()
+    for host, stats in result['concurrency'].items():
+        logger.info(f"{host}: concurrency {stats['concurrency']}, {stats['requests']} requests, "
+                    f"error rate {stats['error_rate']:.1%} ({stats['throttled']} throttled, "
+                    f"{stats['timeouts']} timeouts), avg latency {stats['avg_latency']:.2f}s")
+    result['connections'] = connection_stats()
+    for host, stats in result['connections'].items():
+        logger.info(f"{host}: {stats['requests']} requests over {stats['new_connections']} connections "
+                    f"({stats['reuse_rate']:.0%} reused)")
+    fetcher.anchor_detector.report()
+    fetcher.metadata_cache.report()
+    return result
 
 def load_regional_ipo_data(region: str, max_ipos: int = 50) -> int:
     """
@@ -100,6 +204,45 @@ def load_regional_ipo_data(region: str, max_ipos: int = 50) -> int:
         logger.error(f"Error loading {region} IPO data: {e}")
         return 0
 
+def load_performance_metrics(db_path: str = "data/ipo_analytics.db",
+                             refresh_prices: bool = True,
+                             incremental: bool = False,
+                             rebuild: bool = False) -> int:
+    """
+    Compute performance metrics for every ipo_data row and store them in one bulk insert
+    
+    Args:
+        db_path: SQLite database to read ipo_data from and write performance_metrics to
+        refresh_prices: Whether to update cached price histories first
+        incremental: Update the persisted per-ticker metric state with only the
+            new bars instead of recomputing the whole panel
+        rebuild: With incremental, also recompute every ticker from its IPO
+            date and log any disagreement with the incremental state
+        
+    Returns:
+        Number of tickers with metrics written
+    """
+    db = IPODatabase(db_path)
+    
+    # Price history is cached under the Yahoo symbol; metrics are stored under the ipo_data ticker
+    universe = ipo_symbols(db_path)
+    if not universe:
+        return 0
+    tickers = {symbol: ticker for symbol, (ticker, _) in universe.items()}
+    ipo_dates = {symbol: ipo_date for symbol, (_, ipo_date) in universe.items()}
+    
+    fetcher = IPODataFetcher(db_path)
+    if incremental:
+        if refresh_prices:
+            fetcher.fetch_engine.map(fetcher.price_cache.get_history, list(ipo_dates))
+            fetcher.price_cache.report()
+        metrics = IncrementalMetrics(db_path).update(ipo_dates, rebuild=rebuild)
+    else:
+        metrics = fetcher.calculate_performance_metrics_batch(ipo_dates, refresh_prices=refresh_prices)
+    rows = [(tickers[symbol], *(values[column] for column in METRIC_COLUMNS))
+            for symbol, values in metrics.items()]
+    return db.insert_performance_metrics_bulk(rows)
+
 def get_exchange_coverage_report() -> Dict:
     """
     Generate a report of exchange coverage by region
@@ -133,28 +276,39 @@ def get_exchange_coverage_report() -> Dict:
     
     return report
 
-def update_global_ipo_database(force_refresh: bool = False) -> Dict:
+def update_global_ipo_database(force_refresh: bool = False,
+                               db_path: str = "data/ipo_analytics.db",
+                               max_per_region: int = 150,
+                               min_interval_hours: float = 24) -> Dict:
     """
     Update the global IPO database with latest data
     
+    Runs the global load plus the recent US IPOs the dashboard refresh
+    buttons used to fetch, mirrors the US records to the remote database
+    when one is configured, and records the run in refresh_log.
+    
     Args:
         force_refresh: Whether to force a complete refresh
+        db_path: SQLite database to load into
+        max_per_region: Maximum number of IPOs to fetch per region
+        min_interval_hours: Skip the update if the last full refresh is more recent than this
         
     Returns:
         Dictionary with update results
     """
     logger.info("Starting global IPO database update")
     
-    db = IPODatabase()
+    db = IPODatabase(db_path)
     
-    # Check last refresh
-    last_refresh = db.get_last_refresh()
+    # Check last successful full refresh; quote-only and interrupted refreshes don't count,
+    # so an interrupted run is resumed from its checkpoint on the next call
+    last_refresh = db.get_last_refresh(refresh_type="COMPREHENSIVE_GLOBAL_REFRESH", status="SUCCESS")
     
     if not force_refresh and last_refresh:
         last_refresh_time = datetime.fromisoformat(last_refresh['completed_at'])
         hours_since_refresh = (datetime.now() - last_refresh_time).total_seconds() / 3600
         
-        if hours_since_refresh < 24:  # Don't refresh more than once per day
+        if hours_since_refresh < min_interval_hours:
             logger.info(f"Database was refreshed {hours_since_refresh:.1f} hours ago, skipping update")
             return {
                 'status': 'skipped',
@@ -165,19 +319,59 @@ def update_global_ipo_database(force_refresh: bool = False) -> Dict:
     
     # Perform comprehensive data load
     start_time = datetime.now()
-    records_loaded = load_comprehensive_global_ipo_data(max_per_region=150)
+    try:
+        load_result = run_global_ipo_load(max_per_region=max_per_region, db_path=db_path)
+        records_loaded = load_result['records_loaded']
+        
+        # Recent US IPOs for the last two years
+        current_year = datetime.now().year
+        records_by_year = IPODataFetcher(db_path).get_recent_ipos_by_year([current_year - 1, current_year])
+        us_records = [record for year_records in records_by_year.values() for record in year_records]
+        if us_records:
+            records_loaded += db.insert_ipo_data(us_records)
+            if remote_db_available():
+                insert_ipo_records_remote(us_records)
+    except Exception as e:
+        logger.error(f"Global IPO database update failed: {e}")
+        db.log_refresh(
+            refresh_type="COMPREHENSIVE_GLOBAL_REFRESH",
+            status="FAILED",
+            error_message=str(e),
+            started_at=start_time.isoformat()
+        )
+        if remote_db_available():
+            log_refresh_remote("COMPREHENSIVE_GLOBAL_REFRESH", "FAILED", error_message=str(e),
+                               started_at=start_time.isoformat())
+        raise
     
     # Log the refresh
+    if load_result['interrupted']:
+        status = "INTERRUPTED"
+    else:
+        status = "SUCCESS" if records_loaded > 0 else "PARTIAL"
     db.log_refresh(
         refresh_type="COMPREHENSIVE_GLOBAL_REFRESH",
-        status="SUCCESS" if records_loaded > 0 else "PARTIAL",
+        status=status,
         records_processed=records_loaded,
-        started_at=start_time.isoformat()
+        error_message=load_result['error'],
+        started_at=start_time.isoformat(),
+        skipped_tickers=load_result['skipped_tickers']
     )
+    if remote_db_available():
+        log_refresh_remote(
+            refresh_type="COMPREHENSIVE_GLOBAL_REFRESH",
+            status=status,
+            records_processed=records_loaded,
+            error_message=load_result['error'],
+            started_at=start_time.isoformat(),
+            skipped_tickers=load_result['skipped_tickers']
+        )
     
     return {
-        'status': 'completed',
+        'status': 'interrupted' if load_result['interrupted'] else 'completed',
         'records_loaded': records_loaded,
+        'concurrency': load_result['concurrency'],
+        'connections': load_result['connections'],
         'started_at': start_time.isoformat(),
         'completed_at': datetime.now().isoformat()
     }
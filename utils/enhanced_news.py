@@ -8,7 +8,9 @@ import logging
 import pandas as pd
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
-import requests
+
+from transport import get_transport
+from http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -95,10 +97,13 @@ class EnhancedIPONewsSearcher:
                     ]
                 }
                 
-                response = requests.post(self.tavily_base_url, json=payload, timeout=10)
-                response.raise_for_status()
+                def fetch():
+                    response = get_http_session().post(self.tavily_base_url, json=payload, timeout=10)
+                    response.raise_for_status()
+                    return response.json()
                 
-                data = response.json()
+                params = {k: v for k, v in payload.items() if k != 'api_key'}
+                data = get_transport().call('tavily', 'search', params, fetch)
                 
                 for result in data.get('results', []):
                     article = {
@@ -135,7 +140,7 @@ class EnhancedIPONewsSearcher:
                 # Calculate date range
                 start_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
                 
-                results = self.exa_client.search_and_contents(
+                search_kwargs = dict(
                     query=keyword,
                     type="neural",
                     use_autoprompt=True,
@@ -143,6 +148,10 @@ class EnhancedIPONewsSearcher:
                     text=True,
                     start_published_date=start_date
                 )
+                results = get_transport().call(
+                    'exa', 'search_and_contents', search_kwargs,
+                    lambda: self.exa_client.search_and_contents(**search_kwargs)
+                )
                 
                 for result in results.results:
                     # Extract publication date
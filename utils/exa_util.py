@@ -11,6 +11,8 @@ import re
 from datetime import datetime, timedelta
 import logging
 
+from transport import get_transport
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,6 +33,11 @@ class ExaIPOSearch:
         
         self.exa = Exa(api_key=self.api_key)
     
+    def _search_and_contents(self, **kwargs):
+        """Run an Exa search through the provider transport"""
+        return get_transport().call('exa', 'search_and_contents', kwargs,
+                                    lambda: self.exa.search_and_contents(**kwargs))
+    
     def search_upcoming_ipos(self, num_results: int = 20) -> List[Dict[str, Any]]:
         """
         Search for upcoming IPO information using Exa.ai
@@ -45,7 +52,7 @@ class ExaIPOSearch:
             # Search for upcoming IPOs
             search_query = "upcoming IPO calendar 2024 2025 scheduled companies going public"
             
-            results = self.exa.search_and_contents(
+            results = self._search_and_contents(
                 query=search_query,
                 type="neural",
                 use_autoprompt=True,
@@ -80,7 +87,7 @@ class ExaIPOSearch:
         try:
             search_query = "IPO filing S-1 registration statement SEC 2024 2025"
             
-            results = self.exa.search_and_contents(
+            results = self._search_and_contents(
                 query=search_query,
                 type="neural",
                 use_autoprompt=True,
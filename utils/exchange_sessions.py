@@ -0,0 +1,168 @@
+"""
+Exchange Trading Sessions for IPO Analytics
+Regular trading hours per market so a refresh can skip exchanges whose
+session has not produced any new prices since the last fetch
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from global_yfinance_util import GLOBAL_EXCHANGES
+
+logger = logging.getLogger(__name__)
+
+# Quote providers publish the final bar a little after the close
+CLOSE_SETTLE = timedelta(minutes=30)
+
+MONDAY_TO_FRIDAY = (0, 1, 2, 3, 4)
+SUNDAY_TO_THURSDAY = (6, 0, 1, 2, 3)
+
+
+@dataclass(frozen=True)
+class MarketSession:
+    """Regular trading hours of a market in its local time zone"""
+    timezone: str
+    open: time
+    close: time
+    trading_days: Tuple[int, ...] = MONDAY_TO_FRIDAY
+
+    def is_open(self, now: datetime) -> bool:
+        """Whether the market is in its regular session at an aware datetime"""
+        local = now.astimezone(ZoneInfo(self.timezone))
+        return local.weekday() in self.trading_days and self.open <= local.time() < self.close
+
+    def last_close(self, now: datetime) -> datetime:
+        """Most recent session close at or before an aware datetime"""
+        tz = ZoneInfo(self.timezone)
+        local = now.astimezone(tz)
+        for days_back in range(8):
+            day = (local - timedelta(days=days_back)).date()
+            if day.weekday() not in self.trading_days:
+                continue
+            close = datetime.combine(day, self.close, tzinfo=tz)
+            if close <= local:
+                return close
+        raise ValueError(f"No trading day in the last week for session {self}")
+
+    def has_new_data(self, last_fetched: Optional[datetime], now: Optional[datetime] = None) -> bool:
+        """
+        Whether the market may have produced new prices since last_fetched
+
+        True while the session is open, or when the last fetch happened before
+        the most recent close had settled. Naive datetimes are read as local time.
+        Exchange holidays are not modelled and just cost one extra fetch.
+        """
+        if last_fetched is None:
+            return True
+        now = (now or datetime.now()).astimezone()
+        if self.is_open(now):
+            return True
+        return last_fetched.astimezone() < self.last_close(now) + CLOSE_SETTLE
+
+
+def _session(timezone: str, open_time: str, close_time: str,
+             trading_days: Tuple[int, ...] = MONDAY_TO_FRIDAY) -> MarketSession:
+    return MarketSession(timezone, time.fromisoformat(open_time), time.fromisoformat(close_time), trading_days)
+
+
+# Regular session per country in GLOBAL_EXCHANGES (continuous trading, ignoring lunch breaks)
+MARKET_SESSIONS = {
+    # Americas
+    'United States': _session('America/New_York', '09:30', '16:00'),
+    'Canada': _session('America/Toronto', '09:30', '16:00'),
+    'Brazil': _session('America/Sao_Paulo', '10:00', '17:55'),
+    'Mexico': _session('America/Mexico_City', '08:30', '15:00'),
+    'Argentina': _session('America/Argentina/Buenos_Aires', '11:00', '17:00'),
+    'Chile': _session('America/Santiago', '09:30', '16:00'),
+    'Colombia': _session('America/Bogota', '09:30', '16:00'),
+    'Peru': _session('America/Lima', '09:00', '16:00'),
+
+    # EMEA
+    'United Kingdom': _session('Europe/London', '08:00', '16:35'),
+    'Germany': _session('Europe/Berlin', '09:00', '17:35'),
+    'France': _session('Europe/Paris', '09:00', '17:35'),
+    'Netherlands': _session('Europe/Amsterdam', '09:00', '17:35'),
+    'Italy': _session('Europe/Rome', '09:00', '17:35'),
+    'Spain': _session('Europe/Madrid', '09:00', '17:35'),
+    'Switzerland': _session('Europe/Zurich', '09:00', '17:30'),
+    'Sweden': _session('Europe/Stockholm', '09:00', '17:30'),
+    'Finland': _session('Europe/Helsinki', '10:00', '18:30'),
+    'Denmark': _session('Europe/Copenhagen', '09:00', '17:00'),
+    'Norway': _session('Europe/Oslo', '09:00', '16:25'),
+    'Poland': _session('Europe/Warsaw', '09:00', '17:05'),
+    'Hungary': _session('Europe/Budapest', '09:00', '17:05'),
+    'Czech Republic': _session('Europe/Prague', '09:00', '16:25'),
+    'Greece': _session('Europe/Athens', '10:00', '17:20'),
+    'Portugal': _session('Europe/Lisbon', '08:00', '16:35'),
+    'Belgium': _session('Europe/Brussels', '09:00', '17:35'),
+    'Austria': _session('Europe/Vienna', '09:00', '17:35'),
+    'Estonia': _session('Europe/Tallinn', '10:00', '16:00'),
+    'Latvia': _session('Europe/Riga', '10:00', '16:00'),
+    'Lithuania': _session('Europe/Vilnius', '10:00', '16:00'),
+    'Turkey': _session('Europe/Istanbul', '10:00', '18:10'),
+    'Russia': _session('Europe/Moscow', '10:00', '18:50'),
+    'Israel': _session('Asia/Jerusalem', '09:59', '17:25'),
+    'South Africa': _session('Africa/Johannesburg', '09:00', '17:00'),
+    'UAE': _session('Asia/Dubai', '10:00', '15:00'),
+    'Saudi Arabia': _session('Asia/Riyadh', '10:00', '15:10', SUNDAY_TO_THURSDAY),
+    'Qatar': _session('Asia/Qatar', '09:30', '13:15', SUNDAY_TO_THURSDAY),
+    'Kuwait': _session('Asia/Kuwait', '09:00', '12:40', SUNDAY_TO_THURSDAY),
+    'Egypt': _session('Africa/Cairo', '10:00', '14:30', SUNDAY_TO_THURSDAY),
+    'Morocco': _session('Africa/Casablanca', '09:30', '15:30'),
+    'Nigeria': _session('Africa/Lagos', '10:00', '14:30'),
+    'Kenya': _session('Africa/Nairobi', '09:00', '15:00'),
+
+    # APAC
+    'China': _session('Asia/Shanghai', '09:30', '15:00'),
+    'Hong Kong': _session('Asia/Hong_Kong', '09:30', '16:10'),
+    'Japan': _session('Asia/Tokyo', '09:00', '15:30'),
+    'South Korea': _session('Asia/Seoul', '09:00', '15:30'),
+    'India': _session('Asia/Kolkata', '09:15', '15:30'),
+    'Singapore': _session('Asia/Singapore', '09:00', '17:06'),
+    'Taiwan': _session('Asia/Taipei', '09:00', '13:30'),
+    'Australia': _session('Australia/Sydney', '10:00', '16:12'),
+    'New Zealand': _session('Pacific/Auckland', '10:00', '16:45'),
+    'Thailand': _session('Asia/Bangkok', '10:00', '16:40'),
+    'Malaysia': _session('Asia/Kuala_Lumpur', '09:00', '17:00'),
+    'Indonesia': _session('Asia/Jakarta', '09:00', '16:00'),
+    'Philippines': _session('Asia/Manila', '09:30', '15:00'),
+    'Vietnam': _session('Asia/Ho_Chi_Minh', '09:00', '15:00'),
+    'Bangladesh': _session('Asia/Dhaka', '10:00', '14:30', SUNDAY_TO_THURSDAY),
+    'Pakistan': _session('Asia/Karachi', '09:30', '15:30'),
+    'Sri Lanka': _session('Asia/Colombo', '09:30', '14:30'),
+    'Mongolia': _session('Asia/Ulaanbaatar', '10:00', '15:00'),
+    'Kazakhstan': _session('Asia/Almaty', '11:30', '17:00'),
+    'Uzbekistan': _session('Asia/Tashkent', '10:00', '15:00'),
+}
+
+# Venues whose hours differ from their country's main market; keyed by (country, exchange)
+# because exchange codes such as CSE and KSE are reused across regions
+EXCHANGE_SESSIONS = {
+    ('Germany', 'FSE'): _session('Europe/Berlin', '08:00', '22:00'),
+    ('Germany', 'FRA'): _session('Europe/Berlin', '08:00', '22:00'),
+    ('Germany', 'BER'): _session('Europe/Berlin', '08:00', '22:00'),
+    ('Germany', 'MUN'): _session('Europe/Berlin', '08:00', '22:00'),
+    ('Germany', 'STU'): _session('Europe/Berlin', '08:00', '22:00'),
+    ('Germany', 'HAM'): _session('Europe/Berlin', '08:00', '22:00'),
+    ('Germany', 'DUS'): _session('Europe/Berlin', '08:00', '22:00'),
+}
+
+
+def session_for(exchange: Optional[str], country: Optional[str] = None) -> Optional[MarketSession]:
+    """
+    Trading session of an exchange
+
+    Args:
+        exchange: Exchange code as stored in ipo_data
+        country: Country of the listing; resolves exchange codes used in several regions
+
+    Returns:
+        MarketSession, or None for an unknown exchange and country
+    """
+    if not country or country == 'Unknown':
+        country = next((exchanges[exchange]['country'] for exchanges in GLOBAL_EXCHANGES.values()
+                        if exchange in exchanges), None)
+    return EXCHANGE_SESSIONS.get((country, exchange)) or MARKET_SESSIONS.get(country)
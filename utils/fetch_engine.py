@@ -0,0 +1,425 @@
+"""
+Async Fetch Engine for IPO Analytics
+Runs blocking provider calls on an asyncio loop with per-host token-bucket
+rate limiting and an AIMD concurrency limit that grows while a provider is
+healthy and backs off on throttling and timeouts
+
+Host rate limits are per process, except for hosts marked 'shared', which
+are paced across every process on the machine through a locked state file.
+"""
+
+import os
+import re
+import asyncio
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: shared hosts fall back to a per-process bucket
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+YAHOO_HOST = 'query2.finance.yahoo.com'
+SEC_HOST = 'data.sec.gov'
+
+# Sustained requests per second and burst size allowed for each provider host;
+# SEC fair access allows at most 10 requests per second per machine, so no
+# burst on top, and the allowance is shared by every process
+DEFAULT_HOST_LIMITS = {
+    YAHOO_HOST: {'rate': 8.0, 'burst': 16},
+    SEC_HOST: {'rate': 10.0, 'burst': 1, 'shared': True},
+}
+
+# Where the state files of shared host limits live
+RATE_LIMIT_DIR = os.environ.get('IPO_RATE_LIMIT_DIR', "data/cache/ratelimit")
+
+# Transport provider names whose calls feed a host's concurrency controller
+PROVIDER_HOSTS = {'yfinance': YAHOO_HOST, 'sec': SEC_HOST}
+
+# Concurrency per host starts here and moves between 1 and the engine's max_concurrency
+INITIAL_CONCURRENCY = 4
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_JOB_TIMEOUT = 30
+
+# AIMD tuning: halve on throttling, timeouts or an unhealthy window; add one
+# slot after as many consecutive healthy calls as the current limit
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN = 2.0
+HEALTH_WINDOW = 20
+ERROR_RATE_THRESHOLD = 0.2
+LATENCY_TARGET = 5.0
+
+# Error text of a symbol the provider doesn't know or has no data for, as opposed to a transport failure
+NOT_FOUND_MARKERS = ('404', 'not found', 'no data found', 'no price data', 'no timezone found', 'delisted')
+
+# Error text of a connection that failed or dropped, e.g. from curl_cffi
+CONNECTION_MARKERS = ('connect', 'reset by peer', 'resolve host', 'broken pipe', 'remote end closed')
+
+# A 5xx status in the text of an HTTP error from requests, curl_cffi or yfinance
+SERVER_ERROR = re.compile(r'\b5\d\d\b.*(error|unavailable|gateway)|(error|unavailable|gateway).*\b5\d\d\b', re.I)
+
+
+def classify_error(error: Optional[BaseException]) -> Optional[str]:
+    """
+    How a provider call reflects on its host: 'throttled', 'timeout' or 'error'
+
+    Only throttling, timeouts, connection failures and 5xx responses count.
+    None is returned for success and for errors about the request itself,
+    such as a 404 or a ticker without data.
+    """
+    if error is None:
+        return None
+    message = str(error)
+    if 'RateLimit' in type(error).__name__ or '429' in message or 'Too Many Requests' in message:
+        return 'throttled'
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, requests.exceptions.Timeout)) \
+            or 'timed out' in message.lower():
+        return 'timeout'
+    if is_not_found(error):
+        return None
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if isinstance(error, (ConnectionError, requests.exceptions.ConnectionError)) \
+            or 'Connection' in type(error).__name__ \
+            or any(marker in message.lower() for marker in CONNECTION_MARKERS) \
+            or (isinstance(status, int) and status >= 500) or SERVER_ERROR.search(message):
+        return 'error'
+    return None
+
+
+def is_not_found(error: BaseException) -> bool:
+    """Whether a failed call means the symbol doesn't exist, rather than that the provider is unreachable"""
+    message = str(error).lower()
+    return any(marker in message for marker in NOT_FOUND_MARKERS)
+
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease concurrency limit for one host"""
+
+    def __init__(self, host: str, initial: int = INITIAL_CONCURRENCY, maximum: int = DEFAULT_MAX_CONCURRENCY):
+        self.host = host
+        self.maximum = maximum
+        self.limit = min(initial, maximum)
+        self.in_flight = 0
+        self.totals = {'requests': 0, 'errors': 0, 'throttled': 0, 'timeouts': 0}
+        self._window = deque(maxlen=HEALTH_WINDOW)
+        self._healthy_since_increase = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Take a slot if fewer than limit calls are in flight"""
+        with self._lock:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def record(self, latency: float, error: Optional[BaseException] = None):
+        """Feed one finished provider call into the limit"""
+        kind = classify_error(error)
+        with self._lock:
+            self.totals['requests'] += 1
+            if error is not None and kind is None:
+                # The provider answered; the request itself was bad, so neither healthy nor unhealthy
+                return
+            self._window.append((latency, kind))
+            if kind:
+                self.totals['errors'] += 1
+            if kind == 'throttled':
+                self.totals['throttled'] += 1
+            elif kind == 'timeout':
+                self.totals['timeouts'] += 1
+
+            if kind in ('throttled', 'timeout'):
+                self._decrease(kind)
+                return
+
+            error_rate = sum(1 for _, k in self._window if k) / len(self._window)
+            average_latency = sum(l for l, _ in self._window) / len(self._window)
+            if len(self._window) >= HEALTH_WINDOW // 2 and \
+                    (error_rate > ERROR_RATE_THRESHOLD or average_latency > LATENCY_TARGET):
+                self._decrease(f"error rate {error_rate:.0%}, latency {average_latency:.1f}s")
+            elif kind is None:
+                # About one round of calls at the current limit between increases
+                self._healthy_since_increase += 1
+                if self._healthy_since_increase >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._healthy_since_increase = 0
+
+    def _decrease(self, reason: str):
+        # Calls already in flight when the provider pushed back report together; count them once
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return
+        previous = self.limit
+        self.limit = max(1, int(self.limit * DECREASE_FACTOR))
+        self._last_decrease = now
+        self._healthy_since_increase = 0
+        self._window.clear()
+        logger.warning(f"Concurrency for {self.host} cut from {previous} to {self.limit} ({reason})")
+
+    def telemetry(self) -> Dict:
+        """Current limit, in-flight calls and error rates for refresh telemetry"""
+        with self._lock:
+            requests_made = self.totals['requests']
+            window_errors = sum(1 for _, k in self._window if k)
+            return {
+                'concurrency': self.limit,
+                'in_flight': self.in_flight,
+                'requests': requests_made,
+                'error_rate': self.totals['errors'] / requests_made if requests_made else 0.0,
+                'recent_error_rate': window_errors / len(self._window) if self._window else 0.0,
+                'throttled': self.totals['throttled'],
+                'timeouts': self.totals['timeouts'],
+                'avg_latency': (sum(l for l, _ in self._window) / len(self._window)) if self._window else 0.0,
+            }
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers await until a token is available"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self):
+        """Synchronous acquire for callers outside the event loop"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SharedRateLimiter:
+    """
+    Rate limit shared by all processes on the machine, one request per 1/rate seconds
+
+    The next free request slot is kept in a file. Each caller takes the slot
+    under an exclusive lock and sleeps until it comes up, outside the lock.
+    """
+
+    def __init__(self, path: Union[str, Path], rate: float):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.rate = rate
+
+    def _reserve(self) -> float:
+        """Take the next slot and return how long the caller must wait before using it"""
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read().strip()
+                now = time.time()
+                slot = max(now, float(content) if content else 0.0)
+                f.seek(0)
+                f.truncate()
+                f.write(repr(slot + 1.0 / self.rate))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return slot - now
+
+    async def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+@dataclass
+class FetchJob:
+    """A single blocking call to run through the engine"""
+    key: Hashable
+    func: Callable
+    args: Tuple = ()
+    kwargs: Dict = field(default_factory=dict)
+    host: str = YAHOO_HOST
+
+
+class AsyncFetchEngine:
+    """Schedules FetchJobs concurrently, limited by host allowance and an adaptive per-host concurrency"""
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 host_limits: Optional[Dict[str, Dict]] = None,
+                 job_timeout: float = DEFAULT_JOB_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.job_timeout = job_timeout
+        self.host_limits = dict(DEFAULT_HOST_LIMITS)
+        if host_limits:
+            self.host_limits.update(host_limits)
+        self._buckets: Dict[str, Union[TokenBucket, SharedRateLimiter]] = {}
+        self._buckets_lock = threading.Lock()
+        self._controllers: Dict[str, AIMDController] = {}
+
+    def _bucket(self, host: str) -> Optional[Union[TokenBucket, SharedRateLimiter]]:
+        limits = self.host_limits.get(host)
+        if not limits:
+            return None
+        with self._buckets_lock:
+            if host not in self._buckets:
+                if limits.get('shared') and fcntl is not None:
+                    self._buckets[host] = SharedRateLimiter(Path(RATE_LIMIT_DIR) / host, limits['rate'])
+                else:
+                    self._buckets[host] = TokenBucket(limits['rate'], limits['burst'])
+            return self._buckets[host]
+
+    def throttle(self, host: str):
+        """Block until a request to host is allowed, sharing the limiter engine jobs use"""
+        bucket = self._bucket(host)
+        if bucket:
+            bucket.acquire_blocking()
+
+    def controller(self, host: str) -> AIMDController:
+        """Concurrency controller of a host, created on first use"""
+        with self._buckets_lock:
+            if host not in self._controllers:
+                self._controllers[host] = AIMDController(host, maximum=self.max_concurrency)
+            return self._controllers[host]
+
+    def record_call(self, provider: str, latency: float, error: Optional[BaseException] = None):
+        """Report a provider call made through the transport to its host's controller"""
+        host = PROVIDER_HOSTS.get(provider)
+        if host:
+            self.controller(host).record(latency, error)
+
+    def telemetry(self) -> Dict[str, Dict]:
+        """Concurrency telemetry per host"""
+        with self._buckets_lock:
+            controllers = dict(self._controllers)
+        return {host: controller.telemetry() for host, controller in controllers.items()}
+
+    def run(self, jobs: List[FetchJob],
+            on_result: Optional[Callable[[Hashable, Any, Optional[Exception]], None]] = None,
+            collect: bool = True) -> Dict[Hashable, Any]:
+        """
+        Run jobs and return results keyed by job key
+
+        Failed jobs map to None. If on_result is given it is called as each job
+        finishes with (key, result, error), in completion order. Pass
+        collect=False when on_result consumes the results, so they are not
+        also held in the returned dict.
+        """
+        if not jobs:
+            return {}
+        return _run_coroutine(self._run_all(jobs, on_result, collect))
+
+    def map(self, func: Callable, items: List, host: str = YAHOO_HOST, **kwargs) -> Dict[Hashable, Any]:
+        """Convenience wrapper running func(item) for every item, keyed by item"""
+        return self.run([FetchJob(item, func, (item,), host=host) for item in items], **kwargs)
+
+    async def _run_all(self, jobs, on_result, collect=True):
+        loop = asyncio.get_running_loop()
+        slot_freed = asyncio.Condition()
+        results = {}
+
+        async def acquire_slot(controller):
+            async with slot_freed:
+                while not controller.try_acquire():
+                    # Slots can also be freed by runs on other threads, so re-check periodically
+                    try:
+                        await asyncio.wait_for(slot_freed.wait(), timeout=0.1)
+                    except asyncio.TimeoutError:
+                        pass
+
+        async def release_slot(controller):
+            controller.release()
+            async with slot_freed:
+                slot_freed.notify_all()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            async def run_job(job):
+                controller = self.controller(job.host)
+                await acquire_slot(controller)
+                try:
+                    bucket = self._bucket(job.host)
+                    if bucket:
+                        await bucket.acquire()
+                    call = loop.run_in_executor(executor, lambda: job.func(*job.args, **job.kwargs))
+                    try:
+                        return job, await asyncio.wait_for(call, timeout=self.job_timeout), None
+                    except asyncio.TimeoutError as e:
+                        controller.record(self.job_timeout, e)
+                        return job, None, e
+                    except Exception as e:
+                        return job, None, e
+                finally:
+                    await release_slot(controller)
+
+            # Create tasks up front so jobs start in submission order
+            tasks = [asyncio.ensure_future(run_job(job)) for job in jobs]
+            for task in asyncio.as_completed(tasks):
+                job, result, error = await task
+                if collect:
+                    results[job.key] = result
+                if on_result:
+                    on_result(job.key, result, error)
+
+        return results
+
+
+def _run_coroutine(coro):
+    """Run a coroutine to completion from sync code, even if a loop is already running"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def runner():
+        result['value'] = asyncio.run(coro)
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    return result['value']
+
+
+_default_engine: Optional[AsyncFetchEngine] = None
+_default_engine_lock = threading.Lock()
+
+
+def get_fetch_engine() -> AsyncFetchEngine:
+    """Process-wide engine so every fetcher shares the same host buckets"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = AsyncFetchEngine()
+        return _default_engine
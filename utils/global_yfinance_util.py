@@ -4,15 +4,18 @@ Fetches IPO data from all major global exchanges with regional categorization
 """
 
 import yfinance as yf
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import requests
-import time
-from typing import List, Dict, Optional, Tuple
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 import logging
-import random
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import zip_longest
+
+from price_cache import PriceHistoryCache
+from fetch_engine import FetchJob, get_fetch_engine, is_not_found
+from metadata_cache import TickerMetadataCache
+from transport import get_transport
+from http_client import get_yfinance_session
+from ticker_health import TickerHealth
+from ipo_anchor import IPOAnchorDetector
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -208,12 +211,20 @@ KNOWN_IPOS_BY_REGION = {
     }
 }
 
+# Ticker.info fields needed for an ipo_data record; marketCap is derived when not fresh
+METADATA_FIELDS = ['longName', 'shortName', 'sector', 'industry', 'website',
+                   'longBusinessSummary', 'fullTimeEmployees', 'sharesOutstanding']
+
 class GlobalIPODataFetcher:
     """Enhanced IPO data fetcher for global exchanges"""
     
-    def __init__(self):
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
         self.current_year = datetime.now().year
-        self.session = requests.Session()
+        self.price_cache = PriceHistoryCache(db_path)
+        self.metadata_cache = TickerMetadataCache(db_path)
+        self.ticker_health = TickerHealth(db_path)
+        self.anchor_detector = IPOAnchorDetector(db_path)
+        self.fetch_engine = get_fetch_engine()
         
     def get_region_from_exchange(self, exchange: str) -> str:
         """Get region for a given exchange"""
@@ -236,61 +247,74 @@ class GlobalIPODataFetcher:
                 return exchanges[exchange]['suffix']
         return ''
     
+    def get_yahoo_symbol(self, ticker: str, exchange: str = None) -> str:
+        """Add the exchange suffix to a ticker if it is missing"""
+        if exchange:
+            suffix = self.get_exchange_suffix(exchange)
+            if suffix and not ticker.endswith(suffix):
+                return f"{ticker}{suffix}"
+        return ticker
+    
     def fetch_stock_data(self, ticker: str, exchange: str = None) -> Optional[Dict]:
         """Fetch stock data for a single ticker"""
         try:
-            # Add exchange suffix if provided
-            if exchange:
-                suffix = self.get_exchange_suffix(exchange)
-                if suffix and not ticker.endswith(suffix):
-                    ticker = f"{ticker}{suffix}"
-            
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            hist = stock.history(period="max")
-            
-            if hist.empty or not info:
-                return None
-            
-            # Calculate performance metrics
-            first_price = hist['Close'].iloc[0] if len(hist) > 0 else None
-            current_price = hist['Close'].iloc[-1] if len(hist) > 0 else None
-            
-            if first_price is None or current_price is None:
-                return None
-            
-            performance = (current_price - first_price) / first_price
-            
-            # Get IPO date (approximate from first trading date)
-            ipo_date = hist.index[0].strftime('%Y-%m-%d') if len(hist) > 0 else None
-            
-            # Extract relevant information
-            data = {
-                'ticker': ticker.split('.')[0],  # Remove suffix for display
-                'company_name': info.get('longName', info.get('shortName', ticker)),
-                'sector': info.get('sector', 'Unknown'),
-                'industry': info.get('industry', 'Unknown'),
-                'exchange': exchange or 'Unknown',
-                'country': self.get_country_from_exchange(exchange) if exchange else 'Unknown',
-                'region': self.get_region_from_exchange(exchange) if exchange else 'Other',
-                'market_cap': info.get('marketCap', 0),
-                'current_price': float(current_price),
-                'ipo_price': float(first_price),  # Add IPO price field
-                'ipo_date': ipo_date,
-                'price_change_since_ipo': float(performance),
-                'volume': info.get('volume', 0),
-                'employees': info.get('fullTimeEmployees', 0),
-                'website': info.get('website', ''),
-                'business_summary': info.get('longBusinessSummary', '')[:500] if info.get('longBusinessSummary') else '',
-                'last_updated': datetime.now().isoformat()
-            }
-            
-            return data
-            
+            return self._fetch_stock_data(ticker, exchange)
         except Exception as e:
             logger.error(f"Error fetching data for {ticker}: {e}")
             return None
     
+    def _fetch_stock_data(self, ticker: str, exchange: str = None) -> Optional[Dict]:
+        """fetch_stock_data that raises provider errors; None means the ticker has no usable data"""
+        ticker = self.get_yahoo_symbol(ticker, exchange)
+        
+        # Slow-changing fields come from the metadata cache; .info is only hit on a miss
+        info = self.metadata_cache.get(
+            ticker, METADATA_FIELDS,
+            lambda: get_transport().call('yfinance', 'info', {'ticker': ticker}, lambda: yf.Ticker(ticker, session=get_yfinance_session()).info)
+        )
+        # IPO date and first close from a small cached window, plus the latest bars
+        quote = self.anchor_detector.get(ticker)
+        
+        if not quote or not info:
+            return None
+        
+        first_price = quote['ipo_price']
+        current_price = quote['current_price']
+        
+        if not first_price or not current_price:
+            return None
+        
+        performance = (current_price - first_price) / first_price
+        ipo_date = quote['ipo_date']
+        
+        # Market cap from the cached share count at today's price unless a fresh quote is at hand
+        market_cap = info.get('marketCap')
+        if not market_cap and info.get('sharesOutstanding'):
+            market_cap = int(info['sharesOutstanding'] * current_price)
+        
+        # Extract relevant information
+        data = {
+            'ticker': ticker.split('.')[0],  # Remove suffix for display
+            'company_name': info.get('longName') or info.get('shortName') or ticker,
+            'sector': info.get('sector') or 'Unknown',
+            'industry': info.get('industry') or 'Unknown',
+            'exchange': exchange or 'Unknown',
+            'country': self.get_country_from_exchange(exchange) if exchange else 'Unknown',
+            'region': self.get_region_from_exchange(exchange) if exchange else 'Other',
+            'market_cap': market_cap or 0,
+            'current_price': float(current_price),
+            'ipo_price': float(first_price),  # Add IPO price field
+            'ipo_date': ipo_date,
+            'price_change_since_ipo': float(performance),
+            'volume': quote['volume'],
+            'employees': info.get('fullTimeEmployees') or 0,
+            'website': info.get('website') or '',
+            'business_summary': info.get('longBusinessSummary', '')[:500] if info.get('longBusinessSummary') else '',
+            'last_updated': datetime.now().isoformat()
+        }
+        
+        return data
+    
     def fetch_regional_ipos(self, region: str, max_per_country: int = 20) -> List[Dict]:
         """Fetch IPO data for a specific region"""
         logger.info(f"Fetching IPO data for {region} region")
@@ -299,41 +323,102 @@ class GlobalIPODataFetcher:
             logger.warning(f"No known IPOs for region: {region}")
             return []
         
-        all_ipos = []
-        region_data = KNOWN_IPOS_BY_REGION[region]
-        
-        # Get exchanges for this region
-        region_exchanges = GLOBAL_EXCHANGES.get(region, {})
+        self.ticker_health.reset_run()
+        all_ipos = self._run_fetch_jobs(self._build_fetch_jobs([region], max_per_country))
         
-        for country_group, tickers in region_data.items():
-            logger.info(f"Processing {country_group} tickers: {len(tickers)}")
-            
-            # Determine exchange for country group
-            exchange = self._get_primary_exchange_for_country_group(region, country_group)
-            
-            # Process tickers in parallel
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                future_to_ticker = {
-                    executor.submit(self.fetch_stock_data, ticker, exchange): ticker 
-                    for ticker in tickers[:max_per_country]
-                }
+        logger.info(f"Successfully fetched {len(all_ipos)} IPOs for {region}")
+        return all_ipos
+    
+    def _build_fetch_jobs(self, regions: List[str], max_per_country: int) -> List[FetchJob]:
+        """Fetch jobs for the given regions, in the order of build_job_keys"""
+        return self._jobs_for_keys(self.build_job_keys(regions, max_per_country))
+    
+    def build_job_keys(self, regions: List[str], max_per_country: int) -> List[Tuple]:
+        """
+        Build one flat list of job keys (region, ticker, exchange) for the given regions
+        
+        Keys are interleaved round-robin across country groups so that every
+        country makes progress from the start instead of queueing behind the
+        previous one. Tickers in the negative cache are left out.
+        """
+        suppressed = self.ticker_health.suppressed_tickers()
+        groups = []
+        for region in regions:
+            for country_group, tickers in KNOWN_IPOS_BY_REGION.get(region, {}).items():
+                logger.info(f"Processing {country_group} tickers: {len(tickers)}")
                 
-                for future in as_completed(future_to_ticker):
-                    ticker = future_to_ticker[future]
-                    try:
-                        data = future.result(timeout=30)
-                        if data:
-                            all_ipos.append(data)
-                            logger.info(f"Successfully fetched data for {ticker}")
-                        else:
-                            logger.warning(f"No data returned for {ticker}")
-                    except Exception as e:
-                        logger.error(f"Error processing {ticker}: {e}")
-                    
-                    # Rate limiting
-                    time.sleep(0.1)
+                # Determine exchange for country group
+                exchange = self._get_primary_exchange_for_country_group(region, country_group)
+                keys = []
+                for ticker in tickers[:max_per_country]:
+                    symbol = self.get_yahoo_symbol(ticker, exchange)
+                    if symbol in suppressed:
+                        self.ticker_health.skip(symbol, f"negative cache until {suppressed[symbol][:16]}")
+                        continue
+                    keys.append((region, ticker, exchange))
+                groups.append(keys)
+        
+        return [key for round_keys in zip_longest(*groups) for key in round_keys if key is not None]
+    
+    def _jobs_for_keys(self, keys: Iterable[Tuple]) -> List[FetchJob]:
+        return [FetchJob(tuple(key), self._fetch_tracked, (key[1], key[2])) for key in keys]
+    
+    def stream_ipos_for_keys(self, keys: Iterable[Tuple], on_record: Callable[[Tuple, Dict], None]):
+        """Fetch the given job keys, handing each record to on_record(key, record) as it arrives"""
+        self._run_fetch_jobs(self._jobs_for_keys(keys), on_record=on_record)
+    
+    def _fetch_tracked(self, ticker: str, exchange: str) -> Optional[Dict]:
+        """
+        fetch_stock_data guarded by the exchange circuit breaker
+        
+        Only a confirmed unknown symbol or an empty result goes into the
+        negative cache; timeouts, throttling and connection errors count
+        against the exchange circuit and leave the ticker to the next run.
+        """
+        symbol = self.get_yahoo_symbol(ticker, exchange)
+        if not self.ticker_health.allow_request(symbol):
+            return None
         
-        logger.info(f"Successfully fetched {len(all_ipos)} IPOs for {region}")
+        try:
+            data = self._fetch_stock_data(ticker, exchange)
+        except Exception as e:
+            logger.error(f"Error fetching data for {symbol}: {e}")
+            if is_not_found(e):
+                self.ticker_health.record_failure(symbol, str(e)[:200])
+            else:
+                self.ticker_health.record_transient_failure(symbol, str(e)[:200])
+            return None
+        if data:
+            self.ticker_health.record_success(symbol)
+        else:
+            self.ticker_health.record_failure(symbol, "no data returned")
+        return data
+    
+    def _run_fetch_jobs(self, jobs: List[FetchJob],
+                        on_record: Optional[Callable[[Tuple, Dict], None]] = None) -> List[Dict]:
+        """
+        Run fetch jobs through the shared engine
+        
+        Records are collected and returned, or handed to on_record(key, record)
+        as each job completes when a callback is given (nothing is then retained).
+        """
+        all_ipos = []
+        
+        def handle_result(key, data, error):
+            ticker = key[1]
+            if error:
+                logger.error(f"Error processing {ticker}: {error}")
+            elif data:
+                if on_record:
+                    on_record(key, data)
+                else:
+                    all_ipos.append(data)
+                logger.info(f"Successfully fetched data for {ticker}")
+            else:
+                logger.warning(f"No data returned for {ticker}")
+        
+        # Requests are paced by the engine's per-host token bucket
+        self.fetch_engine.run(jobs, on_result=handle_result, collect=False)
         return all_ipos
     
     def _get_primary_exchange_for_country_group(self, region: str, country_group: str) -> str:
@@ -370,25 +455,54 @@ class GlobalIPODataFetcher:
         return exchange_mapping.get(region, {}).get(country_group, 'Unknown')
     
     def fetch_all_global_ipos(self, max_per_region: int = 50) -> List[Dict]:
-        """Fetch IPO data from all global regions"""
+        """Fetch IPO data from all global regions through a single work queue"""
+        all_ipos = []
+        try:
+            self.stream_all_global_ipos(max_per_region, lambda key, data: all_ipos.append(data))
+        except Exception as e:
+            logger.error(f"Error fetching global IPOs: {e}")
+        return all_ipos
+    
+    def stream_all_global_ipos(self, max_per_region: int, on_record: Callable[[Tuple, Dict], None],
+                               completed_keys: Iterable[Tuple] = ()) -> Dict[str, int]:
+        """
+        Fetch all global regions, handing each record to on_record(key, record) as it arrives
+        
+        Args:
+            max_per_region: Maximum number of IPOs to fetch per region
+            on_record: Callback receiving the job key (region, ticker, exchange) and record
+            completed_keys: Job keys already stored by an interrupted run, which are skipped
+            
+        Returns:
+            Number of records fetched per region
+        """
         logger.info("Starting global IPO data fetch")
         
-        all_ipos = []
+        regions = ['Americas', 'EMEA', 'APAC']
+        region_counts = {region: 0 for region in regions}
+        self.ticker_health.reset_run()
         
-        for region in ['Americas', 'EMEA', 'APAC']:
-            try:
-                region_ipos = self.fetch_regional_ipos(region, max_per_region // 3)
-                all_ipos.extend(region_ipos)
-                logger.info(f"Fetched {len(region_ipos)} IPOs from {region}")
-                
-                # Rate limiting between regions
-                time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"Error fetching IPOs for {region}: {e}")
+        def count_and_forward(key, data):
+            region_counts[key[0]] = region_counts.get(key[0], 0) + 1
+            on_record(key, data)
         
-        logger.info(f"Total IPOs fetched: {len(all_ipos)}")
-        return all_ipos
+        jobs = self._build_fetch_jobs(regions, max_per_region // 3)
+        completed_keys = set(completed_keys)
+        if completed_keys:
+            jobs = [job for job in jobs if job.key not in completed_keys]
+            logger.info(f"Resuming from checkpoint: {len(completed_keys)} tickers already stored, "
+                        f"{len(jobs)} remaining")
+        # Errors raised by on_record (e.g. a failed batch write) propagate to the caller
+        self._run_fetch_jobs(jobs, on_record=count_and_forward)
+        
+        for region, region_count in region_counts.items():
+            logger.info(f"Fetched {region_count} IPOs from {region}")
+        
+        if self.ticker_health.skipped:
+            logger.info(f"Skipped {len(self.ticker_health.skipped)} tickers: {self.ticker_health.skipped_summary()}")
+        
+        logger.info(f"Total IPOs fetched: {sum(region_counts.values())}")
+        return region_counts
     
     def get_exchange_list_by_region(self, region: str) -> List[str]:
         """Get list of exchanges for a specific region"""
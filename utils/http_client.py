@@ -0,0 +1,145 @@
+"""
+Shared HTTP Client for IPO Analytics
+One connection-pooled, keep-alive session per process for yfinance and every
+other outbound integration, with counters of how often connections are reused
+"""
+
+import os
+import threading
+import logging
+from collections import defaultdict
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from curl_cffi import CurlInfo, CurlOpt
+from curl_cffi import requests as curl_requests
+
+from fetch_engine import DEFAULT_MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# Hosts kept in the pool at once, and open connections kept per host; the
+# per-host size matches the fetch engine's concurrency ceiling so no call waits on a socket
+HTTP_POOL_HOSTS = int(os.environ.get('IPO_HTTP_POOL_HOSTS', 16))
+HTTP_POOL_MAXSIZE = int(os.environ.get('IPO_HTTP_POOL_MAXSIZE', DEFAULT_MAX_CONCURRENCY))
+
+# Browser profile the yfinance session presents; Yahoo rejects plain HTTP clients
+YFINANCE_IMPERSONATE = os.environ.get('IPO_YFINANCE_IMPERSONATE', 'chrome')
+
+
+class ConnectionStats:
+    """Requests and newly opened connections per host"""
+
+    def __init__(self):
+        self._counts = defaultdict(lambda: {'requests': 0, 'new_connections': 0})
+        self._lock = threading.Lock()
+
+    def record(self, host: str, requests_made: int, new_connections: int):
+        with self._lock:
+            self._counts[host]['requests'] += requests_made
+            self._counts[host]['new_connections'] += new_connections
+
+    def snapshot(self, live: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """Counts per host with reused connections and the reuse rate, adding counts of still-open pools"""
+        with self._lock:
+            counts = {host: dict(c) for host, c in self._counts.items()}
+        for host, c in (live or {}).items():
+            total = counts.setdefault(host, {'requests': 0, 'new_connections': 0})
+            total['requests'] += c['requests']
+            total['new_connections'] += c['new_connections']
+        for c in counts.values():
+            c['reused'] = max(0, c['requests'] - c['new_connections'])
+            c['reuse_rate'] = c['reused'] / c['requests'] if c['requests'] else 0.0
+        return counts
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose urllib3 pools keep their request and connection counts when evicted"""
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        pools = self.poolmanager.pools
+        dispose = pools.dispose_func
+
+        def retire(pool):
+            self.stats.record(pool.host, pool.num_requests, pool.num_connections)
+            dispose(pool)
+
+        pools.dispose_func = retire
+
+    def live_counts(self) -> Dict[str, Dict]:
+        """Counts of the pools currently open, per host"""
+        counts = defaultdict(lambda: {'requests': 0, 'new_connections': 0})
+        for key in list(self.poolmanager.pools.keys()):
+            pool = self.poolmanager.pools.get(key)
+            if pool is not None:
+                counts[pool.host]['requests'] += pool.num_requests
+                counts[pool.host]['new_connections'] += pool.num_connections
+        return counts
+
+
+class CountingCurlSession(curl_requests.Session):
+    """curl_cffi session that records whether each request opened a new connection"""
+
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        self.stats = stats
+        super().__init__(curl_infos=[CurlInfo.NUM_CONNECTS], **kwargs)
+
+    def request(self, method, url, *args, **kwargs):
+        response = super().request(method, url, *args, **kwargs)
+        self.stats.record(urlparse(url).hostname, 1, response.infos.get(CurlInfo.NUM_CONNECTS, 1))
+        return response
+
+
+_stats = ConnectionStats()
+_session: Optional[requests.Session] = None
+_adapter: Optional[PooledHTTPAdapter] = None
+_yfinance_session: Optional[CountingCurlSession] = None
+_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide requests session for SEC, Tavily and other JSON APIs"""
+    global _session, _adapter
+    with _lock:
+        if _session is None:
+            _adapter = PooledHTTPAdapter(_stats, pool_connections=HTTP_POOL_HOSTS,
+                                         pool_maxsize=HTTP_POOL_MAXSIZE)
+            _session = requests.Session()
+            _session.mount('https://', _adapter)
+            _session.mount('http://', _adapter)
+            _session.headers.update({'Accept-Encoding': ACCEPT_ENCODING, 'Connection': 'keep-alive'})
+        return _session
+
+
+def get_yfinance_session() -> CountingCurlSession:
+    """Process-wide session passed to every yfinance Ticker and download call"""
+    global _yfinance_session
+    with _lock:
+        if _yfinance_session is None:
+            # Each fetch thread gets its own curl handle; MAXCONNECTS bounds the connections it keeps alive
+            _yfinance_session = CountingCurlSession(
+                _stats, impersonate=YFINANCE_IMPERSONATE,
+                curl_options={CurlOpt.MAXCONNECTS: HTTP_POOL_HOSTS}
+            )
+        return _yfinance_session
+
+
+def connection_stats() -> Dict[str, Dict]:
+    """
+    Connection reuse per host across both shared sessions
+
+    Returns:
+        Dictionary of host to requests, new_connections, reused and reuse_rate
+    """
+    with _lock:
+        adapter = _adapter
+    return _stats.snapshot(adapter.live_counts() if adapter else None)
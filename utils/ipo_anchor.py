@@ -0,0 +1,240 @@
+"""
+IPO Anchor Detection for IPO Analytics
+Finds a ticker's first trading date and first close from a small window of
+bars instead of the full price history, and caches the anchor permanently
+"""
+
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+import yfinance as yf
+
+from transport import get_transport
+from http_client import get_yfinance_session
+
+logger = logging.getLogger(__name__)
+
+# Calendar days of bars requested from the first trading date
+ANCHOR_WINDOW_DAYS = 10
+
+# Recent bars requested for the latest quote; also scanned for splits that
+# would change the split-adjusted first close
+LATEST_WINDOW = "1mo"
+
+# Corporate actions that re-base Yahoo's adjusted history, and so the cached first close
+ADJUSTING_ACTIONS = ('Stock Splits', 'Dividends')
+
+
+class IPOAnchorDetector:
+    """Detects and permanently caches the IPO date and first close of a ticker"""
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.reset_stats()
+        self.init_cache()
+
+    def init_cache(self):
+        """Create the anchor table if needed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ipo_anchors (
+                    ticker TEXT PRIMARY KEY,
+                    ipo_date TEXT NOT NULL,
+                    ipo_price REAL NOT NULL,
+                    detected_at TEXT NOT NULL,
+                    checked_at TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+
+    def reset_stats(self):
+        """Reset the per-run counters"""
+        with self._lock:
+            self.stats = {'cached': 0, 'detected': 0, 'repriced': 0, 'failed': 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def lookup(self, ticker: str) -> Optional[Dict]:
+        """Cached anchor for a ticker without any network call, or None"""
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            row = conn.execute(
+                "SELECT ipo_date, ipo_price, checked_at FROM ipo_anchors WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        if not row:
+            return None
+        self._count('cached')
+        return {'ipo_date': row[0], 'ipo_price': row[1], 'checked_at': row[2]}
+
+    def get_anchor(self, ticker: str) -> Optional[Dict]:
+        """
+        IPO date and first close for a ticker, detected once and then served from cache
+
+        A failed firstTradeDate lookup falls back to the full history; errors
+        from the bar downloads themselves are raised to the caller.
+
+        Returns:
+            Dictionary with ipo_date (YYYY-MM-DD), ipo_price and checked_at, or
+            None if the ticker has no trading history
+        """
+        cached = self.lookup(ticker)
+        if cached:
+            return cached
+
+        try:
+            ipo_date = self._first_trade_date(ticker)
+        except Exception as e:
+            logger.warning(f"No firstTradeDate for {ticker}, reading the full history: {e}")
+            ipo_date = None
+        bars = self._anchor_window(ticker, ipo_date) if ipo_date else None
+        if bars is None or bars.empty:
+            # No usable first trade date; fall back to the full history once
+            bars = self._download(ticker, period="max")
+
+        if bars.empty:
+            self._count('failed')
+            return None
+
+        anchor = {
+            'ipo_date': bars.index[0].strftime('%Y-%m-%d'),
+            'ipo_price': float(bars['Close'].iloc[0]),
+            'checked_at': datetime.now().isoformat(),
+        }
+        self._write(ticker, anchor)
+        self._count('detected')
+        return anchor
+
+    def validate(self, ticker: str, anchor: Dict, recent: pd.DataFrame) -> Dict:
+        """
+        Keep the cached first close in line with split and dividend adjustments
+
+        recent holds the latest bars (with 'Stock Splits' and 'Dividends'
+        columns when available). Yahoo's history is adjusted for both, so if
+        either falls after the last check, or the bars don't reach back to it,
+        the anchor window is re-read for the adjusted close. The IPO date
+        itself never changes.
+        """
+        checked_at = pd.Timestamp(anchor['checked_at']).normalize()
+        covered = not recent.empty and recent.index[0] <= checked_at
+        actions = [column for column in ADJUSTING_ACTIONS if column in recent.columns
+                   and (recent.loc[recent.index >= checked_at, column].fillna(0) != 0).any()]
+
+        now = datetime.now().isoformat()
+        if covered and not actions:
+            self._mark_checked(ticker, now)
+            return dict(anchor, checked_at=now)
+
+        try:
+            bars = self._anchor_window(ticker, anchor['ipo_date'])
+        except Exception as e:
+            logger.error(f"Error re-reading IPO anchor for {ticker}: {e}")
+            return anchor
+        if bars.empty:
+            return anchor
+
+        repriced = dict(anchor, ipo_price=float(bars['Close'].iloc[0]), checked_at=now)
+        if actions:
+            logger.info(f"{' and '.join(actions)} since the last check for {ticker}, "
+                        f"IPO price re-read from the anchor window")
+        self._write(ticker, repriced, keep_detected_at=True)
+        self._count('repriced')
+        return repriced
+
+    def latest_bars(self, ticker: str) -> pd.DataFrame:
+        """Recent daily bars, including split actions, for the latest quote"""
+        return self._download(ticker, period=LATEST_WINDOW, actions=True)
+
+    def get(self, ticker: str) -> Optional[Dict]:
+        """
+        Anchor plus latest quote for one ticker
+
+        Returns:
+            Dictionary with ipo_date, ipo_price, current_price, volume and
+            last_date, or None if either part is unavailable
+        """
+        anchor = self.get_anchor(ticker)
+        if not anchor:
+            return None
+        recent = self.latest_bars(ticker)
+        if recent.empty:
+            return None
+        anchor = self.validate(ticker, anchor, recent)
+        last = recent.iloc[-1]
+        return {
+            'ipo_date': anchor['ipo_date'],
+            'ipo_price': anchor['ipo_price'],
+            'current_price': float(last['Close']),
+            'volume': int(last['Volume']) if pd.notna(last['Volume']) else 0,
+            'last_date': recent.index[-1].strftime('%Y-%m-%d'),
+        }
+
+    def report(self) -> Dict:
+        """Log and return the counters for this run"""
+        with self._lock:
+            stats = dict(self.stats)
+        logger.info(f"IPO anchors: {stats['cached']} cached, {stats['detected']} detected, "
+                    f"{stats['repriced']} repriced, {stats['failed']} failed")
+        return stats
+
+    def _first_trade_date(self, ticker: str) -> Optional[str]:
+        def load():
+            first_trade = yf.Ticker(ticker, session=get_yfinance_session()).get_history_metadata().get('firstTradeDate')
+            # Timestamp in the exchange's timezone, so the date is the local listing date
+            return first_trade.strftime('%Y-%m-%d') if first_trade is not None else None
+
+        return get_transport().call('yfinance', 'first_trade_date', {'ticker': ticker}, load)
+
+    def _anchor_window(self, ticker: str, ipo_date: str) -> pd.DataFrame:
+        start = datetime.strptime(ipo_date, '%Y-%m-%d')
+        end = start + timedelta(days=ANCHOR_WINDOW_DAYS)
+        return self._download(ticker, start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'))
+
+    def _download(self, ticker: str, **kwargs) -> pd.DataFrame:
+        hist = get_transport().call('yfinance', 'history', {'ticker': ticker, **kwargs},
+                                    lambda: yf.Ticker(ticker, session=get_yfinance_session()).history(**kwargs))
+        if hist is None or hist.empty:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        hist = hist.dropna(subset=['Close'])
+        index = pd.DatetimeIndex(hist.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        hist = hist.copy()
+        hist.index = index.normalize()
+        return hist
+
+    def _write(self, ticker: str, anchor: Dict, keep_detected_at: bool = False):
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            if keep_detected_at:
+                conn.execute(
+                    "UPDATE ipo_anchors SET ipo_price = ?, checked_at = ? WHERE ticker = ?",
+                    (anchor['ipo_price'], anchor['checked_at'], ticker)
+                )
+            else:
+                conn.execute('''
+                    INSERT OR REPLACE INTO ipo_anchors (ticker, ipo_date, ipo_price, detected_at, checked_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (ticker, anchor['ipo_date'], anchor['ipo_price'], anchor['checked_at'], anchor['checked_at']))
+            conn.commit()
+
+    def _mark_checked(self, ticker: str, checked_at: str):
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.execute("UPDATE ipo_anchors SET checked_at = ? WHERE ticker = ?", (checked_at, ticker))
+            conn.commit()
+
+    def clear(self, ticker: str = None):
+        """Drop cached anchors for one ticker or for all tickers"""
+        with sqlite3.connect(self.db_path) as conn:
+            if ticker:
+                conn.execute("DELETE FROM ipo_anchors WHERE ticker = ?", (ticker,))
+            else:
+                conn.execute("DELETE FROM ipo_anchors")
+            conn.commit()
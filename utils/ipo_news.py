@@ -8,7 +8,9 @@ import logging
 import pandas as pd
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
-import requests
+
+from transport import get_transport
+from http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -87,10 +89,13 @@ class IPONewsSearcher:
                 ]
             }
             
-            response = requests.post(self.base_url, json=payload, timeout=10)
-            response.raise_for_status()
+            def fetch():
+                response = get_http_session().post(self.base_url, json=payload, timeout=10)
+                response.raise_for_status()
+                return response.json()
             
-            data = response.json()
+            params = {k: v for k, v in payload.items() if k != 'api_key'}
+            data = get_transport().call('tavily', 'search', params, fetch)
             articles = []
             
             for result in data.get('results', []):
@@ -0,0 +1,308 @@
+"""
+Upcoming IPO Pipeline for IPO Analytics
+Keeps upcoming IPOs from the SEC, Exa and curated sources in one table keyed
+by normalized company name, with the expected date parsed into sortable
+columns and a history of status changes, merged incrementally per source
+"""
+
+import re
+import json
+import sqlite3
+import logging
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sec_tickers import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Pipeline entries are re-merged from the research sources once they are this old
+PIPELINE_TTL = timedelta(hours=6)
+
+# Values sources use for an unknown field; they never overwrite a known one
+UNKNOWN_VALUES = {None, '', 'TBD', 'N/A', 'Unknown'}
+
+# Status given to an entry whose expected period ended without a source moving it,
+# and the one it returns to when a source later reports a new date
+EXPIRED_STATUS = 'Expired'
+REOPENED_STATUS = 'Announced'
+
+# Month names and their three-letter abbreviations
+MONTHS = {key: i for i, name in enumerate(
+    ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+     'august', 'september', 'october', 'november', 'december'], start=1) for key in (name, name[:3])}
+
+# Period formats as (pattern, groups -> (year, first month, last month) or None)
+PERIOD_PATTERNS = [
+    (r'Q([1-4])\s+(\d{4})', lambda q, y: (int(y), int(q) * 3 - 2, int(q) * 3)),
+    (r'H([12])\s+(\d{4})', lambda h, y: (int(y), int(h) * 6 - 5, int(h) * 6)),
+    (r'([a-z]+)\.?\s+(\d{4})', lambda m, y: (int(y), MONTHS[m.lower()], MONTHS[m.lower()])
+     if m.lower() in MONTHS else None),
+    (r'(\d{4})', lambda y: (int(y), 1, 12)),
+]
+
+
+def _month_end(year: int, month: int) -> date:
+    return date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+
+
+def parse_expected_date(text: Optional[str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Parse an expected IPO date into (start, end, sort) ISO dates
+
+    Understands exact dates ("2025-10-15", "10/15/2025"), quarters
+    ("Q2 2025"), halves ("H1 2026"), months ("October 2025") and bare years.
+    The sort date of a period is the 15th of its middle month. Anything else,
+    including "TBD", parses to (None, None, None).
+    """
+    if not text or str(text).strip() in UNKNOWN_VALUES:
+        return None, None, None
+    text = str(text).strip()
+
+    match = re.fullmatch(r'(\d{4})-(\d{2})-(\d{2})', text) or re.fullmatch(r'(\d{1,2})/(\d{1,2})/(\d{4})', text)
+    if match:
+        parts = [int(p) for p in match.groups()]
+        try:
+            day = date(*parts) if len(match.group(1)) == 4 else date(parts[2], parts[0], parts[1])
+        except ValueError:
+            return None, None, None
+        return day.isoformat(), day.isoformat(), day.isoformat()
+
+    for pattern, period in PERIOD_PATTERNS:
+        match = re.fullmatch(pattern, text, re.IGNORECASE)
+        if match and period(*match.groups()):
+            year, first, last = period(*match.groups())
+            break
+    else:
+        return None, None, None
+
+    start, end = date(year, first, 1), _month_end(year, last)
+    sort = date(year, (first + last) // 2, 15)
+    return start.isoformat(), end.isoformat(), sort.isoformat()
+
+
+class IPOPipelineStore:
+    """Upcoming IPOs keyed by normalized company name, with status history"""
+
+    # ipo_pipeline columns copied from a source record under the same key
+    FIELDS = ('company_name', 'exchange', 'sector', 'status', 'estimated_valuation', 'description')
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.init_tables()
+
+    def init_tables(self):
+        """Create the pipeline and status history tables if needed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ipo_pipeline (
+                    normalized_name TEXT PRIMARY KEY,
+                    company_name TEXT NOT NULL,
+                    exchange TEXT,
+                    sector TEXT,
+                    status TEXT,
+                    estimated_valuation TEXT,
+                    description TEXT,
+                    expected_date TEXT,
+                    expected_start TEXT,
+                    expected_end TEXT,
+                    expected_sort TEXT,
+                    sources TEXT NOT NULL,
+                    first_seen TEXT NOT NULL,
+                    last_seen TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_ipo_pipeline_sort ON ipo_pipeline (expected_sort)")
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ipo_pipeline_status_history (
+                    normalized_name TEXT NOT NULL,
+                    status TEXT,
+                    source TEXT NOT NULL,
+                    observed_at TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_ipo_pipeline_history_name
+                ON ipo_pipeline_status_history (normalized_name, observed_at)
+            ''')
+            conn.commit()
+
+    def merge(self, records: Iterable[Dict], source: str) -> Dict:
+        """
+        Merge one source's upcoming IPO records into the pipeline
+
+        Known fields are only overwritten by known values, so a source that
+        reports "TBD" never erases a date another source provided. A status
+        change is appended to the status history. Entries whose expected
+        period has ended are then marked expired (see expire_past).
+
+        Args:
+            records: Dictionaries with company_name and optionally expected_date,
+                exchange, sector, status, estimated_valuation and description
+            source: Source name recorded in sources and the status history
+
+        Returns:
+            Dictionary with inserted, updated and unchanged counts
+        """
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        now = datetime.now().isoformat()
+
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            for record in records:
+                key = normalize_name(record.get('company_name', ''))
+                if not key:
+                    continue
+                incoming = {field: record.get(field) for field in self.FIELDS
+                            if record.get(field) not in UNKNOWN_VALUES}
+                if record.get('expected_date') not in UNKNOWN_VALUES:
+                    incoming['expected_date'] = str(record['expected_date'])
+                    (incoming['expected_start'], incoming['expected_end'],
+                     incoming['expected_sort']) = parse_expected_date(incoming['expected_date'])
+
+                row = conn.execute(
+                    f"SELECT {', '.join(self.FIELDS)}, expected_date, sources FROM ipo_pipeline "
+                    f"WHERE normalized_name = ?", (key,)
+                ).fetchone()
+
+                if row is None:
+                    incoming.setdefault('company_name', record['company_name'])
+                    columns = ['normalized_name', *incoming, 'sources', 'first_seen', 'last_seen', 'updated_at']
+                    conn.execute(
+                        f"INSERT INTO ipo_pipeline ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                        [key, *incoming.values(), json.dumps([source]), now, now, now]
+                    )
+                    if incoming.get('status'):
+                        conn.execute(
+                            "INSERT INTO ipo_pipeline_status_history (normalized_name, status, source, observed_at) "
+                            "VALUES (?, ?, ?, ?)", (key, incoming['status'], source, now)
+                        )
+                    counts['inserted'] += 1
+                    continue
+
+                current = dict(zip([*self.FIELDS, 'expected_date'], row[:-1]))
+                sources = json.loads(row[-1])
+                # The first spelling of a company's name stays its display name
+                changes = {field: value for field, value in incoming.items()
+                           if field in current and field != 'company_name' and current[field] != value}
+                if 'expected_date' in changes:
+                    changes.update({f: incoming[f] for f in ('expected_start', 'expected_end', 'expected_sort')})
+                    if current['status'] == EXPIRED_STATUS and 'status' not in incoming:
+                        changes['status'] = REOPENED_STATUS
+                if source not in sources:
+                    sources.append(source)
+                    changes['sources'] = json.dumps(sources)
+
+                if changes:
+                    changes['updated_at'] = now
+                    counts['updated'] += 1
+                else:
+                    counts['unchanged'] += 1
+                changes['last_seen'] = now
+                conn.execute(
+                    f"UPDATE ipo_pipeline SET {', '.join(f'{c} = ?' for c in changes)} WHERE normalized_name = ?",
+                    [*changes.values(), key]
+                )
+                if 'status' in changes:
+                    conn.execute(
+                        "INSERT INTO ipo_pipeline_status_history (normalized_name, status, source, observed_at) "
+                        "VALUES (?, ?, ?, ?)", (key, changes['status'], source, now)
+                    )
+            conn.commit()
+
+        self.expire_past()
+        logger.info(f"IPO pipeline merge from {source}: {counts['inserted']} new, "
+                    f"{counts['updated']} updated, {counts['unchanged']} unchanged")
+        return counts
+
+    def expire_past(self, today: Optional[date] = None) -> int:
+        """
+        Mark entries whose expected period ended before today as expired
+
+        Nothing in the pipeline says whether such a company listed or slipped,
+        so the status records only that the date passed; a source reporting a
+        new date reopens the entry on its next merge.
+
+        Returns:
+            Number of entries expired
+        """
+        today = (today or date.today()).isoformat()
+        now = datetime.now().isoformat()
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            keys = [row[0] for row in conn.execute(
+                "SELECT normalized_name FROM ipo_pipeline "
+                "WHERE expected_end < ? AND (status IS NULL OR status != ?)", (today, EXPIRED_STATUS)
+            ).fetchall()]
+            conn.executemany("UPDATE ipo_pipeline SET status = ?, updated_at = ? WHERE normalized_name = ?",
+                             [(EXPIRED_STATUS, now, key) for key in keys])
+            conn.executemany(
+                "INSERT INTO ipo_pipeline_status_history (normalized_name, status, source, observed_at) "
+                "VALUES (?, ?, ?, ?)", [(key, EXPIRED_STATUS, 'pipeline', now) for key in keys]
+            )
+            conn.commit()
+        if keys:
+            logger.info(f"IPO pipeline: {len(keys)} entries past their expected date marked expired")
+        return len(keys)
+
+    def last_merged(self) -> Optional[datetime]:
+        """When any source was last merged, or None for an empty pipeline"""
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            row = conn.execute("SELECT MAX(last_seen) FROM ipo_pipeline").fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def is_stale(self) -> bool:
+        """Whether the pipeline is empty or older than PIPELINE_TTL"""
+        last = self.last_merged()
+        return last is None or datetime.now() - last > PIPELINE_TTL
+
+    def upcoming(self, limit: int = 10, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """
+        Pipeline entries still ahead, ordered by expected date, undated ones last
+
+        Entries whose expected period ended before today are left out.
+
+        Args:
+            limit: Maximum number of entries
+            start: Earliest expected sort date (ISO), inclusive
+            end: Latest expected sort date (ISO), inclusive
+
+        Returns:
+            List of dictionaries with company_name, expected_date, exchange,
+            sector, status, estimated_valuation and description
+        """
+        columns = "company_name, expected_date, exchange, sector, status, estimated_valuation, description"
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            # Range scan over the expected_sort index; undated entries fill any remaining slots
+            rows = conn.execute(f'''
+                SELECT {columns} FROM ipo_pipeline
+                WHERE expected_sort >= ? AND expected_sort <= ? AND expected_end >= ?
+                ORDER BY expected_sort LIMIT ?
+            ''', (start or '0000-01-01', end or '9999-12-31', date.today().isoformat(), limit)).fetchall()
+            if len(rows) < limit and start is None and end is None:
+                rows += conn.execute(f'''
+                    SELECT {columns} FROM ipo_pipeline WHERE expected_sort IS NULL
+                    ORDER BY company_name LIMIT ?
+                ''', (limit - len(rows),)).fetchall()
+
+        return [{
+            "company_name": company_name,
+            "expected_date": expected_date or "TBD",
+            "exchange": exchange or "TBD",
+            "sector": sector or "TBD",
+            "status": status or "Announced",
+            "estimated_valuation": estimated_valuation or "TBD",
+            "description": description or ""
+        } for company_name, expected_date, exchange, sector, status, estimated_valuation, description in rows]
+
+    def status_history(self, company_name: str) -> List[Dict]:
+        """Status changes of a company, oldest first"""
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute('''
+                SELECT status, source, observed_at FROM ipo_pipeline_status_history
+                WHERE normalized_name = ? ORDER BY observed_at
+            ''', (normalize_name(company_name),)).fetchall()
+        return [{'status': status, 'source': source, 'observed_at': observed_at}
+                for status, source, observed_at in rows]
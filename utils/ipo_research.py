@@ -4,39 +4,76 @@ Combines Exa.ai search and SEC EDGAR data to provide comprehensive upcoming IPO
 """
 
 import os
-from typing import List, Dict, Any, Optional
+import sys
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 import json
 
-# Import our custom utilities
-try:
-    from .exa_util import ExaIPOSearch
-    from .sec_util import SECUtil
-except ImportError:
-    # Handle direct execution
-    import sys
-    import os
-    sys.path.append(os.path.dirname(__file__))
-    from exa_util import ExaIPOSearch
-    from sec_util import SECUtil
+sys.path.append(os.path.dirname(__file__))
+
+from exa_util import ExaIPOSearch
+from sec_util import SECUtil
+from ipo_pipeline import IPOPipelineStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds each research source may take before it is reported as late
+SOURCE_TIMEOUTS = {
+    "sec_upcoming": 5,
+    "sec_filings": 15,
+    "exa_upcoming": 10,
+    "exa_news": 10,
+}
+
+# Seconds get_comprehensive_ipo_data waits overall before returning what has finished
+DEFAULT_LATENCY_BUDGET = float(os.getenv('IPO_RESEARCH_BUDGET_SECONDS', 12))
+
+# Shared so a late source keeps running in the background instead of blocking the caller
+_research_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ipo-research")
+
+# Latest run of each (database, source); a source still running is joined rather than
+# started again, so a slow source never holds more than one executor slot
+_source_runs: Dict[Tuple[str, str], Future] = {}
+_source_runs_lock = threading.Lock()
+
+
+def _timed_call(call, edgar_cache):
+    """Run a research source and return its result, the seconds it took and the EDGAR requests it made"""
+    began = time.monotonic()
+    with edgar_cache.track() as edgar:
+        data = call()
+    return data, time.monotonic() - began, edgar
+
+
+def _submit_source(key: Tuple[str, str], call, edgar_cache) -> Future:
+    """Start a research source, or return its run still in flight from an earlier call"""
+    with _source_runs_lock:
+        future = _source_runs.get(key)
+        if future is None or future.done():
+            future = _research_executor.submit(_timed_call, call, edgar_cache)
+            _source_runs[key] = future
+        return future
+
 class IPOResearcher:
     """Combined IPO research using multiple data sources"""
     
-    def __init__(self, exa_api_key: str = None):
+    def __init__(self, exa_api_key: str = None, db_path: str = "data/ipo_analytics.db"):
         """
         Initialize IPO researcher with data sources
         
         Args:
             exa_api_key (str): Exa API key for search functionality
+            db_path (str): SQLite database holding the SEC indexes and the IPO pipeline
         """
         self.exa_api_key = exa_api_key or os.getenv('EXA_API_KEY')
-        self.sec_util = SECUtil()
+        self.sec_util = SECUtil(db_path)
+        self.pipeline = IPOPipelineStore(db_path)
         
         if self.exa_api_key:
             self.exa_search = ExaIPOSearch(self.exa_api_key)
@@ -44,58 +81,90 @@ class IPOResearcher:
             self.exa_search = None
             logger.warning("Exa API key not provided - search functionality will be limited")
     
-    def get_comprehensive_ipo_data(self) -> Dict[str, List[Dict[str, Any]]]:
+    def get_comprehensive_ipo_data(self, latency_budget: float = DEFAULT_LATENCY_BUDGET) -> Dict[str, Any]:
         """
         Get comprehensive upcoming IPO data from multiple sources
         
+        All sources are queried concurrently. Each gets its SOURCE_TIMEOUTS
+        entry, capped by the overall latency budget; a source that has not
+        finished by then is left out of this result and flagged as late. A
+        late upcoming-IPO source is merged into the pipeline when it finishes,
+        and a source still running from an earlier call is joined, not rerun.
+        
+        Args:
+            latency_budget (float): Seconds to wait for sources before returning
+            
         Returns:
-            Dictionary containing upcoming IPOs from different sources
+            Dictionary containing upcoming IPOs from different sources, plus
+            "sources" (status, latency and count per source) and "late_sources".
+            The summary's "edgar_cache" counts the EDGAR requests of the source
+            runs this result includes, joined runs among them.
         """
         results = {
             "upcoming_ipos": [],
             "recent_filings": [],
             "news_articles": [],
+            "sources": {},
+            "late_sources": [],
             "summary": {}
         }
         
-        # Get data from SEC EDGAR
-        try:
-            sec_upcoming = self.sec_util.get_upcoming_ipos()
-            sec_filings = self.sec_util.search_s1_filings()
-            
-            results["upcoming_ipos"].extend(sec_upcoming)
-            results["recent_filings"].extend(sec_filings)
-            
-            logger.info(f"Retrieved {len(sec_upcoming)} upcoming IPOs from SEC")
-            logger.info(f"Retrieved {len(sec_filings)} recent S-1 filings from SEC")
-            
-        except Exception as e:
-            logger.error(f"Error retrieving SEC data: {e}")
-        
-        # Get data from Exa.ai search
+        # Source name -> (call, result list it feeds), in the order results are merged
+        sources = {
+            "sec_upcoming": (self.sec_util.get_upcoming_ipos, "upcoming_ipos"),
+            "sec_filings": (self.sec_util.search_s1_filings, "recent_filings"),
+        }
         if self.exa_search:
+            sources["exa_upcoming"] = (self.exa_search.search_upcoming_ipos, "upcoming_ipos")
+            sources["exa_news"] = (self.exa_search.search_recent_ipo_news, "news_articles")
+        
+        edgar_cache = self.sec_util.edgar_cache
+        edgar = {'fresh_hits': 0, 'not_modified': 0, 'downloads': 0}
+        start = time.monotonic()
+        futures = {name: _submit_source((self.pipeline.db_path, name), call, edgar_cache)
+                   for name, (call, _) in sources.items()}
+        
+        for name, (_, result_key) in sources.items():
+            deadline = start + min(SOURCE_TIMEOUTS.get(name, latency_budget), latency_budget)
             try:
-                exa_upcoming = self.exa_search.search_upcoming_ipos()
-                exa_news = self.exa_search.search_recent_ipo_news()
-                
-                results["upcoming_ipos"].extend(exa_upcoming)
-                results["news_articles"].extend(exa_news)
-                
-                logger.info(f"Retrieved {len(exa_upcoming)} upcoming IPOs from Exa search")
-                logger.info(f"Retrieved {len(exa_news)} news articles from Exa search")
-                
+                data, latency, source_edgar = futures[name].result(timeout=max(0.0, deadline - time.monotonic()))
+            except FuturesTimeout:
+                results["sources"][name] = {"status": "late", "latency": None, "count": 0}
+                results["late_sources"].append(name)
+                logger.warning(f"Research source {name} missed its deadline, continuing without it")
+                if result_key == "upcoming_ipos":
+                    futures[name].add_done_callback(lambda future, name=name: self._merge_late(name, future))
+                continue
             except Exception as e:
-                logger.error(f"Error retrieving Exa data: {e}")
+                results["sources"][name] = {"status": "failed", "latency": None, "count": 0, "error": str(e)}
+                logger.error(f"Error retrieving {name} data: {e}")
+                continue
+            
+            for outcome, count in source_edgar.items():
+                edgar[outcome] += count
+            data = data or []
+            results[result_key].extend(data)
+            if result_key == "upcoming_ipos":
+                self.pipeline.merge(data, name)
+            results["sources"][name] = {
+                "status": "ok",
+                "latency": round(latency, 3),
+                "count": len(data)
+            }
+            logger.info(f"Retrieved {len(data)} {result_key.replace('_', ' ')} from {name}")
         
         # Add some curated upcoming IPOs based on recent market intelligence
         curated_ipos = self._get_curated_upcoming_ipos()
         results["upcoming_ipos"].extend(curated_ipos)
+        self.pipeline.merge(curated_ipos, "curated")
         
         # Create summary
         results["summary"] = {
             "total_upcoming_ipos": len(results["upcoming_ipos"]),
             "total_recent_filings": len(results["recent_filings"]),
             "total_news_articles": len(results["news_articles"]),
+            "late_sources": list(results["late_sources"]),
+            "edgar_cache": edgar_cache.report(edgar),
             "last_updated": datetime.now().isoformat()
         }
         
@@ -104,6 +173,15 @@ class IPOResearcher:
         
         return results
     
+    def _merge_late(self, name: str, future: Future):
+        """Merge the upcoming IPOs of a source that finished after its deadline into the pipeline"""
+        if future.exception() is not None:
+            logger.error(f"Late research source {name} failed: {future.exception()}")
+            return
+        data, latency, _ = future.result()
+        self.pipeline.merge(data or [], name)
+        logger.info(f"Late research source {name} finished after {latency:.1f}s, merged into the pipeline")
+    
     def _get_curated_upcoming_ipos(self) -> List[Dict[str, Any]]:
         """
         Get curated list of upcoming IPOs based on market intelligence
@@ -186,7 +264,7 @@ class IPOResearcher:
     
     def get_upcoming_ipos_for_display(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
-        Get formatted upcoming IPO data for display in the application
+        Get formatted upcoming IPO data for display in the application, ordered by expected date
         
         Args:
             limit (int): Maximum number of IPOs to return
@@ -194,47 +272,11 @@ class IPOResearcher:
         Returns:
             List of formatted IPO data for display
         """
-        comprehensive_data = self.get_comprehensive_ipo_data()
-        upcoming_ipos = comprehensive_data["upcoming_ipos"]
-        
-        # Sort by expected date (putting TBD dates at the end)
-        def sort_key(ipo):
-            date_str = ipo.get("expected_date", "TBD")
-            if date_str == "TBD":
-                return "9999-12-31"  # Put TBD dates at the end
-            # Try to parse various date formats
-            try:
-                if "Q" in date_str and "202" in date_str:
-                    # Quarter format like "Q2 2025"
-                    quarter, year = date_str.split()
-                    quarter_num = int(quarter[1])
-                    month = (quarter_num - 1) * 3 + 2  # Middle month of quarter
-                    return f"{year}-{month:02d}-15"
-                elif "/" in date_str or "-" in date_str:
-                    # Date format
-                    return date_str
-                else:
-                    return date_str
-            except:
-                return "9999-12-31"
-        
-        sorted_ipos = sorted(upcoming_ipos, key=sort_key)
-        
-        # Format for display
-        display_ipos = []
-        for ipo in sorted_ipos[:limit]:
-            display_ipo = {
-                "company_name": ipo.get("company_name", "Unknown"),
-                "expected_date": ipo.get("expected_date", "TBD"),
-                "exchange": ipo.get("exchange", "TBD"),
-                "sector": ipo.get("sector", "TBD"),
-                "status": ipo.get("status", "Announced"),
-                "estimated_valuation": ipo.get("estimated_valuation", "TBD"),
-                "description": ipo.get("description", "")
-            }
-            display_ipos.append(display_ipo)
+        # Answered from the pipeline table; the sources are only queried again once it is stale
+        if self.pipeline.is_stale():
+            self.get_comprehensive_ipo_data()
         
-        return display_ipos
+        return self.pipeline.upcoming(limit)
 
 def get_upcoming_ipos(exa_api_key: str = None, limit: int = 10) -> List[Dict[str, Any]]:
     """
@@ -0,0 +1,155 @@
+"""
+Ticker Metadata Cache for IPO Analytics
+Caches slow-changing Ticker.info fields in SQLite with per-field TTLs
+"""
+
+import json
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How long each Ticker.info field stays fresh; every field a refresh requests
+# must outlive the daily refresh cadence, or each run re-fetches .info
+FIELD_TTLS = {
+    'longName': timedelta(weeks=4),
+    'shortName': timedelta(weeks=4),
+    'sector': timedelta(weeks=4),
+    'industry': timedelta(weeks=4),
+    'exchange': timedelta(weeks=4),
+    'website': timedelta(weeks=4),
+    'longBusinessSummary': timedelta(weeks=4),
+    'fullTimeEmployees': timedelta(weeks=1),
+    # Share counts only change with filings; market cap is derived from the live price
+    'sharesOutstanding': timedelta(weeks=1),
+    'marketCap': timedelta(hours=6),
+}
+
+DEFAULT_TTL = timedelta(days=1)
+
+
+class TickerMetadataCache:
+    """SQLite-backed cache of Ticker.info fields with per-field expiry"""
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.reset_stats()
+        self.init_cache()
+
+    def init_cache(self):
+        """Create the metadata table if needed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ticker_metadata (
+                    ticker TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    value TEXT,
+                    fetched_at TEXT NOT NULL,
+                    PRIMARY KEY (ticker, field)
+                )
+            ''')
+            conn.commit()
+
+    def reset_stats(self):
+        """Reset the per-refresh hit and miss counters"""
+        with self._lock:
+            self.stats = {'hits': 0, 'misses': 0}
+
+    def lookup_fields(self, ticker: str, fields: List[str]) -> Tuple[Dict, List[str]]:
+        """
+        Split fields into fresh cached values and fields that need fetching
+
+        Fields that are cached but absent from Yahoo's response count as fresh
+        and come back as None.
+
+        Returns:
+            (fresh values by field, expired or never fetched fields)
+        """
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute(
+                f"SELECT field, value, fetched_at FROM ticker_metadata "
+                f"WHERE ticker = ? AND field IN ({','.join('?' * len(fields))})",
+                [ticker, *fields]
+            ).fetchall()
+
+        now = datetime.now()
+        cached = {}
+        for field, value, fetched_at in rows:
+            if now - datetime.fromisoformat(fetched_at) <= FIELD_TTLS.get(field, DEFAULT_TTL):
+                cached[field] = json.loads(value) if value is not None else None
+        return cached, [field for field in dict.fromkeys(fields) if field not in cached]
+
+    def lookup(self, ticker: str, fields: List[str]) -> Optional[Dict]:
+        """Return cached values for fields if every one of them is still fresh, otherwise None (a miss)"""
+        cached, expired = self.lookup_fields(ticker, fields)
+        with self._lock:
+            self.stats['misses' if expired else 'hits'] += 1
+        return None if expired else cached
+
+    def cached_values(self, tickers: List[str], field: str) -> Dict:
+        """Last stored value of one field for many tickers, regardless of age"""
+        if not tickers:
+            return {}
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute(
+                f"SELECT ticker, value FROM ticker_metadata "
+                f"WHERE field = ? AND value IS NOT NULL AND ticker IN ({','.join('?' * len(tickers))})",
+                [field, *tickers]
+            ).fetchall()
+        return {ticker: json.loads(value) for ticker, value in rows}
+
+    def store(self, ticker: str, info: Dict, fields: Optional[List[str]] = None):
+        """Store tracked fields from a Ticker.info response (all of them by default)"""
+        fetched_at = datetime.now().isoformat()
+        rows = []
+        for field in fields or FIELD_TTLS:
+            value = info.get(field)
+            rows.append((ticker, field, json.dumps(value) if value is not None else None, fetched_at))
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO ticker_metadata (ticker, field, value, fetched_at)
+                VALUES (?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+
+    def get(self, ticker: str, fields: List[str], loader: Callable[[], Dict]) -> Dict:
+        """
+        Return fields, calling loader (e.g. Ticker.info) only when some are expired
+
+        Fresh fields are served from the cache and keep their own expiry; every
+        other tracked field is taken from the loader's response and stored, so
+        one short-lived field never resets the expiry of the rest.
+        """
+        cached, expired = self.lookup_fields(ticker, fields)
+        with self._lock:
+            self.stats['misses' if expired else 'hits'] += 1
+        if not expired:
+            return cached
+        info = loader() or {}
+        if not info:
+            return {}
+        self.store(ticker, info, [field for field in FIELD_TTLS if field not in cached])
+        return {**info, **cached}
+
+    def report(self) -> Dict:
+        """Log and return hit and miss counts for this refresh"""
+        with self._lock:
+            stats = dict(self.stats)
+        logger.info(f"Metadata cache: {stats['hits']} hits, {stats['misses']} misses")
+        return stats
+
+    def clear(self, ticker: str = None):
+        """Drop cached metadata for one ticker or for all tickers"""
+        with sqlite3.connect(self.db_path) as conn:
+            if ticker:
+                conn.execute("DELETE FROM ticker_metadata WHERE ticker = ?", (ticker,))
+            else:
+                conn.execute("DELETE FROM ticker_metadata")
+            conn.commit()
@@ -0,0 +1,289 @@
+"""
+Incremental Performance Metrics for IPO Analytics
+Keeps running per-ticker state (peak, drawdown, return moments, extremes,
+volume sum) so a daily refresh folds in only the new bars instead of
+recomputing every metric from the IPO date
+
+Only completed sessions are folded into the stored state. Today's bar may
+still be forming, so it is applied to a copy of the state when metrics are
+returned and never persisted.
+"""
+
+import math
+import sqlite3
+import logging
+from dataclasses import dataclass, asdict, fields, replace
+from datetime import date as date_type, datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from panel_metrics import TRADING_DAYS_PER_YEAR
+
+logger = logging.getLogger(__name__)
+
+# Relative tolerance when checking the stored last close against the price cache,
+# and when comparing incremental metrics with a full rebuild
+STATE_TOLERANCE = 1e-9
+
+
+@dataclass
+class MetricState:
+    """Running state behind the performance_metrics columns of one ticker"""
+    ticker: str
+    ipo_date: str
+    first_close: Optional[float] = None
+    last_date: Optional[str] = None
+    last_close: Optional[float] = None
+    bar_count: int = 0
+    # Welford moments of daily returns
+    return_count: int = 0
+    return_mean: float = 0.0
+    return_m2: float = 0.0
+    # Drawdown is measured from the second bar on, like calculate_performance_metrics
+    peak_close: Optional[float] = None
+    max_drawdown: Optional[float] = None
+    high_max: Optional[float] = None
+    low_min: Optional[float] = None
+    volume_sum: float = 0.0
+
+    def apply(self, date: str, close: float, high: float, low: float, volume: float):
+        """Fold one new daily bar into the state"""
+        if self.bar_count == 0:
+            self.first_close = close
+        else:
+            daily_return = close / self.last_close - 1
+            self.return_count += 1
+            delta = daily_return - self.return_mean
+            self.return_mean += delta / self.return_count
+            self.return_m2 += delta * (daily_return - self.return_mean)
+
+            self.peak_close = close if self.peak_close is None else max(self.peak_close, close)
+            drawdown = (close - self.peak_close) / self.peak_close
+            self.max_drawdown = drawdown if self.max_drawdown is None else min(self.max_drawdown, drawdown)
+
+        self.high_max = high if self.high_max is None else max(self.high_max, high)
+        self.low_min = low if self.low_min is None else min(self.low_min, low)
+        self.volume_sum += volume or 0
+        self.bar_count += 1
+        self.last_date = date
+        self.last_close = close
+
+    def metrics(self, as_of: Optional[datetime] = None) -> Dict:
+        """performance_metrics values for the current state"""
+        if self.bar_count == 0:
+            return {}
+        volatility = None
+        if self.return_count > 1:
+            volatility = math.sqrt(self.return_m2 / (self.return_count - 1)) * math.sqrt(TRADING_DAYS_PER_YEAR)
+        as_of = (as_of or datetime.now()).date()
+        return {
+            'total_return': (self.last_close - self.first_close) / self.first_close,
+            'annualized_volatility': volatility,
+            'max_drawdown': self.max_drawdown,
+            'days_since_ipo': (as_of - datetime.strptime(self.ipo_date, '%Y-%m-%d').date()).days,
+            'high_52w': self.high_max,
+            'low_52w': self.low_min,
+            'avg_volume': self.volume_sum / self.bar_count,
+        }
+
+
+class IncrementalMetrics:
+    """Maintains MetricState rows in SQLite and updates them from new price_history bars"""
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.last_mismatches: List[str] = []
+        self.init_tables()
+
+    def init_tables(self):
+        """Create the metric state table if needed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS metric_state (
+                    ticker TEXT PRIMARY KEY,
+                    ipo_date TEXT NOT NULL,
+                    first_close REAL,
+                    last_date TEXT,
+                    last_close REAL,
+                    bar_count INTEGER,
+                    return_count INTEGER,
+                    return_mean REAL,
+                    return_m2 REAL,
+                    peak_close REAL,
+                    max_drawdown REAL,
+                    high_max REAL,
+                    low_min REAL,
+                    volume_sum REAL,
+                    updated_at TEXT
+                )
+            ''')
+            conn.commit()
+
+    def update(self, ipo_dates: Dict[str, str], rebuild: bool = False) -> Dict[str, Dict]:
+        """
+        Bring the state of every ticker up to date and return its metrics
+
+        Tickers with state only read bars after their last processed date,
+        up to yesterday; a bar dated today is overlaid on the returned
+        metrics without being stored. State is rebuilt from the IPO date when it is missing, when the IPO
+        date changed, or when the cached close for the last processed date no
+        longer matches (the price cache reloaded split-adjusted history).
+
+        Args:
+            ipo_dates: IPO date (YYYY-MM-DD) per Yahoo Finance ticker
+            rebuild: Also recompute every ticker from its IPO date, log any
+                ticker where the incremental result disagrees, and keep the
+                rebuilt state
+
+        Returns:
+            Metrics dictionary per ticker, in the format of calculate_performance_metrics
+        """
+        ipo_dates = {ticker: date[:10] for ticker, date in ipo_dates.items() if date}
+        states = self._load_states(list(ipo_dates))
+
+        cached_closes = self._cached_last_closes(list(states))
+        stale = [
+            ticker for ticker, state in states.items()
+            if state.ipo_date != ipo_dates[ticker] or not self._close_matches(state, cached_closes.get(ticker))
+        ]
+        for ticker in stale:
+            logger.info(f"Metric state for {ticker} no longer matches the price cache, rebuilding")
+            del states[ticker]
+
+        fresh = [ticker for ticker in ipo_dates if ticker not in states]
+        for ticker in fresh:
+            states[ticker] = MetricState(ticker=ticker, ipo_date=ipo_dates[ticker])
+
+        today = date_type.today().isoformat()
+        bars_applied = 0
+        for ticker, date, close, high, low, volume in self._new_bars(states, today):
+            states[ticker].apply(date, close, high, low, volume)
+            bars_applied += 1
+
+        if rebuild:
+            rebuilt = {ticker: MetricState(ticker=ticker, ipo_date=date) for ticker, date in ipo_dates.items()}
+            for ticker, date, close, high, low, volume in self._new_bars(rebuilt, today):
+                rebuilt[ticker].apply(date, close, high, low, volume)
+            self.last_mismatches = self._verify(states, rebuilt)
+            states = rebuilt
+
+        self._save_states(states.values())
+
+        # Today's provisional bars go into copies that are returned but never saved
+        live = {}
+        for ticker, date, close, high, low, volume in self._live_bars(states, today):
+            live.setdefault(ticker, replace(states[ticker])).apply(date, close, high, low, volume)
+        logger.info(f"Metric state: {len(ipo_dates) - len(fresh)} incremental, {len(fresh)} built "
+                    f"from IPO date ({len(stale)} stale), {bars_applied} bars applied, "
+                    f"{len(live)} live bars overlaid")
+
+        return {ticker: live.get(ticker, state).metrics() for ticker, state in states.items()
+                if live.get(ticker, state).bar_count}
+
+    def _verify(self, incremental: Dict[str, MetricState], rebuilt: Dict[str, MetricState]) -> List[str]:
+        """Log tickers whose incrementally updated state disagrees with a full rebuild"""
+        mismatched = []
+        for ticker, state in rebuilt.items():
+            incremental_metrics = incremental[ticker].metrics()
+            for key, value in state.metrics().items():
+                other = incremental_metrics.get(key)
+                if value is None or other is None:
+                    if value != other:
+                        mismatched.append(ticker)
+                        break
+                    continue
+                if abs(value - other) > STATE_TOLERANCE * max(1.0, abs(value)):
+                    mismatched.append(ticker)
+                    break
+
+        if mismatched:
+            logger.warning(f"Incremental metric state differed from a full rebuild for "
+                           f"{len(mismatched)} tickers: {', '.join(mismatched)}")
+        else:
+            logger.info(f"Incremental metric state verified against a full rebuild for {len(rebuilt)} tickers")
+        return mismatched
+
+    def _load_states(self, tickers: List[str]) -> Dict[str, MetricState]:
+        if not tickers:
+            return {}
+        columns = [f.name for f in fields(MetricState)]
+        states = {}
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            for start in range(0, len(tickers), 500):
+                chunk = tickers[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT {', '.join(columns)} FROM metric_state "
+                    f"WHERE ticker IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for row in rows:
+                    states[row[0]] = MetricState(*row)
+        return states
+
+    def _save_states(self, states):
+        columns = [f.name for f in fields(MetricState)]
+        updated_at = datetime.now().isoformat()
+        rows = [(*asdict(state).values(), updated_at) for state in states]
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.executemany(f'''
+                INSERT OR REPLACE INTO metric_state ({', '.join(columns)}, updated_at)
+                VALUES ({', '.join('?' * (len(columns) + 1))})
+            ''', rows)
+            conn.commit()
+
+    def _cached_last_closes(self, tickers: List[str]) -> Dict[str, float]:
+        """Cached close on each ticker's last processed date, in one join"""
+        closes = {}
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            for start in range(0, len(tickers), 500):
+                chunk = tickers[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT s.ticker, p.close FROM metric_state s "
+                    f"JOIN price_history p ON p.ticker = s.ticker AND p.date = s.last_date "
+                    f"WHERE s.ticker IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                closes.update(rows)
+        return closes
+
+    def _close_matches(self, state: MetricState, cached_close: Optional[float]) -> bool:
+        if state.last_date is None:
+            return True
+        if cached_close is None:
+            return False
+        return abs(cached_close - state.last_close) <= STATE_TOLERANCE * max(1.0, abs(state.last_close))
+
+    def _new_bars(self, states: Dict[str, MetricState], before: str):
+        """Completed bars after each ticker's last processed date (or from its IPO date), in date order"""
+        return self._cursor_bars(states, "p.date < ?", before)
+
+    def _live_bars(self, states: Dict[str, MetricState], today: str):
+        """Bars dated today or later, which may still change before the session closes"""
+        return self._cursor_bars(states, "p.date >= ?", today)
+
+    def _cursor_bars(self, states: Dict[str, MetricState], condition: str, date: str):
+        if not states:
+            return []
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.execute("CREATE TEMP TABLE metric_cursor (ticker TEXT PRIMARY KEY, after TEXT, start TEXT)")
+            conn.executemany(
+                "INSERT INTO metric_cursor VALUES (?, ?, ?)",
+                [(s.ticker, s.last_date or '', s.ipo_date) for s in states.values()]
+            )
+            bars = conn.execute(f'''
+                SELECT p.ticker, p.date, p.close, p.high, p.low, p.volume
+                FROM price_history p
+                JOIN metric_cursor c ON p.ticker = c.ticker
+                WHERE p.date > c.after AND p.date >= c.start AND p.close IS NOT NULL AND {condition}
+                ORDER BY p.ticker, p.date
+            ''', (date,)).fetchall()
+        return bars
+
+    def clear(self, ticker: str = None):
+        """Drop metric state for one ticker or for all tickers"""
+        with sqlite3.connect(self.db_path) as conn:
+            if ticker:
+                conn.execute("DELETE FROM metric_state WHERE ticker = ?", (ticker,))
+            else:
+                conn.execute("DELETE FROM metric_state")
+            conn.commit()
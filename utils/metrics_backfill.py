@@ -0,0 +1,176 @@
+"""
+Performance Metrics Backfill for IPO Analytics
+Fills performance_metrics for every ticker in ipo_data using a process pool,
+resuming from the last finished chunk after an interruption
+
+Usage:
+    python utils/metrics_backfill.py
+    python utils/metrics_backfill.py --workers 4 --chunk-size 10 --no-resume
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+
+from database import IPODatabase
+from fetch_engine import YAHOO_HOST, DEFAULT_HOST_LIMITS, get_fetch_engine
+from panel_metrics import METRIC_COLUMNS, build_price_panel, compute_panel_metrics, load_price_panel
+from price_cache import PriceHistoryCache
+from quote_refresh import ipo_symbols
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHECKPOINT = "performance_metrics_backfill"
+
+DEFAULT_CHUNK_SIZE = 20
+
+# A backfill can outlive the usual 24h checkpoint window
+CHECKPOINT_MAX_AGE_HOURS = 24 * 7
+
+
+def _init_worker(workers: int):
+    """Split the Yahoo allowance between worker processes so the pool keeps the global rate"""
+    limits = DEFAULT_HOST_LIMITS[YAHOO_HOST]
+    get_fetch_engine().host_limits[YAHOO_HOST] = {
+        'rate': limits['rate'] / workers,
+        'burst': max(1, limits['burst'] // workers),
+    }
+
+
+def _compute_chunk(db_path: str, ipo_dates: Dict[str, str], refresh_prices: bool) -> Tuple[Dict[str, Dict], Dict]:
+    """
+    Worker: compute metrics for a chunk of symbols
+
+    Workers only read the database. Price history updates are returned with
+    the metrics, as fetch_history updates per symbol, for the parent to write.
+    """
+    updates = {}
+    if refresh_prices:
+        cache = PriceHistoryCache(db_path)
+        fetched = get_fetch_engine().map(cache.fetch_history, list(ipo_dates))
+        histories = {}
+        for symbol in ipo_dates:
+            if fetched.get(symbol) is None:
+                # Download failed; compute from the cached bars as they are
+                histories[symbol] = cache.cached_history(symbol)
+                continue
+            histories[symbol], update = fetched[symbol]
+            if update is not None:
+                updates[symbol] = update
+        panels = build_price_panel(histories, ipo_dates)
+    else:
+        panels = load_price_panel(db_path, ipo_dates)
+    metrics = compute_panel_metrics(panels['close'], panels['high'], panels['low'],
+                                    panels['volume'], ipo_dates)
+    return metrics.to_dict(orient='index'), updates
+
+
+def backfill_performance_metrics(db_path: str = "data/ipo_analytics.db",
+                                 workers: Optional[int] = None,
+                                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                 resume: bool = True,
+                                 refresh_prices: bool = True) -> Dict:
+    """
+    Compute performance metrics for every ipo_data ticker in a process pool
+
+    The parent process is the only writer: as each chunk finishes it writes
+    the chunk's price history updates, then its metrics with one bulk insert
+    that also checkpoints its tickers. Resuming is per chunk, so a rerun after
+    an interruption skips finished chunks but fetches the chunks that were in
+    flight again. The checkpoint is cleared once every chunk has finished.
+
+    Args:
+        db_path: SQLite database holding ipo_data, price_history and performance_metrics
+        workers: Worker processes (defaults to the number of CPU cores)
+        chunk_size: Tickers handed to a worker at a time
+        resume: Skip tickers checkpointed by an interrupted backfill
+        refresh_prices: Update cached price histories before computing
+
+    Returns:
+        Dictionary with tickers, skipped, written, failed_chunks, failed_tickers,
+        elapsed and tickers_per_sec (written tickers only)
+    """
+    workers = workers or os.cpu_count() or 1
+    db = IPODatabase(db_path)
+    price_cache = PriceHistoryCache(db_path)
+
+    universe = ipo_symbols(db_path)
+    done = db.get_checkpoint(BACKFILL_CHECKPOINT, max_age_hours=CHECKPOINT_MAX_AGE_HOURS) if resume else set()
+    if not resume:
+        db.clear_checkpoint(BACKFILL_CHECKPOINT)
+    pending = {symbol: ipo_date for symbol, (ticker, ipo_date) in universe.items() if ticker not in done}
+    tickers = {symbol: ticker for symbol, (ticker, _) in universe.items()}
+
+    symbols = list(pending)
+    chunks = [{s: pending[s] for s in symbols[i:i + chunk_size]} for i in range(0, len(symbols), chunk_size)]
+    logger.info(f"Backfilling performance metrics for {len(pending)} tickers "
+                f"({len(universe) - len(pending)} already done) with {workers} workers")
+
+    result = {'tickers': len(universe), 'skipped': len(universe) - len(pending),
+              'written': 0, 'failed_chunks': 0, 'failed_tickers': []}
+    processed = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(workers,)) as pool:
+        futures = {pool.submit(_compute_chunk, db_path, chunk, refresh_prices): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            processed += len(chunk)
+            try:
+                metrics, updates = future.result()
+            except Exception as e:
+                result['failed_chunks'] += 1
+                result['failed_tickers'].extend(tickers[symbol] for symbol in chunk)
+                logger.error(f"Backfill chunk of {len(chunk)} tickers failed: {e}")
+                continue
+
+            for symbol, update in updates.items():
+                price_cache.apply_update(symbol, update)
+
+            rows = [(tickers[symbol], *(None if pd.isna(values[c]) else values[c] for c in METRIC_COLUMNS))
+                    for symbol, values in metrics.items()]
+            result['written'] += db.insert_performance_metrics_bulk(rows, checkpoint_name=BACKFILL_CHECKPOINT)
+
+            elapsed = time.perf_counter() - start
+            logger.info(f"Backfill progress: {processed}/{len(pending)} tickers, "
+                        f"{result['written'] / elapsed:.1f} tickers/sec written")
+
+    result['elapsed'] = time.perf_counter() - start
+    result['tickers_per_sec'] = result['written'] / result['elapsed'] if result['elapsed'] > 0 else 0.0
+    if result['failed_chunks'] == 0:
+        db.clear_checkpoint(BACKFILL_CHECKPOINT)
+    else:
+        # Keep the checkpoint so a rerun retries just these
+        logger.warning(f"Backfill left {len(result['failed_tickers'])} tickers without metrics: "
+                       f"{', '.join(sorted(result['failed_tickers']))}")
+
+    logger.info(f"Backfill finished: {result['written']} tickers written in {result['elapsed']:.1f}s "
+                f"({result['tickers_per_sec']:.1f} tickers/sec), {result['failed_chunks']} failed chunks")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill performance_metrics for every ticker in ipo_data")
+    parser.add_argument('--db-path', default="data/ipo_analytics.db")
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU cores)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--no-resume', action='store_true', help='Ignore an interrupted backfill and start over')
+    parser.add_argument('--no-refresh', action='store_true', help='Use cached price history as is')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    summary = backfill_performance_metrics(args.db_path, workers=args.workers, chunk_size=args.chunk_size,
+                                           resume=not args.no_resume, refresh_prices=not args.no_refresh)
+    print(f"Backfilled {summary['written']} of {summary['tickers']} tickers "
+          f"({summary['skipped']} resumed) at {summary['tickers_per_sec']:.1f} tickers/sec")
+    if summary['failed_tickers']:
+        print(f"Failed: {', '.join(sorted(summary['failed_tickers']))}")
+        sys.exit(1)
@@ -0,0 +1,172 @@
+"""
+Panel Performance Metrics for IPO Analytics
+Computes performance_metrics for the whole IPO universe at once from aligned
+ticker x date panels with vectorized NumPy, matching
+IPODataFetcher.calculate_performance_metrics ticker for ticker
+"""
+
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+
+PANEL_FIELDS = ['close', 'high', 'low', 'volume']
+
+METRIC_COLUMNS = ['total_return', 'annualized_volatility', 'max_drawdown', 'days_since_ipo',
+                  'high_52w', 'low_52w', 'avg_volume']
+
+
+def load_price_panel(db_path: str, start_dates: Dict[str, str]) -> Dict[str, pd.DataFrame]:
+    """
+    Build aligned ticker x date panels from the price_history cache
+
+    Args:
+        db_path: SQLite database holding price_history
+        start_dates: First date (YYYY-MM-DD, usually the IPO date) per Yahoo symbol
+
+    Returns:
+        Dictionary of close, high, low and volume DataFrames indexed by ticker
+        with one column per date; bars before a ticker's start date are NaN
+    """
+    tickers = list(start_dates)
+    if not tickers:
+        return {field: pd.DataFrame() for field in PANEL_FIELDS}
+
+    frames = []
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(tickers), 500):
+            chunk = tickers[start:start + 500]
+            frames.append(pd.read_sql_query(
+                f"SELECT ticker, date, close, high, low, volume FROM price_history "
+                f"WHERE ticker IN ({','.join('?' * len(chunk))})",
+                conn, params=chunk
+            ))
+    return _pivot_panels(pd.concat(frames, ignore_index=True), start_dates)
+
+
+def build_price_panel(histories: Dict[str, pd.DataFrame], start_dates: Dict[str, str]) -> Dict[str, pd.DataFrame]:
+    """
+    Same panels as load_price_panel, from histories already in memory
+
+    Args:
+        histories: Daily bars per Yahoo symbol as PriceHistoryCache returns them
+        start_dates: First date (YYYY-MM-DD, usually the IPO date) per Yahoo symbol
+    """
+    tickers = list(start_dates)
+    if not tickers:
+        return {field: pd.DataFrame() for field in PANEL_FIELDS}
+
+    frames = [pd.DataFrame({
+        'ticker': ticker,
+        'date': hist.index.strftime('%Y-%m-%d'),
+        'close': hist['Close'].to_numpy(),
+        'high': hist['High'].to_numpy(),
+        'low': hist['Low'].to_numpy(),
+        'volume': hist['Volume'].to_numpy(),
+    }) for ticker, hist in histories.items() if ticker in start_dates and not hist.empty]
+    bars = pd.concat(frames, ignore_index=True) if frames else \
+        pd.DataFrame(columns=['ticker', 'date', *PANEL_FIELDS])
+    return _pivot_panels(bars, start_dates)
+
+
+def _pivot_panels(bars: pd.DataFrame, start_dates: Dict[str, str]) -> Dict[str, pd.DataFrame]:
+    tickers = list(start_dates)
+    bars = bars[bars['date'] >= bars['ticker'].map(start_dates)]
+
+    panels = {}
+    for field in PANEL_FIELDS:
+        panel = bars.pivot(index='ticker', columns='date', values=field)
+        panels[field] = panel.reindex(index=tickers).sort_index(axis=1)
+    return panels
+
+
+def compute_panel_metrics(close: pd.DataFrame, high: pd.DataFrame, low: pd.DataFrame,
+                          volume: pd.DataFrame, ipo_dates: Dict[str, str],
+                          as_of: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Performance metrics for every ticker in an aligned ticker x date panel
+
+    Each ticker only counts the dates on which it has a close, so exchange
+    holidays in a mixed-venue panel don't break its return series.
+
+    Args:
+        close, high, low, volume: Panels indexed by ticker with one column per date
+        ipo_dates: IPO date per ticker (YYYY-MM-DD) for days_since_ipo
+        as_of: Date days_since_ipo is counted to (defaults to today)
+
+    Returns:
+        DataFrame indexed by ticker with the performance_metrics columns;
+        tickers without any close are dropped
+    """
+    if close.shape[1] == 0:
+        return pd.DataFrame(columns=METRIC_COLUMNS)
+
+    values = close.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+
+    # Pack each ticker's trading days to the left so its bars are consecutive
+    order = np.argsort(~valid, axis=1, kind='stable')
+    packed = np.take_along_axis(values, order, axis=1)
+    packed_valid = np.take_along_axis(valid, order, axis=1)
+    counts = packed_valid.sum(axis=1)
+    has_data = counts > 0
+
+    rows = np.arange(len(values))
+    first = packed[:, 0]
+    last = packed[rows, np.maximum(counts - 1, 0)]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total_return = (last - first) / first
+
+        # Daily returns; padding after the last bar stays NaN
+        returns = packed[:, 1:] / packed[:, :-1] - 1
+        return_counts = np.maximum(counts - 1, 0)
+        volatility = np.full(len(values), np.nan)
+        enough = return_counts > 1
+        if enough.any():
+            volatility[enough] = np.nanstd(returns[enough], axis=1, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+        # Drawdown of the compounded daily returns (close relative to the first close)
+        cumulative = packed[:, 1:] / first[:, None]
+        running_max = np.fmax.accumulate(cumulative, axis=1)
+        drawdown = (cumulative - running_max) / running_max
+        max_drawdown = np.full(len(values), np.nan)
+        has_returns = return_counts > 0
+        if has_returns.any():
+            max_drawdown[has_returns] = np.nanmin(drawdown[has_returns], axis=1)
+
+        # High, low and volume only over days with a close
+        high_values = np.where(valid, high.to_numpy(dtype=float), np.nan)
+        low_values = np.where(valid, low.to_numpy(dtype=float), np.nan)
+        volume_values = np.where(valid, volume.to_numpy(dtype=float), np.nan)
+        high_52w = np.full(len(values), np.nan)
+        low_52w = np.full(len(values), np.nan)
+        avg_volume = np.full(len(values), np.nan)
+        if has_data.any():
+            high_52w[has_data] = np.nanmax(high_values[has_data], axis=1)
+            low_52w[has_data] = np.nanmin(low_values[has_data], axis=1)
+            avg_volume[has_data] = np.nanmean(volume_values[has_data], axis=1)
+
+    as_of = pd.Timestamp((as_of or datetime.now()).date())
+    ipo_timestamps = pd.to_datetime(pd.Series([ipo_dates.get(t) for t in close.index], index=close.index))
+    days_since_ipo = (as_of - ipo_timestamps).dt.days
+
+    metrics = pd.DataFrame({
+        'total_return': total_return,
+        'annualized_volatility': volatility,
+        'max_drawdown': max_drawdown,
+        'days_since_ipo': days_since_ipo.to_numpy(),
+        'high_52w': high_52w,
+        'low_52w': low_52w,
+        'avg_volume': avg_volume,
+    }, index=close.index)
+    return metrics[has_data]
+
@@ -0,0 +1,247 @@
+"""
+Price History Cache for IPO Analytics
+Keeps daily OHLCV bars in SQLite and only downloads the missing tail on refresh
+"""
+
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from transport import get_transport
+from http_client import get_yfinance_session
+
+logger = logging.getLogger(__name__)
+
+# Rough size of one daily bar in a Yahoo Finance chart response
+# (timestamp, open, high, low, close, adjclose, volume as JSON)
+BYTES_PER_BAR = 96
+
+# Completed bars re-requested with each tail download to detect split/dividend adjustments
+OVERLAP_BARS = 3
+
+# Relative change in close that every overlap bar must show to count as an adjustment
+ADJUSTMENT_TOLERANCE = 1e-4
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+ACTION_COLUMNS = ['Dividends', 'Stock Splits']
+
+
+class PriceHistoryCache:
+    """SQLite-backed read-through cache for daily price history"""
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.reset_stats()
+        self.init_cache()
+
+    def init_cache(self):
+        """Create the price history table if needed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS price_history (
+                    ticker TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume INTEGER,
+                    PRIMARY KEY (ticker, date)
+                )
+            ''')
+            conn.commit()
+
+    def reset_stats(self):
+        """Reset the per-run counters"""
+        with self._lock:
+            self.stats = {
+                'tickers': 0,
+                'full_downloads': 0,
+                'tail_downloads': 0,
+                'bars_downloaded': 0,
+                'bars_from_cache': 0,
+            }
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def get_history(self, ticker: str, start: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Get daily history for a ticker, downloading only bars not yet cached
+
+        Today's bar may still be forming, so it is never treated as final: the
+        tail is always re-fetched starting a few completed bars back.
+
+        Args:
+            ticker: Yahoo Finance ticker symbol
+            start: Optional first date to return; the cache always holds the full history
+
+        Returns:
+            DataFrame indexed by date with Open, High, Low, Close and Volume columns
+        """
+        hist, update = self.fetch_history(ticker)
+        self.apply_update(ticker, update)
+        if start is not None and not hist.empty:
+            hist = hist[hist.index >= pd.Timestamp(start).tz_localize(None).normalize()]
+        return hist
+
+    def fetch_history(self, ticker: str) -> Tuple[pd.DataFrame, Optional[Tuple[str, pd.DataFrame]]]:
+        """
+        Full history as get_history returns it, without writing to the cache
+
+        Returns:
+            (history, update) where update is None when the cache needs no
+            write, or ('replace' | 'append', bars) to hand to apply_update
+        """
+        cached = self._read(ticker)
+        self._count(tickers=1)
+
+        # Bars dated today or later belong to a session that may not have closed
+        completed = cached[cached.index < pd.Timestamp(datetime.now().date())]
+
+        if completed.empty:
+            downloaded = self._download(ticker, period="max")[BAR_COLUMNS]
+            self._count(full_downloads=1, bars_downloaded=len(downloaded))
+            return downloaded, ('replace', downloaded)
+
+        overlap_start = completed.index[-min(OVERLAP_BARS, len(completed))]
+        tail = self._download(ticker, start=overlap_start.strftime('%Y-%m-%d'))
+        if tail.empty:
+            # Nothing came back; serve what is cached rather than dropping the overlap bars
+            self._count(tail_downloads=1, bars_from_cache=len(cached))
+            return cached, None
+        if self._is_adjusted(completed, tail):
+            logger.info(f"Price adjustment detected for {ticker}, reloading full history")
+            downloaded = self._download(ticker, period="max")[BAR_COLUMNS]
+            self._count(full_downloads=1, bars_downloaded=len(downloaded))
+            return downloaded, ('replace', downloaded)
+
+        tail = tail[BAR_COLUMNS]
+        kept = completed[completed.index < overlap_start]
+        self._count(tail_downloads=1, bars_downloaded=len(tail), bars_from_cache=len(kept))
+        return pd.concat([kept, tail]).sort_index(), ('append', tail)
+
+    def apply_update(self, ticker: str, update: Optional[Tuple[str, pd.DataFrame]]):
+        """Write an update returned by fetch_history"""
+        if update is None:
+            return
+        mode, bars = update
+        if mode == 'replace':
+            self._replace(ticker, bars)
+        else:
+            self._write(ticker, bars)
+
+    def cached_history(self, ticker: str) -> pd.DataFrame:
+        """Cached bars of a ticker without any network call"""
+        return self._read(ticker)
+
+    def report(self) -> Dict:
+        """Log and return the counters for this run, including estimated bytes saved"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['bytes_downloaded'] = stats['bars_downloaded'] * BYTES_PER_BAR
+        stats['bytes_saved'] = stats['bars_from_cache'] * BYTES_PER_BAR
+        logger.info(
+            f"Price cache: {stats['tickers']} lookups, {stats['full_downloads']} full, "
+            f"{stats['tail_downloads']} tail; "
+            f"~{stats['bytes_downloaded'] / 1024:.1f} KB downloaded, "
+            f"~{stats['bytes_saved'] / 1024:.1f} KB saved"
+        )
+        return stats
+
+    def _download(self, ticker: str, **kwargs) -> pd.DataFrame:
+        hist = get_transport().call('yfinance', 'history', {'ticker': ticker, **kwargs},
+                                    lambda: yf.Ticker(ticker, session=get_yfinance_session()).history(**kwargs))
+        return self._normalize(hist)
+
+    def _normalize(self, hist: pd.DataFrame) -> pd.DataFrame:
+        # Split and dividend columns are kept when present, for adjustment detection
+        if hist is None or hist.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([]))
+        hist = hist[BAR_COLUMNS + [c for c in ACTION_COLUMNS if c in hist.columns]].dropna(subset=['Close'])
+        index = pd.DatetimeIndex(hist.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        hist = hist.copy()
+        hist.index = index.normalize()
+        return hist[~hist.index.duplicated(keep='last')]
+
+    def _is_adjusted(self, completed: pd.DataFrame, tail: pd.DataFrame) -> bool:
+        """Whether Yahoo re-based history since the cached bars were written"""
+        # A split or dividend in the new bars re-bases every earlier close
+        new_bars = tail[tail.index > completed.index[-1]]
+        for column in ACTION_COLUMNS:
+            if column in new_bars.columns and (new_bars[column].fillna(0) != 0).any():
+                return True
+
+        # Otherwise look for one consistent shift across all overlap bars; a
+        # correction to a single bar is just written over the cached one
+        overlap = completed.index.intersection(tail.index)
+        old_close = completed.loc[overlap, 'Close']
+        new_close = tail.loc[overlap, 'Close']
+        valid = old_close != 0
+        if not valid.any():
+            return False
+        ratios = (new_close[valid] / old_close[valid]).to_numpy()
+        shifted = abs(ratios - 1) > ADJUSTMENT_TOLERANCE
+        consistent = ratios.max() - ratios.min() <= ADJUSTMENT_TOLERANCE * ratios.mean()
+        return bool(shifted.all() and consistent)
+
+    def _read(self, ticker: str) -> pd.DataFrame:
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            df = pd.read_sql_query(
+                "SELECT date, open, high, low, close, volume FROM price_history "
+                "WHERE ticker = ? ORDER BY date",
+                conn, params=[ticker]
+            )
+        if df.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([]))
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop('date')))
+        df.columns = BAR_COLUMNS
+        return df
+
+    def _insert(self, conn, ticker: str, hist: pd.DataFrame):
+        rows = [
+            (ticker, ts.strftime('%Y-%m-%d'), float(row.Open), float(row.High),
+             float(row.Low), float(row.Close), int(row.Volume) if pd.notna(row.Volume) else 0)
+            for ts, row in zip(hist.index, hist.itertuples(index=False))
+        ]
+        conn.executemany('''
+            INSERT OR REPLACE INTO price_history
+            (ticker, date, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+    def _write(self, ticker: str, hist: pd.DataFrame):
+        if hist.empty:
+            return
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            self._insert(conn, ticker, hist)
+            conn.commit()
+
+    def _replace(self, ticker: str, hist: pd.DataFrame):
+        # Delete and re-insert in one transaction so readers never see the ticker half-written
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.execute("DELETE FROM price_history WHERE ticker = ?", (ticker,))
+            self._insert(conn, ticker, hist)
+            conn.commit()
+
+    def clear(self, ticker: str = None):
+        """Drop cached bars for one ticker or for all tickers"""
+        with sqlite3.connect(self.db_path) as conn:
+            if ticker:
+                conn.execute("DELETE FROM price_history WHERE ticker = ?", (ticker,))
+            else:
+                conn.execute("DELETE FROM price_history")
+            conn.commit()
@@ -0,0 +1,200 @@
+"""
+Quote-only Refresh for IPO Analytics
+Updates the fast-moving ipo_data columns (current_price, volume, market_cap,
+price_change_since_ipo) for every stored IPO without re-fetching metadata or
+full price history
+"""
+
+import time
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from database import IPODatabase
+from global_yfinance_util import GLOBAL_EXCHANGES
+from metadata_cache import TickerMetadataCache
+from refresh_planner import RefreshPlanner
+from transport import get_transport
+from http_client import get_yfinance_session
+
+logger = logging.getLogger(__name__)
+
+# Symbols per batched quote download
+QUOTE_CHUNK_SIZE = 100
+
+# A few sessions back so the latest bar is found over weekends and holidays
+QUOTE_PERIOD = "5d"
+
+EXCHANGE_SUFFIXES = {
+    exchange: details['suffix']
+    for exchanges in GLOBAL_EXCHANGES.values()
+    for exchange, details in exchanges.items()
+}
+
+
+def yahoo_symbol(ticker: str, exchange: str) -> str:
+    """Yahoo Finance symbol for an ipo_data row; global rows store the ticker without its suffix"""
+    if '.' in ticker:
+        return ticker
+    return f"{ticker}{EXCHANGE_SUFFIXES.get(exchange, '')}"
+
+
+def ipo_symbols(db_path: str = "data/ipo_analytics.db") -> Dict[str, Tuple[str, str]]:
+    """(ipo_data ticker, IPO date) per Yahoo Finance symbol for every row with an IPO date"""
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        rows = conn.execute("SELECT ticker, exchange, ipo_date FROM ipo_data WHERE ipo_date IS NOT NULL").fetchall()
+    return {yahoo_symbol(ticker, exchange): (ticker, ipo_date[:10]) for ticker, exchange, ipo_date in rows if ipo_date}
+
+
+class QuoteRefresher:
+    """Refreshes quote columns of ipo_data from lightweight batched quote downloads"""
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        self.metadata_cache = TickerMetadataCache(db_path)
+        self.planner = RefreshPlanner(db_path)
+
+    def refresh(self, time_budget: Optional[float] = None, all_sessions: bool = False) -> Dict:
+        """
+        Update ipo_data rows from the latest quotes, most valuable stale rows first
+
+        Rows are fetched in RefreshPlanner order. Rows whose exchange has not
+        traded since they were last updated are skipped unless all_sessions
+        is set. With a time budget, no new quote chunk is started once the
+        next one would likely overrun it, and the remaining rows are left for
+        the next refresh.
+
+        Market cap is recomputed from cached sharesOutstanding; rows without a
+        cached share count keep their implied share count (old cap / old price).
+
+        Args:
+            time_budget: Seconds to spend fetching quotes (None for no limit)
+            all_sessions: Also re-quote exchanges that have been closed since the last update
+
+        Returns:
+            Dictionary with rows, updated, missing, deferred and closed counts
+        """
+        plan = self.planner.plan()
+        rows = [(row['ticker'], row['exchange'], row['ipo_price'], row['current_price'], row['market_cap'])
+                for row in plan if all_sessions or row['has_new_data']]
+        closed = len(plan) - len(rows)
+
+        symbols = {row[0]: yahoo_symbol(row[0], row[1]) for row in rows}
+        ordered_symbols = list(dict.fromkeys(symbols[row[0]] for row in rows))
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        quotes, attempted = self._fetch_quotes(ordered_symbols, deadline)
+        shares = self.metadata_cache.cached_values(sorted(attempted), 'sharesOutstanding')
+
+        now = datetime.now().isoformat()
+        updates = []
+        for ticker, exchange, ipo_price, old_price, old_market_cap in rows:
+            symbol = symbols[ticker]
+            quote = quotes.get(symbol)
+            if not quote:
+                continue
+            price, volume = quote
+
+            if shares.get(symbol):
+                market_cap = int(shares[symbol] * price)
+            elif old_market_cap and old_price:
+                market_cap = int(old_market_cap * price / old_price)
+            else:
+                market_cap = old_market_cap
+
+            change = (price - ipo_price) / ipo_price if ipo_price else None
+            updates.append((price, volume, market_cap, change, now, ticker))
+
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.executemany('''
+                UPDATE ipo_data
+                SET current_price = ?, volume = ?, market_cap = ?,
+                    price_change_since_ipo = ?, last_updated = ?
+                WHERE ticker = ?
+            ''', updates)
+            conn.commit()
+
+        attempted_rows = sum(1 for ticker in symbols if symbols[ticker] in attempted)
+        result = {'rows': len(plan), 'updated': len(updates), 'missing': attempted_rows - len(updates),
+                  'deferred': len(rows) - attempted_rows, 'closed': closed}
+        logger.info(f"Quote refresh: {result['updated']} of {result['rows']} rows updated, "
+                    f"{result['missing']} without a quote, {result['deferred']} deferred by the time budget, "
+                    f"{result['closed']} skipped with no new session data")
+        return result
+
+    def _fetch_quotes(self, symbols: List[str], deadline: Optional[float] = None) -> Tuple[Dict[str, tuple], set]:
+        """
+        Latest (close, volume) per symbol from chunked multi-ticker downloads
+
+        Chunks are fetched in the given order; the first chunk always runs and
+        later ones only if the average chunk time still fits before the deadline.
+
+        Returns:
+            Quotes per symbol and the set of symbols that were requested
+        """
+        quotes = {}
+        attempted = set()
+        started = time.monotonic()
+        for chunk_number, start in enumerate(range(0, len(symbols), QUOTE_CHUNK_SIZE)):
+            if deadline is not None and chunk_number:
+                average_chunk = (time.monotonic() - started) / chunk_number
+                if time.monotonic() + average_chunk > deadline:
+                    logger.info(f"Quote refresh time budget reached after {start} of {len(symbols)} symbols")
+                    break
+            chunk = symbols[start:start + QUOTE_CHUNK_SIZE]
+            attempted.update(chunk)
+            try:
+                data = get_transport().call(
+                    'yfinance', 'download', {'tickers': chunk, 'period': QUOTE_PERIOD},
+                    lambda: yf.download(chunk, period=QUOTE_PERIOD, group_by='ticker',
+                                        threads=True, progress=False, session=get_yfinance_session())
+                )
+            except Exception as e:
+                logger.error(f"Error downloading quotes: {e}")
+                continue
+
+            if data is None or data.empty:
+                continue
+
+            for symbol in chunk:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if symbol not in data.columns.get_level_values(0):
+                        continue
+                    bars = data[symbol]
+                else:
+                    bars = data
+                bars = bars.dropna(subset=['Close'])
+                if bars.empty:
+                    continue
+                last = bars.iloc[-1]
+                volume = int(last['Volume']) if pd.notna(last['Volume']) else 0
+                quotes[symbol] = (float(last['Close']), volume)
+        return quotes, attempted
+
+
+def run_quote_refresh(db_path: str = "data/ipo_analytics.db", time_budget: Optional[float] = None,
+                      all_sessions: bool = False) -> Dict:
+    """Run a quote-only refresh, optionally within a time budget, and record it in refresh_log as QUOTE_REFRESH"""
+    started_at = datetime.now().isoformat()
+    db = IPODatabase(db_path)
+    try:
+        result = QuoteRefresher(db_path).refresh(time_budget, all_sessions)
+    except Exception as e:
+        logger.error(f"Quote refresh failed: {e}")
+        db.log_refresh("QUOTE_REFRESH", "FAILED", error_message=str(e), started_at=started_at)
+        raise
+
+    db.log_refresh(
+        refresh_type="QUOTE_REFRESH",
+        status="SUCCESS" if result['missing'] == 0 and result['deferred'] == 0 else "PARTIAL",
+        records_processed=result['updated'],
+        started_at=started_at
+    )
+    return result
+
+
+if __name__ == "__main__":
+    print(run_quote_refresh())
@@ -0,0 +1,169 @@
+"""
+Refresh Coordination for IPO Analytics
+Collapses concurrent requests for the same refresh into one in-flight run,
+across dashboard sessions in one process and across processes, through a
+lock row per refresh job that the running job keeps alive with heartbeats
+
+The lock rows live in the same database as the refresh_jobs queue: the
+remote Postgres database from db_util when DB_URL is set, so the guarantee
+holds across hosts, otherwise the local SQLite database, which only
+coordinates processes on one host.
+"""
+
+import json
+import uuid
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from db_util import get_coordination_engine
+
+logger = logging.getLogger(__name__)
+
+# A lock not renewed for this long belongs to a crashed run and can be taken over
+LOCK_TTL = timedelta(minutes=2)
+
+# How often a running job renews its lock and publishes progress
+HEARTBEAT_SECONDS = 30
+
+
+def _local_time(timestamp: str) -> str:
+    # Lock times are stored in UTC so hosts agree; callers display local time
+    return datetime.fromisoformat(timestamp).astimezone().isoformat()
+
+
+class RefreshCoordinator:
+    """Lock rows in refresh_locks, one per refresh job name"""
+
+    # Serializes check-and-acquire between Streamlit sessions sharing a process
+    _process_lock = threading.Lock()
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.engine = get_coordination_engine(db_path)
+        self.init_tables()
+
+    def init_tables(self):
+        """Create the refresh lock table if needed"""
+        with self.engine.begin() as conn:
+            conn.execute(text('''
+                CREATE TABLE IF NOT EXISTS refresh_locks (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    started_at TEXT NOT NULL,
+                    heartbeat_at TEXT NOT NULL,
+                    expires_at TEXT NOT NULL,
+                    progress TEXT
+                )
+            '''))
+
+    def acquire(self, name: str, owner: Optional[str] = None) -> Optional[str]:
+        """
+        Take the lock for a refresh job unless a live run holds it
+
+        Args:
+            name: Refresh job name
+            owner: Token to hold the lock under (a new one is generated by default)
+
+        Returns:
+            The owner token if the lock was taken, None if another run holds it
+        """
+        owner = owner or uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        with self._process_lock, self.engine.begin() as conn:
+            # Inserts a new lock, or takes over one whose holder stopped sending heartbeats
+            result = conn.execute(text('''
+                INSERT INTO refresh_locks (name, owner, started_at, heartbeat_at, expires_at, progress)
+                VALUES (:name, :owner, :now, :now, :expires, NULL)
+                ON CONFLICT (name) DO UPDATE SET
+                    owner = excluded.owner, started_at = excluded.started_at,
+                    heartbeat_at = excluded.heartbeat_at, expires_at = excluded.expires_at, progress = NULL
+                WHERE refresh_locks.expires_at < excluded.heartbeat_at
+            '''), {'name': name, 'owner': owner, 'now': now.isoformat(), 'expires': (now + LOCK_TTL).isoformat()})
+            return owner if result.rowcount == 1 else None
+
+    def heartbeat(self, name: str, owner: str, progress: Optional[Dict] = None) -> bool:
+        """Renew a held lock and publish progress; False if the lock was lost"""
+        now = datetime.now(timezone.utc)
+        with self.engine.begin() as conn:
+            result = conn.execute(text('''
+                UPDATE refresh_locks SET heartbeat_at = :now, expires_at = :expires,
+                    progress = COALESCE(:progress, progress)
+                WHERE name = :name AND owner = :owner
+            '''), {'now': now.isoformat(), 'expires': (now + LOCK_TTL).isoformat(),
+                   'progress': json.dumps(progress) if progress is not None else None,
+                   'name': name, 'owner': owner})
+            return result.rowcount == 1
+
+    def release(self, name: str, owner: str):
+        """Drop a held lock"""
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM refresh_locks WHERE name = :name AND owner = :owner"),
+                         {'name': name, 'owner': owner})
+
+    def current(self, name: str) -> Optional[Dict]:
+        """The live run of a refresh job, with its start time and last published progress"""
+        with self.engine.connect() as conn:
+            row = conn.execute(text('''
+                SELECT owner, started_at, heartbeat_at, progress FROM refresh_locks
+                WHERE name = :name AND expires_at >= :now
+            '''), {'name': name, 'now': datetime.now(timezone.utc).isoformat()}).fetchone()
+        if not row:
+            return None
+        return {
+            'name': name,
+            'owner': row[0],
+            'started_at': _local_time(row[1]),
+            'heartbeat_at': _local_time(row[2]),
+            'progress': json.loads(row[3]) if row[3] else {},
+        }
+
+    def run_exclusive(self, name: str, job: Callable[[], Dict], owner: Optional[str] = None,
+                      progress: Optional[Callable[[], Dict]] = None) -> Dict:
+        """
+        Run a refresh job under its lock, or attach to the run already holding it
+
+        Args:
+            name: Refresh job name
+            job: The refresh to run
+            owner: Token of a lock already taken for this run (e.g. by the
+                dashboard that started the process); otherwise one is acquired
+            progress: Called on every heartbeat for the progress published to attached callers
+
+        Returns:
+            The job's result, or {'status': 'attached', 'run': current run} if
+            another run already holds the lock
+        """
+        if owner:
+            if not self.heartbeat(name, owner):
+                owner = self.acquire(name, owner)
+        else:
+            owner = self.acquire(name)
+        if owner is None:
+            run = self.current(name)
+            logger.info(f"{name} refresh already running since {run['started_at'] if run else '?'}, attaching")
+            return {'status': 'attached', 'run': run}
+
+        stopped = threading.Event()
+
+        def keep_alive():
+            while not stopped.wait(HEARTBEAT_SECONDS):
+                try:
+                    if not self.heartbeat(name, owner, progress() if progress else None):
+                        logger.warning(f"Lost the {name} refresh lock")
+                except Exception as e:
+                    logger.error(f"Error renewing the {name} refresh lock: {e}")
+
+        heartbeat_thread = threading.Thread(target=keep_alive, name=f"{name}-lock-heartbeat", daemon=True)
+        heartbeat_thread.start()
+        try:
+            return job()
+        finally:
+            stopped.set()
+            heartbeat_thread.join()
+            self.release(name, owner)
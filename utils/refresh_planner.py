@@ -0,0 +1,135 @@
+"""
+Refresh Planning for IPO Analytics
+Orders ipo_data rows by how stale and how valuable they are (recent IPOs,
+large market caps, tickers shown on the dashboard) so a refresh with a time
+budget always covers the most valuable rows first, and flags rows whose
+exchange has not traded since they were last updated
+"""
+
+import math
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from exchange_sessions import session_for
+
+logger = logging.getLogger(__name__)
+
+# Staleness saturates after this long; a row never refreshed counts as fully stale
+STALENESS_CAP = timedelta(hours=72)
+
+# The recent-IPO boost halves every this many days after listing
+RECENT_IPO_HALF_LIFE_DAYS = 180
+
+# Tickers rendered on a dashboard within this window count as visible
+VISIBILITY_WINDOW = timedelta(hours=24)
+
+# Importance = 1 + weighted boosts, so an unremarkable stale row still gets refreshed eventually
+RECENT_IPO_WEIGHT = 2.0
+MARKET_CAP_WEIGHT = 1.0
+VISIBLE_WEIGHT = 3.0
+
+
+class RefreshPlanner:
+    """Scores ipo_data rows by staleness times importance"""
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.init_tables()
+
+    def init_tables(self):
+        """Create the dashboard visibility table if needed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS dashboard_visibility (
+                    ticker TEXT PRIMARY KEY,
+                    last_seen TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+
+    def mark_visible(self, tickers: Iterable[str]):
+        """Record ipo_data tickers currently shown on a dashboard"""
+        now = datetime.now().isoformat()
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO dashboard_visibility (ticker, last_seen) VALUES (?, ?)",
+                [(ticker, now) for ticker in set(tickers) if ticker]
+            )
+            conn.commit()
+
+    def visible_tickers(self) -> set:
+        """Tickers shown on a dashboard within the visibility window"""
+        since = (datetime.now() - VISIBILITY_WINDOW).isoformat()
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute("SELECT ticker FROM dashboard_visibility WHERE last_seen >= ?", (since,)).fetchall()
+        return {row[0] for row in rows}
+
+    def plan(self, as_of: Optional[datetime] = None) -> List[Dict]:
+        """
+        Every ipo_data row in refresh order, highest priority first
+
+        priority = staleness * importance, where staleness is the time since
+        last_updated relative to STALENESS_CAP (0..1) and importance adds
+        boosts for a recent IPO date, market cap rank and dashboard visibility.
+
+        Args:
+            as_of: Time staleness and IPO age are measured at (defaults to now)
+
+        Returns:
+            List of dictionaries with ticker, exchange, ipo_price, current_price,
+            market_cap, staleness, importance, priority and has_new_data (False
+            when the exchange's session produced no prices since last_updated)
+        """
+        as_of = as_of or datetime.now()
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute(
+                "SELECT ticker, exchange, country, ipo_date, ipo_price, current_price, market_cap, "
+                "last_updated FROM ipo_data"
+            ).fetchall()
+        visible = self.visible_tickers()
+
+        # Market cap as a percentile rank so a few mega caps don't dwarf everything else
+        caps = sorted(row[6] for row in rows if row[6])
+        cap_rank = {cap: i / max(1, len(caps) - 1) for i, cap in enumerate(caps)}
+
+        planned = []
+        sessions = {}
+        for ticker, exchange, country, ipo_date, ipo_price, current_price, market_cap, last_updated in rows:
+            staleness = 1.0
+            updated_at = datetime.fromisoformat(last_updated) if last_updated else None
+            if updated_at:
+                staleness = min(1.0, max(0.0, (as_of - updated_at) / STALENESS_CAP))
+
+            if (exchange, country) not in sessions:
+                sessions[(exchange, country)] = session_for(exchange, country)
+            session = sessions[(exchange, country)]
+            has_new_data = session is None or session.has_new_data(updated_at, as_of)
+
+            recency = 0.0
+            if ipo_date:
+                days_listed = max(0, (as_of - datetime.fromisoformat(ipo_date[:10])).days)
+                recency = math.pow(0.5, days_listed / RECENT_IPO_HALF_LIFE_DAYS)
+
+            importance = (1.0
+                          + RECENT_IPO_WEIGHT * recency
+                          + MARKET_CAP_WEIGHT * cap_rank.get(market_cap, 0.0)
+                          + VISIBLE_WEIGHT * (ticker in visible))
+            planned.append({
+                'ticker': ticker,
+                'exchange': exchange,
+                'ipo_price': ipo_price,
+                'current_price': current_price,
+                'market_cap': market_cap,
+                'staleness': staleness,
+                'importance': importance,
+                'priority': staleness * importance,
+                'has_new_data': has_new_data,
+            })
+
+        planned.sort(key=lambda row: row['priority'], reverse=True)
+        return planned
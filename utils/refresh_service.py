@@ -0,0 +1,324 @@
+"""
+Refresh Service for IPO Analytics
+Runs the network-bound refresh jobs (full global load, quote-only refresh,
+performance metrics) outside the Streamlit process, either once from the
+command line or on fixed cadences as a long-running scheduler
+
+Usage:
+    python -m utils.refresh_service full [--force]
+    python -m utils.refresh_service quotes [--budget SECONDS] [--all-sessions]
+    python -m utils.refresh_service metrics [--mode incremental|panel|backfill] [--rebuild]
+    python -m utils.refresh_service daemon [--full-hours 24] [--quote-minutes 30] [--metrics-hours 6]
+    python -m utils.refresh_service worker [--yahoo-rate 2]   (run one per process or host)
+
+Cadences default to the IPO_REFRESH_FULL_HOURS, IPO_REFRESH_QUOTE_MINUTES and
+IPO_REFRESH_METRICS_HOURS environment variables; a cadence of 0 disables the job.
+IPO_REFRESH_QUOTE_BUDGET_SECONDS bounds each scheduled quote refresh.
+"""
+
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import subprocess
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(__file__))
+
+from database import IPODatabase
+from fetch_engine import get_fetch_engine
+from http_client import connection_stats
+from enhanced_global_loader import GLOBAL_LOAD_CHECKPOINT, update_global_ipo_database, load_performance_metrics
+from metrics_backfill import backfill_performance_metrics
+from quote_refresh import run_quote_refresh
+from refresh_coordinator import RefreshCoordinator
+from refresh_workers import DEFAULT_CHUNK_SIZE, get_lease_queue, plan_global_refresh, run_refresh_worker
+
+logger = logging.getLogger(__name__)
+
+# refresh_log type written by each job; the scheduler reads it back to find when a job last ran
+REFRESH_TYPES = {
+    'full': "COMPREHENSIVE_GLOBAL_REFRESH",
+    'quotes': "QUOTE_REFRESH",
+    'metrics': "METRICS_REFRESH",
+}
+
+DEFAULT_CADENCES = {
+    'full': float(os.getenv("IPO_REFRESH_FULL_HOURS", 24)) * 3600,
+    'quotes': float(os.getenv("IPO_REFRESH_QUOTE_MINUTES", 30)) * 60,
+    'metrics': float(os.getenv("IPO_REFRESH_METRICS_HOURS", 6)) * 3600,
+}
+
+# Seconds each scheduled quote refresh may spend; the most valuable stale rows go first
+QUOTE_TIME_BUDGET = float(os.getenv("IPO_REFRESH_QUOTE_BUDGET_SECONDS", 0)) or None
+
+# A failed job is retried after this long, or after its cadence if that is shorter
+FAILURE_RETRY_SECONDS = 15 * 60
+
+# Longest the scheduler sleeps between checks
+POLL_SECONDS = 60
+
+
+def run_full_refresh(db_path: str = "data/ipo_analytics.db", force: bool = False,
+                     max_per_region: int = 150, min_interval_hours: float = 24) -> Dict:
+    """Global load plus recent US IPOs; skipped when the last full refresh is recent unless forced"""
+    return update_global_ipo_database(force_refresh=force, db_path=db_path,
+                                      max_per_region=max_per_region,
+                                      min_interval_hours=min_interval_hours)
+
+
+def run_metrics_refresh(db_path: str = "data/ipo_analytics.db", mode: str = "incremental",
+                        rebuild: bool = False, refresh_prices: bool = True) -> Dict:
+    """
+    Recompute performance_metrics and record the run in refresh_log as METRICS_REFRESH
+
+    Args:
+        db_path: SQLite database holding ipo_data and performance_metrics
+        mode: 'incremental' (persisted metric state), 'panel' (full NumPy recompute)
+            or 'backfill' (process pool, resumable)
+        rebuild: With incremental mode, verify the state against a full recompute
+        refresh_prices: Update cached price histories first
+
+    Returns:
+        Dictionary with the mode and the number of tickers written
+    """
+    started_at = datetime.now().isoformat()
+    db = IPODatabase(db_path)
+    try:
+        if mode == "backfill":
+            summary = backfill_performance_metrics(db_path, refresh_prices=refresh_prices)
+            written = summary['written']
+            status = "SUCCESS" if summary['failed_chunks'] == 0 else "PARTIAL"
+        else:
+            written = load_performance_metrics(db_path, refresh_prices=refresh_prices,
+                                               incremental=mode == "incremental", rebuild=rebuild)
+            status = "SUCCESS"
+    except Exception as e:
+        logger.error(f"Metrics refresh failed: {e}")
+        db.log_refresh(REFRESH_TYPES['metrics'], "FAILED", error_message=str(e), started_at=started_at)
+        raise
+
+    db.log_refresh(REFRESH_TYPES['metrics'], status, records_processed=written, started_at=started_at)
+    return {'mode': mode, 'written': written, 'status': status}
+
+
+def run_exclusive(job: str, refresh: Callable[[], Dict], db_path: str = "data/ipo_analytics.db",
+                  lock_owner: Optional[str] = None) -> Dict:
+    """Run a refresh job unless the same job is already running elsewhere, which it then attaches to"""
+    db = IPODatabase(db_path)
+    progress = None
+    if job == 'full':
+        progress = lambda: {'records_committed': len(db.get_checkpoint(GLOBAL_LOAD_CHECKPOINT)),
+                            'concurrency': get_fetch_engine().telemetry(),
+                            'connections': connection_stats()}
+    return RefreshCoordinator(db_path).run_exclusive(job, refresh, owner=lock_owner, progress=progress)
+
+
+class RefreshScheduler:
+    """Runs refresh jobs on fixed cadences, timed from their last refresh_log entry"""
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db",
+                 cadences: Optional[Dict[str, float]] = None,
+                 jobs: Optional[Dict[str, Callable[[], Dict]]] = None,
+                 quote_budget: Optional[float] = QUOTE_TIME_BUDGET):
+        """
+        Args:
+            db_path: SQLite database the jobs refresh
+            cadences: Seconds between runs per job name; 0 disables a job
+            jobs: Callable per job name (defaults to the full, quote and metrics refreshes)
+            quote_budget: Seconds each quote refresh may spend (None for no limit)
+        """
+        self.db_path = db_path
+        self.db = IPODatabase(db_path)
+        self.cadences = {**DEFAULT_CADENCES, **(cadences or {})}
+        self.jobs = jobs or {
+            # The scheduler already decided the full refresh is due
+            'full': lambda: run_exclusive('full', lambda: run_full_refresh(db_path, force=True), db_path),
+            'quotes': lambda: run_exclusive('quotes', lambda: run_quote_refresh(db_path, time_budget=quote_budget),
+                                            db_path),
+            'metrics': lambda: run_exclusive('metrics', lambda: run_metrics_refresh(db_path), db_path),
+        }
+        self.retry_at: Dict[str, datetime] = {}
+        self.running = True
+
+    def next_due(self, job: str) -> Optional[datetime]:
+        """When a job should next run; None if it is disabled"""
+        cadence = self.cadences.get(job, 0)
+        if cadence <= 0:
+            return None
+        if job in self.retry_at:
+            return self.retry_at[job]
+        last_refresh = self.db.get_last_refresh(refresh_type=REFRESH_TYPES[job])
+        if not last_refresh:
+            return datetime.now()
+        if last_refresh['status'] in ('INTERRUPTED', 'FAILED'):
+            # Resume from the checkpoint soon rather than a full cadence later
+            cadence = min(cadence, FAILURE_RETRY_SECONDS)
+        return datetime.fromisoformat(last_refresh['completed_at']) + timedelta(seconds=cadence)
+
+    def run_pending(self) -> List[str]:
+        """Run every job that is due, full refresh first; returns the jobs that ran"""
+        ran = []
+        for job in self.jobs:
+            due = self.next_due(job)
+            if due is None or due > datetime.now() or not self.running:
+                continue
+
+            start = time.perf_counter()
+            logger.info(f"Scheduled {job} refresh starting")
+            try:
+                result = self.jobs[job]()
+                self.retry_at.pop(job, None)
+                logger.info(f"Scheduled {job} refresh finished in {time.perf_counter() - start:.1f}s: {result}")
+            except Exception as e:
+                retry = min(self.cadences[job], FAILURE_RETRY_SECONDS)
+                self.retry_at[job] = datetime.now() + timedelta(seconds=retry)
+                logger.error(f"Scheduled {job} refresh failed after {time.perf_counter() - start:.1f}s, "
+                             f"retrying in {retry / 60:.0f} min: {e}")
+            ran.append(job)
+        return ran
+
+    def run_forever(self):
+        """Run due jobs until SIGINT or SIGTERM, sleeping until the next one is due"""
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        signal.signal(signal.SIGINT, lambda *_: self.stop())
+        logger.info("Refresh scheduler started with cadences (s): "
+                    + ", ".join(f"{job}={self.cadences.get(job, 0):.0f}" for job in self.jobs))
+
+        while self.running:
+            self.run_pending()
+            upcoming = [due for due in map(self.next_due, self.jobs) if due is not None]
+            wait = POLL_SECONDS
+            if upcoming:
+                wait = min(POLL_SECONDS, max(1.0, (min(upcoming) - datetime.now()).total_seconds()))
+            # Sleep in short steps so a stop signal is picked up promptly
+            deadline = time.monotonic() + wait
+            while self.running and time.monotonic() < deadline:
+                time.sleep(min(1.0, deadline - time.monotonic()))
+        logger.info("Refresh scheduler stopped")
+
+    def stop(self):
+        self.running = False
+
+
+def trigger_refresh(job: str = "full", db_path: str = "data/ipo_analytics.db",
+                    force: bool = True, lock_owner: Optional[str] = None) -> subprocess.Popen:
+    """
+    Start a refresh job in a detached background process
+
+    Lets the dashboards offer a refresh button without running network-bound
+    ingestion on the Streamlit request thread.
+    """
+    command = [sys.executable, os.path.abspath(__file__), job, '--db-path', db_path]
+    if force and job == "full":
+        command.append('--force')
+    if lock_owner:
+        command += ['--lock-owner', lock_owner]
+    logger.info(f"Starting background {job} refresh")
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+def request_refresh(job: str = "full", db_path: str = "data/ipo_analytics.db", force: bool = True) -> Dict:
+    """
+    Start a background refresh, or attach to the one already running
+
+    The job's lock is taken here before the process starts, so repeated
+    clicks from any session or page between the click and the process
+    starting collapse into the same run.
+
+    Returns:
+        Dictionary with status ('started' or 'attached') and the run's lock
+        details (started_at, heartbeat_at, progress)
+    """
+    coordinator = RefreshCoordinator(db_path)
+    owner = coordinator.acquire(job)
+    if owner is None:
+        return {'status': 'attached', 'run': coordinator.current(job)}
+    try:
+        trigger_refresh(job, db_path, force=force, lock_owner=owner)
+    except Exception:
+        coordinator.release(job, owner)
+        raise
+    return {'status': 'started', 'run': coordinator.current(job)}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Refresh IPO data outside the Streamlit app")
+    parser.add_argument('--db-path', default="data/ipo_analytics.db")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    full = subparsers.add_parser('full', help='Global IPO load plus recent US IPOs')
+    full.add_argument('--force', action='store_true', help='Ignore the minimum interval since the last full refresh')
+    full.add_argument('--max-per-region', type=int, default=150)
+    full.add_argument('--min-interval-hours', type=float, default=24)
+
+    quotes = subparsers.add_parser('quotes', help='Quote-only refresh of prices, volume and market cap')
+    quotes.add_argument('--budget', type=float, default=None,
+                        help='Seconds to spend; the most valuable stale rows are quoted first')
+    quotes.add_argument('--all-sessions', action='store_true',
+                        help='Also re-quote exchanges that have been closed since the last update')
+
+    metrics = subparsers.add_parser('metrics', help='Recompute performance_metrics')
+    metrics.add_argument('--mode', choices=['incremental', 'panel', 'backfill'], default='incremental')
+    metrics.add_argument('--rebuild', action='store_true', help='Verify incremental state against a full recompute')
+    metrics.add_argument('--no-refresh', action='store_true', help='Use cached price history as is')
+
+    daemon = subparsers.add_parser('daemon', help='Run the jobs on a schedule until stopped')
+    daemon.add_argument('--full-hours', type=float, default=DEFAULT_CADENCES['full'] / 3600)
+    daemon.add_argument('--quote-minutes', type=float, default=DEFAULT_CADENCES['quotes'] / 60)
+    daemon.add_argument('--metrics-hours', type=float, default=DEFAULT_CADENCES['metrics'] / 3600)
+    daemon.add_argument('--quote-budget', type=float, default=QUOTE_TIME_BUDGET,
+                        help='Seconds each scheduled quote refresh may spend')
+
+    worker = subparsers.add_parser('worker', help='Lease and process chunks of a distributed global load')
+    worker.add_argument('--run-id', default=None, help='Run to join (default: the open run, or a new one)')
+    worker.add_argument('--max-per-region', type=int, default=150)
+    worker.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    worker.add_argument('--yahoo-rate', type=float, default=None,
+                        help='Yahoo requests per second for this worker')
+    worker.add_argument('--worker-id', default=None)
+
+    # Accept --db-path after the subcommand too, as trigger_refresh passes it
+    for subparser in (full, quotes, metrics, daemon, worker):
+        subparser.add_argument('--db-path', default=argparse.SUPPRESS)
+    for subparser in (full, quotes, metrics):
+        subparser.add_argument('--lock-owner', default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    if args.command == 'full':
+        result = run_exclusive('full', lambda: run_full_refresh(
+            args.db_path, force=args.force, max_per_region=args.max_per_region,
+            min_interval_hours=args.min_interval_hours
+        ), args.db_path, args.lock_owner)
+    elif args.command == 'quotes':
+        result = run_exclusive('quotes', lambda: run_quote_refresh(
+            args.db_path, time_budget=args.budget, all_sessions=args.all_sessions
+        ), args.db_path, args.lock_owner)
+    elif args.command == 'worker':
+        queue = get_lease_queue(args.db_path)
+        run_id = args.run_id or plan_global_refresh(queue, args.max_per_region, args.chunk_size, args.db_path)
+        result = run_refresh_worker(queue, run_id, args.db_path, worker_id=args.worker_id,
+                                    yahoo_rate=args.yahoo_rate)
+        result['run'] = {'run_id': run_id, **queue.status(run_id)}
+    elif args.command == 'metrics':
+        result = run_exclusive('metrics', lambda: run_metrics_refresh(
+            args.db_path, mode=args.mode, rebuild=args.rebuild, refresh_prices=not args.no_refresh
+        ), args.db_path, args.lock_owner)
+    else:
+        RefreshScheduler(args.db_path, cadences={
+            'full': args.full_hours * 3600,
+            'quotes': args.quote_minutes * 60,
+            'metrics': args.metrics_hours * 3600,
+        }, quote_budget=args.quote_budget).run_forever()
+        return
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
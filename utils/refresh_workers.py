@@ -0,0 +1,356 @@
+"""
+Distributed Refresh Workers for IPO Analytics
+Splits the global IPO load into chunks recorded in a refresh_jobs table so
+several worker processes or hosts can lease and complete them concurrently;
+leases held by crashed workers expire and are picked up by another worker
+
+The queue lives in the remote Postgres database from db_util when DB_URL is
+set, otherwise in the local SQLite database.
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from database import IPODatabase
+from db_util import get_coordination_engine, remote_db_available, insert_ipo_records_remote
+from fetch_engine import YAHOO_HOST, get_fetch_engine
+from global_yfinance_util import GlobalIPODataFetcher
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_REFRESH_QUEUE = "global_ipo_load"
+
+# Job keys per leased chunk
+DEFAULT_CHUNK_SIZE = 25
+
+# A lease not renewed for this long is considered abandoned
+LEASE_SECONDS = 300
+
+# How often a worker renews the lease of the chunk it is processing
+HEARTBEAT_SECONDS = LEASE_SECONDS / 3
+
+# A chunk is marked failed after this many leases without completing
+MAX_ATTEMPTS = 3
+
+# How often an idle worker checks for expired leases while other workers finish
+IDLE_POLL_SECONDS = 10
+
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _utc_in(seconds: float) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
+class ChunkLeaseQueue:
+    """Chunks of work in a refresh_jobs table, handed out under expiring leases"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        # Postgres lets concurrent lessees skip a row another transaction is claiming
+        self._skip_locked = " FOR UPDATE SKIP LOCKED" if engine.dialect.name == "postgresql" else ""
+        self.init_tables()
+
+    def init_tables(self):
+        """Create the refresh_jobs table if needed"""
+        with self.engine.begin() as conn:
+            conn.execute(text('''
+                CREATE TABLE IF NOT EXISTS refresh_jobs (
+                    queue TEXT NOT NULL,
+                    run_id TEXT NOT NULL,
+                    chunk_id INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    worker_id TEXT,
+                    lease_expires_at TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    records INTEGER,
+                    error_message TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (run_id, chunk_id)
+                )
+            '''))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_refresh_jobs_status ON refresh_jobs (run_id, status)"
+            ))
+
+    def create_run(self, queue: str, chunks: List[List]) -> str:
+        """Record a new run of pending chunks and return its run_id"""
+        with self.engine.begin() as conn:
+            return self._insert_run(conn, queue, chunks)
+
+    def open_run(self, queue: str) -> Optional[str]:
+        """Latest run of a queue that still has pending or leased chunks"""
+        with self.engine.connect() as conn:
+            return self._open_run(conn, queue)
+
+    def open_or_create_run(self, queue: str, chunks: List[List]) -> Tuple[str, bool]:
+        """
+        Join the open run of a queue, or record a new one if there is none
+
+        The check and the insert share one transaction that holds the queue's
+        write lock, so workers planning at the same time agree on one run
+        instead of each creating their own.
+
+        Returns:
+            Tuple of the run_id and whether this call created it
+        """
+        with self.engine.begin() as conn:
+            self._lock_queue(conn, queue)
+            run_id = self._open_run(conn, queue)
+            if run_id:
+                return run_id, False
+            return self._insert_run(conn, queue, chunks), True
+
+    def _lock_queue(self, conn, queue: str):
+        # Held until the transaction ends
+        if self.engine.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:queue))"), {'queue': queue})
+        else:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def _open_run(self, conn, queue: str) -> Optional[str]:
+        row = conn.execute(text('''
+            SELECT run_id FROM refresh_jobs
+            WHERE queue = :queue AND status IN ('pending', 'leased')
+            ORDER BY run_id DESC LIMIT 1
+        '''), {'queue': queue}).fetchone()
+        return row[0] if row else None
+
+    def _insert_run(self, conn, queue: str, chunks: List[List]) -> str:
+        run_id = f"{queue}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}"
+        now = _utcnow()
+        conn.execute(text('''
+            INSERT INTO refresh_jobs (queue, run_id, chunk_id, payload, status, attempts, updated_at)
+            VALUES (:queue, :run_id, :chunk_id, :payload, 'pending', 0, :now)
+        '''), [{'queue': queue, 'run_id': run_id, 'chunk_id': i, 'payload': json.dumps(chunk), 'now': now}
+               for i, chunk in enumerate(chunks)])
+        logger.info(f"Created refresh run {run_id} with {len(chunks)} chunks")
+        return run_id
+
+    def lease(self, run_id: str, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Dict]:
+        """
+        Lease the next available chunk of a run
+
+        A chunk is available when it is pending, or leased with an expired
+        lease. The claim is a single UPDATE, so two workers never hold the
+        same live lease.
+
+        Returns:
+            Dictionary with chunk_id, keys and attempts, or None if nothing is available
+        """
+        now = _utcnow()
+        available = "(status = 'pending' OR (status = 'leased' AND lease_expires_at < :now))"
+        with self.engine.begin() as conn:
+            # Chunks whose leases keep expiring are given up on rather than retried forever
+            conn.execute(text(f'''
+                UPDATE refresh_jobs SET status = 'failed', error_message = 'lease expired too often',
+                    updated_at = :now
+                WHERE run_id = :run_id AND status = 'leased' AND lease_expires_at < :now
+                    AND attempts >= :max_attempts
+            '''), {'run_id': run_id, 'now': now, 'max_attempts': MAX_ATTEMPTS})
+            row = conn.execute(text(f'''
+                UPDATE refresh_jobs
+                SET status = 'leased', worker_id = :worker_id, lease_expires_at = :expires,
+                    attempts = attempts + 1, updated_at = :now
+                WHERE run_id = :run_id AND {available} AND chunk_id = (
+                    SELECT chunk_id FROM refresh_jobs
+                    WHERE run_id = :run_id AND {available}
+                    ORDER BY chunk_id LIMIT 1{self._skip_locked}
+                )
+                RETURNING chunk_id, payload, attempts
+            '''), {'run_id': run_id, 'worker_id': worker_id, 'now': now,
+                   'expires': _utc_in(lease_seconds)}).fetchone()
+        if not row:
+            return None
+        if row[2] > 1:
+            logger.info(f"Worker {worker_id} reclaimed chunk {row[0]} of {run_id} (attempt {row[2]})")
+        return {'chunk_id': row[0], 'keys': [tuple(key) for key in json.loads(row[1])], 'attempts': row[2]}
+
+    def renew(self, run_id: str, chunk_id: int, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Extend a lease this worker still holds"""
+        with self.engine.begin() as conn:
+            result = conn.execute(text('''
+                UPDATE refresh_jobs SET lease_expires_at = :expires, updated_at = :now
+                WHERE run_id = :run_id AND chunk_id = :chunk_id AND worker_id = :worker_id AND status = 'leased'
+            '''), {'run_id': run_id, 'chunk_id': chunk_id, 'worker_id': worker_id,
+                   'expires': _utc_in(lease_seconds), 'now': _utcnow()})
+        return result.rowcount == 1
+
+    def complete(self, run_id: str, chunk_id: int, worker_id: str, records: int) -> bool:
+        """Mark a leased chunk done; False if the lease was lost to another worker meanwhile"""
+        with self.engine.begin() as conn:
+            result = conn.execute(text('''
+                UPDATE refresh_jobs SET status = 'done', records = :records, lease_expires_at = NULL,
+                    updated_at = :now
+                WHERE run_id = :run_id AND chunk_id = :chunk_id AND worker_id = :worker_id AND status = 'leased'
+            '''), {'run_id': run_id, 'chunk_id': chunk_id, 'worker_id': worker_id,
+                   'records': records, 'now': _utcnow()})
+        return result.rowcount == 1
+
+    def fail(self, run_id: str, chunk_id: int, worker_id: str, error: str):
+        """Release a chunk after an error; it is retried until MAX_ATTEMPTS leases have failed"""
+        with self.engine.begin() as conn:
+            conn.execute(text('''
+                UPDATE refresh_jobs
+                SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'pending' END,
+                    error_message = :error, worker_id = NULL, lease_expires_at = NULL, updated_at = :now
+                WHERE run_id = :run_id AND chunk_id = :chunk_id AND worker_id = :worker_id AND status = 'leased'
+            '''), {'run_id': run_id, 'chunk_id': chunk_id, 'worker_id': worker_id,
+                   'error': error[:500], 'max_attempts': MAX_ATTEMPTS, 'now': _utcnow()})
+
+    def status(self, run_id: str) -> Dict[str, int]:
+        """Chunk count per status, plus the records written by completed chunks"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text('''
+                SELECT status, COUNT(*), COALESCE(SUM(records), 0) FROM refresh_jobs
+                WHERE run_id = :run_id GROUP BY status
+            '''), {'run_id': run_id}).fetchall()
+        summary = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0, 'records': 0}
+        for status, count, records in rows:
+            summary[status] = count
+            summary['records'] += records
+        return summary
+
+
+class LeaseHeartbeat:
+    """Background thread that renews one chunk lease until the block it guards exits"""
+
+    def __init__(self, queue: ChunkLeaseQueue, run_id: str, chunk_id: int, worker_id: str,
+                 interval: float = HEARTBEAT_SECONDS):
+        self.queue = queue
+        self.run_id = run_id
+        self.chunk_id = chunk_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{run_id}-{chunk_id}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.renew(self.run_id, self.chunk_id, self.worker_id):
+                    self.lost = True
+                    logger.warning(f"Worker {self.worker_id} could not renew chunk {self.chunk_id} "
+                                   f"of {self.run_id}; another worker holds it")
+                    return
+            except Exception as e:
+                # A transient database error; the next beat retries well before the lease runs out
+                logger.warning(f"Lease renewal for chunk {self.chunk_id} of {self.run_id} failed: {e}")
+
+
+def get_lease_queue(db_path: str = "data/ipo_analytics.db") -> ChunkLeaseQueue:
+    """Queue in the remote database when one is configured, otherwise in the local SQLite file"""
+    return ChunkLeaseQueue(get_coordination_engine(db_path))
+
+
+def plan_global_refresh(queue: ChunkLeaseQueue, max_per_region: int = 150,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        db_path: str = "data/ipo_analytics.db") -> str:
+    """
+    Split the global IPO load into leased chunks, or join the run already in progress
+
+    Returns:
+        run_id of the open run
+    """
+    run_id = queue.open_run(GLOBAL_REFRESH_QUEUE)
+    if run_id:
+        logger.info(f"Joining refresh run {run_id} already in progress")
+        return run_id
+
+    fetcher = GlobalIPODataFetcher(db_path)
+    keys = fetcher.build_job_keys(['Americas', 'EMEA', 'APAC'], max_per_region // 3)
+    chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+    # Another worker may have planned a run since the check above
+    run_id, created = queue.open_or_create_run(GLOBAL_REFRESH_QUEUE, chunks)
+    if not created:
+        logger.info(f"Joining refresh run {run_id} already in progress")
+    return run_id
+
+
+def run_refresh_worker(queue: ChunkLeaseQueue, run_id: str,
+                       db_path: str = "data/ipo_analytics.db",
+                       worker_id: Optional[str] = None,
+                       yahoo_rate: Optional[float] = None) -> Dict:
+    """
+    Lease and process chunks of a run until none are left
+
+    Fetched records are written to the local database and, when one is
+    configured, to the remote database. A heartbeat thread renews the lease
+    while a chunk is processed, however long a single fetch takes. While
+    other workers still hold leases the worker waits, so it can pick up
+    chunks whose leases expire.
+
+    Args:
+        queue: Lease queue holding the run
+        run_id: Run to work on
+        db_path: SQLite database to write records to
+        worker_id: Name recorded on leases (defaults to host:pid)
+        yahoo_rate: Yahoo requests per second for this worker, so several
+            workers on one network stay within the provider's allowance
+
+    Returns:
+        Dictionary with chunks, records and lost_leases for this worker
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    if yahoo_rate:
+        get_fetch_engine().host_limits[YAHOO_HOST] = {'rate': yahoo_rate, 'burst': max(1, int(yahoo_rate * 2))}
+
+    fetcher = GlobalIPODataFetcher(db_path)
+    db = IPODatabase(db_path)
+    result = {'chunks': 0, 'records': 0, 'lost_leases': 0}
+
+    while True:
+        chunk = queue.lease(run_id, worker_id)
+        if chunk is None:
+            progress = queue.status(run_id)
+            if progress['leased'] == 0 and progress['pending'] == 0:
+                break
+            time.sleep(IDLE_POLL_SECONDS)
+            continue
+
+        chunk_id = chunk['chunk_id']
+        records = []
+
+        try:
+            with LeaseHeartbeat(queue, run_id, chunk_id, worker_id):
+                fetcher.stream_ipos_for_keys(chunk['keys'], lambda key, record: records.append(record))
+                written = db.insert_ipo_data(records) if records else 0
+                if records and remote_db_available():
+                    insert_ipo_records_remote(records)
+        except Exception as e:
+            logger.error(f"Worker {worker_id} failed chunk {chunk_id} of {run_id}: {e}")
+            queue.fail(run_id, chunk_id, worker_id, str(e))
+            continue
+
+        if queue.complete(run_id, chunk_id, worker_id, written):
+            result['chunks'] += 1
+            result['records'] += written
+        else:
+            # Another worker reclaimed the chunk; the upserts above are harmless duplicates
+            result['lost_leases'] += 1
+            logger.warning(f"Worker {worker_id} lost the lease on chunk {chunk_id} of {run_id}")
+
+    logger.info(f"Worker {worker_id} finished {run_id}: {result['chunks']} chunks, "
+                f"{result['records']} records, {result['lost_leases']} lost leases")
+    return result
@@ -0,0 +1,214 @@
+"""
+SEC Filings Index for IPO Analytics
+Streams the SEC bulk submissions archive (submissions.zip from
+sec.gov/Archives/edgar/daily-index/bulkdata) member by member, without
+extracting it, and keeps the IPO registration and prospectus filings from
+each company's columnar filings.recent arrays in an indexed table
+"""
+
+import os
+import json
+import sqlite3
+import zipfile
+import argparse
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Where the downloaded archive is read from unless a path is given
+DEFAULT_SUBMISSIONS_PATH = os.environ.get('IPO_SEC_SUBMISSIONS_PATH', "data/sec/submissions.zip")
+
+# Registration statements and final prospectuses that mark an IPO
+IPO_FORMS = ('S-1', 'S-1/A', 'F-1', '424B4')
+
+# Byte patterns checked before parsing a member; companies that never filed one are skipped unparsed
+_FORM_MARKERS = tuple(f'"{form}"'.encode() for form in IPO_FORMS)
+
+# sec_filings columns filled from each extracted filing, in insert order
+FILING_COLUMNS = ('accession_number', 'cik', 'company_name', 'ticker', 'exchange', 'form',
+                  'filing_date', 'report_date', 'primary_document')
+
+# Members committed together with their archive state, so an interrupted load resumes cleanly
+COMMIT_EVERY = 1000
+
+
+def extract_ipo_filings(submission: Dict, forms: Iterable[str] = IPO_FORMS) -> List[Dict]:
+    """
+    IPO filings from one company's submissions JSON
+
+    Args:
+        submission: Parsed CIK##########.json document
+        forms: Form types to keep
+
+    Returns:
+        List of dictionaries with accession_number, cik, company_name, ticker,
+        exchange, form, filing_date, report_date and primary_document
+    """
+    forms = set(forms)
+    recent = submission.get('filings', {}).get('recent', {})
+    form_column = recent.get('form', [])
+    cik = str(submission.get('cik', '')).zfill(10)
+    tickers = submission.get('tickers') or [None]
+    exchanges = submission.get('exchanges') or [None]
+
+    def column(name, i):
+        values = recent.get(name) or []
+        return values[i] if i < len(values) else None
+
+    return [{
+        'accession_number': column('accessionNumber', i),
+        'cik': cik,
+        'company_name': submission.get('name'),
+        'ticker': tickers[0],
+        'exchange': exchanges[0],
+        'form': form,
+        'filing_date': column('filingDate', i),
+        'report_date': column('reportDate', i) or None,
+        'primary_document': column('primaryDocument', i),
+    } for i, form in enumerate(form_column) if form in forms and column('accessionNumber', i)]
+
+
+class SECFilingsIndex:
+    """IPO filings from the bulk submissions archive, refreshed per changed archive member"""
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.init_tables()
+
+    def init_tables(self):
+        """Create the filings and archive state tables if needed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sec_filings (
+                    accession_number TEXT PRIMARY KEY,
+                    cik TEXT NOT NULL,
+                    company_name TEXT,
+                    ticker TEXT,
+                    exchange TEXT,
+                    form TEXT NOT NULL,
+                    filing_date TEXT,
+                    report_date TEXT,
+                    primary_document TEXT,
+                    loaded_at TEXT NOT NULL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sec_filings_form_date ON sec_filings (form, filing_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sec_filings_date ON sec_filings (filing_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sec_filings_cik ON sec_filings (cik)")
+
+            # CRC of each archive member as last loaded; unchanged members are not re-read
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sec_submissions_state (
+                    member TEXT PRIMARY KEY,
+                    crc INTEGER NOT NULL,
+                    loaded_at TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+
+    def load(self, path: str = DEFAULT_SUBMISSIONS_PATH, full: bool = False) -> Dict:
+        """
+        Load IPO filings from the bulk submissions archive
+
+        Members are read one at a time straight from the zip. A member whose
+        CRC matches the last load is skipped without decompressing it, and one
+        without any IPO form type in its bytes is skipped without parsing it.
+
+        Args:
+            path: Local copy of submissions.zip
+            full: Re-read every member, ignoring the state of previous loads
+
+        Returns:
+            Dictionary with members, unchanged, parsed and filings counts
+        """
+        summary = {'members': 0, 'unchanged': 0, 'parsed': 0, 'filings': 0}
+        loaded_at = datetime.now().isoformat()
+
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            known = {} if full else dict(conn.execute("SELECT member, crc FROM sec_submissions_state").fetchall())
+            pending_filings, pending_state = [], []
+
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    # CIK##########.json holds filings.recent; the -submissions-NNN pages hold older history
+                    if not (info.filename.startswith('CIK') and info.filename.endswith('.json')) \
+                            or '-submissions-' in info.filename:
+                        continue
+                    summary['members'] += 1
+                    if known.get(info.filename) == info.CRC:
+                        summary['unchanged'] += 1
+                        continue
+
+                    data = archive.read(info)
+                    if any(marker in data for marker in _FORM_MARKERS):
+                        summary['parsed'] += 1
+                        for filing in extract_ipo_filings(json.loads(data)):
+                            pending_filings.append((*(filing[c] for c in FILING_COLUMNS), loaded_at))
+                    pending_state.append((info.filename, info.CRC, loaded_at))
+
+                    if len(pending_state) >= COMMIT_EVERY:
+                        summary['filings'] += self._write(conn, pending_filings, pending_state)
+                        pending_filings, pending_state = [], []
+
+            summary['filings'] += self._write(conn, pending_filings, pending_state)
+
+        logger.info(f"SEC submissions: {summary['members']} companies, {summary['unchanged']} unchanged, "
+                    f"{summary['parsed']} with IPO filings, {summary['filings']} filings written")
+        return summary
+
+    def _write(self, conn, filings: List[Tuple], state: List[Tuple]) -> int:
+        conn.executemany(f'''
+            INSERT OR REPLACE INTO sec_filings ({', '.join(FILING_COLUMNS)}, loaded_at)
+            VALUES ({', '.join('?' * (len(FILING_COLUMNS) + 1))})
+        ''', filings)
+        conn.executemany("INSERT OR REPLACE INTO sec_submissions_state (member, crc, loaded_at) VALUES (?, ?, ?)",
+                         state)
+        conn.commit()
+        return len(filings)
+
+    def has_filings(self) -> bool:
+        """Whether any archive has been loaded"""
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            return conn.execute("SELECT 1 FROM sec_filings LIMIT 1").fetchone() is not None
+
+    def recent_filings(self, days_back: int = 90, forms: Iterable[str] = IPO_FORMS) -> List[Dict]:
+        """
+        Filings of the given forms filed within the last days_back days, newest first
+
+        Returns:
+            List of dictionaries with company_name, ticker, cik, form,
+            filing_date, accession_number and primary_document
+        """
+        forms = list(forms)
+        since = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute(f'''
+                SELECT company_name, ticker, cik, form, filing_date, accession_number, primary_document
+                FROM sec_filings
+                WHERE form IN ({','.join('?' * len(forms))}) AND filing_date >= ?
+                ORDER BY filing_date DESC
+            ''', [*forms, since]).fetchall()
+        return [{
+            'company_name': company_name,
+            'ticker': ticker,
+            'cik': cik,
+            'form': form,
+            'filing_date': filing_date,
+            'accession_number': accession_number,
+            'primary_document': primary_document,
+        } for company_name, ticker, cik, form, filing_date, accession_number, primary_document in rows]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    parser = argparse.ArgumentParser(description="Load IPO filings from the SEC bulk submissions archive")
+    parser.add_argument('path', nargs='?', default=DEFAULT_SUBMISSIONS_PATH, help="Local submissions.zip")
+    parser.add_argument('--db-path', default="data/ipo_analytics.db")
+    parser.add_argument('--full', action='store_true', help="Re-read every member, not just changed ones")
+    args = parser.parse_args()
+    SECFilingsIndex(args.db_path).load(args.path, full=args.full)
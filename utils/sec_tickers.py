@@ -0,0 +1,177 @@
+"""
+SEC Ticker Index for IPO Analytics
+Loads the SEC company tickers file (company_tickers.json or
+company_tickers_exchange.json from sec.gov/files) from a local path into an
+indexed table, with in-memory dictionaries for ticker, CIK and name lookups
+"""
+
+import os
+import re
+import json
+import sqlite3
+import argparse
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Where the downloaded SEC file is read from unless a path is given
+DEFAULT_TICKERS_PATH = os.environ.get('IPO_SEC_TICKERS_PATH', "data/sec/company_tickers.json")
+
+# Legal-form suffixes dropped when matching company names
+NAME_SUFFIXES = re.compile(r'\b(inc|incorporated|corp|corporation|co|company|ltd|limited|plc|llc|lp|'
+                           r'holdings?|group|sa|nv|ag|se)\b')
+
+
+def normalize_cik(cik) -> str:
+    """CIK as the 10-digit zero-padded string EDGAR URLs use"""
+    return str(int(cik)).zfill(10)
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase company name without punctuation or legal-form suffixes"""
+    name = re.sub(r'[^a-z0-9 ]', ' ', (name or '').lower())
+    return ' '.join(NAME_SUFFIXES.sub(' ', name).split())
+
+
+def read_company_tickers(path: str) -> Iterator[Tuple[str, str, str, Optional[str]]]:
+    """
+    Rows of an SEC company tickers file as (cik, ticker, name, exchange)
+
+    Accepts both company_tickers.json ({"0": {"cik_str", "ticker", "title"}, ...})
+    and company_tickers_exchange.json ({"fields": [...], "data": [[...], ...]}).
+    """
+    with open(path) as f:
+        content = json.load(f)
+
+    if 'fields' in content and 'data' in content:
+        fields = content['fields']
+        for row in content['data']:
+            record = dict(zip(fields, row))
+            yield normalize_cik(record['cik']), record['ticker'].upper(), record['name'], record.get('exchange')
+    else:
+        for record in content.values():
+            yield normalize_cik(record['cik_str']), record['ticker'].upper(), record['title'], None
+
+
+class SECTickerIndex:
+    """Ticker, CIK and company name lookups over the sec_company_tickers table"""
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._by_ticker: Optional[Dict[str, Dict]] = None
+        self._by_cik: Dict[str, List[str]] = {}
+        self._by_name: Dict[str, str] = {}
+        self.init_tables()
+
+    def init_tables(self):
+        """Create the SEC ticker table and its lookup indexes if needed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sec_company_tickers (
+                    ticker TEXT PRIMARY KEY,
+                    cik TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    normalized_name TEXT NOT NULL,
+                    exchange TEXT,
+                    loaded_at TEXT NOT NULL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sec_company_tickers_cik ON sec_company_tickers (cik)")
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_sec_company_tickers_name
+                ON sec_company_tickers (normalized_name)
+            ''')
+            conn.commit()
+
+    def load(self, path: str = DEFAULT_TICKERS_PATH) -> int:
+        """
+        Replace the index with the contents of an SEC company tickers file
+
+        Args:
+            path: Local copy of company_tickers.json or company_tickers_exchange.json
+
+        Returns:
+            Number of tickers loaded
+        """
+        loaded_at = datetime.now().isoformat()
+        rows = [(ticker, cik, name, normalize_name(name), exchange, loaded_at)
+                for cik, ticker, name, exchange in read_company_tickers(path)]
+
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.execute("DELETE FROM sec_company_tickers")
+            conn.executemany('''
+                INSERT OR REPLACE INTO sec_company_tickers
+                (ticker, cik, name, normalized_name, exchange, loaded_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+
+        with self._lock:
+            self._by_ticker = None
+        logger.info(f"Loaded {len(rows)} SEC tickers from {path}")
+        return len(rows)
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._by_ticker is not None:
+                return
+            with sqlite3.connect(self.db_path, timeout=30) as conn:
+                rows = conn.execute(
+                    "SELECT ticker, cik, name, normalized_name, exchange FROM sec_company_tickers"
+                ).fetchall()
+
+            by_ticker, by_cik, by_name = {}, {}, {}
+            for ticker, cik, name, normalized_name, exchange in rows:
+                by_ticker[ticker] = {'ticker': ticker, 'cik': cik, 'name': name, 'exchange': exchange}
+                by_cik.setdefault(cik, []).append(ticker)
+                by_name.setdefault(normalized_name, cik)
+            if not by_ticker:
+                logger.warning("SEC ticker index is empty; load it with python utils/sec_tickers.py <path>")
+            self._by_ticker, self._by_cik, self._by_name = by_ticker, by_cik, by_name
+
+    def lookup_ticker(self, ticker: str) -> Optional[Dict]:
+        """CIK, company name and exchange of a ticker (Yahoo share-class tickers like BRK-B match as-is)"""
+        self._ensure_loaded()
+        return self._by_ticker.get(ticker.upper())
+
+    def cik_for_ticker(self, ticker: str) -> Optional[str]:
+        """10-digit CIK of a ticker"""
+        record = self.lookup_ticker(ticker)
+        return record['cik'] if record else None
+
+    def tickers_for_cik(self, cik) -> List[str]:
+        """Every ticker listed under a CIK"""
+        self._ensure_loaded()
+        return list(self._by_cik.get(normalize_cik(cik), []))
+
+    def cik_for_name(self, name: str) -> Optional[str]:
+        """CIK of a company by name, ignoring case, punctuation and legal-form suffixes"""
+        self._ensure_loaded()
+        return self._by_name.get(normalize_name(name))
+
+    def match_ipo_data(self) -> List[Dict]:
+        """ipo_data rows whose ticker is in the index, with their CIK"""
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute('''
+                SELECT i.ticker, i.company_name, s.cik, s.name
+                FROM ipo_data i JOIN sec_company_tickers s ON s.ticker = i.ticker
+            ''').fetchall()
+        return [{'ticker': ticker, 'company_name': company_name, 'cik': cik, 'sec_name': sec_name}
+                for ticker, company_name, cik, sec_name in rows]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    parser = argparse.ArgumentParser(description="Load the SEC company tickers file into the ticker index")
+    parser.add_argument('path', nargs='?', default=DEFAULT_TICKERS_PATH,
+                        help="Local company_tickers.json or company_tickers_exchange.json")
+    parser.add_argument('--db-path', default="data/ipo_analytics.db")
+    args = parser.parse_args()
+    SECTickerIndex(args.db_path).load(args.path)
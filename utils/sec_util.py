@@ -5,11 +5,16 @@ Provides functions to access SEC EDGAR data for IPO analysis
 
 import requests
 import json
-import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import logging
 
+from transport import get_transport
+from http_client import get_http_session
+from sec_tickers import SECTickerIndex
+from sec_filings import SECFilingsIndex
+from edgar_cache import EdgarResponseCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,15 +23,16 @@ class SECUtil:
     """Utility class for accessing SEC EDGAR data"""
     
     BASE_URL = "https://data.sec.gov"
+    # Sent with each request, since the pooled session is shared with other providers
     HEADERS = {
         'User-Agent': 'IPO Map Application (contact@predictive-labs.com)',
-        'Accept-Encoding': 'gzip, deflate',
-        'Host': 'data.sec.gov'
     }
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(self.HEADERS)
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.session = get_http_session()
+        self.edgar_cache = EdgarResponseCache(self.session)
+        self.ticker_index = SECTickerIndex(db_path)
+        self.filings_index = SECFilingsIndex(db_path)
         
     def get_company_submissions(self, cik: str) -> Dict[str, Any]:
         """
@@ -42,10 +48,12 @@ class SECUtil:
         cik = str(cik).zfill(10)
         url = f"{self.BASE_URL}/submissions/CIK{cik}.json"
         
+        def fetch():
+            # Served from disk or revalidated with a conditional request, paced to the SEC rate limit
+            return self.edgar_cache.get_json(url, headers=self.HEADERS, timeout=10)
+        
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            return response.json()
+            return get_transport().call('sec', 'submissions', {'cik': cik}, fetch)
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching submissions for CIK {cik}: {e}")
             return {}
@@ -60,14 +68,13 @@ class SECUtil:
         Returns:
             List of S-1 filings with company information
         """
-        s1_filings = []
+        # Filings indexed from the bulk submissions.zip cover every filer (see sec_filings.py)
+        if self.filings_index.has_filings():
+            return self.filings_index.recent_filings(days_back, forms=["S-1", "S-1/A"])
         
-        # Get recent filings from the bulk data
-        # Note: This is a simplified approach - in production, you'd want to
-        # use the bulk submissions.zip file for better performance
+        s1_filings = []
         
-        # For now, we'll use a list of known recent IPO companies
-        # In a full implementation, you would parse the bulk submissions data
+        # Without a loaded archive, fall back to requesting a list of known recent IPO companies
         recent_ipo_companies = [
             {"cik": "0001326801", "name": "Reddit, Inc.", "ticker": "RDDT"},
             {"cik": "0001018724", "name": "Amazon.com, Inc.", "ticker": "AMZN"},
@@ -98,9 +105,6 @@ class SECUtil:
                                 "accession_number": accession
                             })
                 
-                # Rate limiting - SEC requires reasonable request rates
-                time.sleep(0.1)
-                
             except Exception as e:
                 logger.error(f"Error processing company {company['name']}: {e}")
                 continue
@@ -150,7 +154,8 @@ class SECUtil:
     def get_company_info_by_ticker(self, ticker: str) -> Optional[Dict[str, Any]]:
         """
         Get company information by ticker symbol
-        Note: This requires mapping ticker to CIK first
+        Note: The ticker is mapped to its CIK through the SEC ticker index,
+        loaded from the SEC company tickers file (see sec_tickers.py)
         
         Args:
             ticker (str): Stock ticker symbol
@@ -158,15 +163,7 @@ class SECUtil:
         Returns:
             Company information if found
         """
-        # In a full implementation, you'd maintain a ticker-to-CIK mapping
-        # or use the company tickers JSON file from SEC
-        ticker_to_cik = {
-            "RDDT": "0001326801",
-            "AMZN": "0000320193",
-            "AAPL": "0000320193"
-        }
-        
-        cik = ticker_to_cik.get(ticker.upper())
+        cik = self.ticker_index.cik_for_ticker(ticker)
         if cik:
             return self.get_company_submissions(cik)
         
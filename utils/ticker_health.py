@@ -0,0 +1,183 @@
+"""
+Ticker Health Tracking for IPO Analytics
+Persistent negative cache for tickers that fail to resolve, plus a per-exchange
+circuit breaker that stops calling a venue after consecutive failures; both
+are kept in the database so they carry over between refreshes
+"""
+
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Negative cache re-probe interval: BASE * 2^(failures - 1), capped at MAX
+NEGATIVE_CACHE_BASE_INTERVAL = timedelta(hours=6)
+NEGATIVE_CACHE_MAX_INTERVAL = timedelta(days=30)
+
+# Circuit breaker: open after this many consecutive failures on one suffix,
+# then allow a single probe once the cooldown has passed
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = timedelta(minutes=15)
+
+
+def ticker_suffix(ticker: str) -> str:
+    """Yahoo Finance exchange suffix of a ticker ('' for US listings)"""
+    return '.' + ticker.rsplit('.', 1)[1] if '.' in ticker else ''
+
+
+class TickerHealth:
+    """Negative cache and circuit breaker shared by the fetchers"""
+
+    def __init__(self, db_path: str = "data/ipo_analytics.db"):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._circuits: Dict[str, Dict] = {}
+        self.skipped: Dict[str, str] = {}
+        self.init_tables()
+        self._load_circuits()
+
+    def init_tables(self):
+        """Create the negative cache table if needed"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ticker_failures (
+                    ticker TEXT PRIMARY KEY,
+                    failure_count INTEGER NOT NULL,
+                    last_error TEXT,
+                    last_failure_at TEXT,
+                    next_probe_at TEXT
+                )
+            ''')
+            # Consecutive failures per exchange suffix; a circuit only closes on a success
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS exchange_circuits (
+                    suffix TEXT PRIMARY KEY,
+                    failures INTEGER NOT NULL,
+                    opened_at TEXT
+                )
+            ''')
+            conn.commit()
+
+    def reset_run(self):
+        """Forget the skipped set at the start of a refresh and pick up circuit state saved by other runs"""
+        with self._lock:
+            self.skipped = {}
+        self._load_circuits()
+
+    # Negative cache
+
+    def suppressed_tickers(self) -> Dict[str, str]:
+        """Tickers whose next probe is still in the future, with their next probe time"""
+        now = datetime.now().isoformat()
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute(
+                "SELECT ticker, next_probe_at FROM ticker_failures WHERE next_probe_at > ?", (now,)
+            ).fetchall()
+        return dict(rows)
+
+    def record_failure(self, ticker: str, error: str = None):
+        """Record a failed lookup and push the next probe out exponentially"""
+        now = datetime.now()
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            row = conn.execute(
+                "SELECT failure_count FROM ticker_failures WHERE ticker = ?", (ticker,)
+            ).fetchone()
+            failure_count = (row[0] if row else 0) + 1
+            interval = min(NEGATIVE_CACHE_BASE_INTERVAL * (2 ** (failure_count - 1)),
+                           NEGATIVE_CACHE_MAX_INTERVAL)
+            conn.execute('''
+                INSERT OR REPLACE INTO ticker_failures
+                (ticker, failure_count, last_error, last_failure_at, next_probe_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (ticker, failure_count, error, now.isoformat(), (now + interval).isoformat()))
+            conn.commit()
+        self._record_circuit(ticker_suffix(ticker), success=False)
+
+    def record_transient_failure(self, ticker: str, error: str = None):
+        """Record a timeout, throttle or connection error: it counts against the exchange circuit only"""
+        logger.debug(f"Transient failure for {ticker}: {error}")
+        self._record_circuit(ticker_suffix(ticker), success=False)
+
+    def record_success(self, ticker: str):
+        """Clear any negative cache entry for a ticker that resolved"""
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.execute("DELETE FROM ticker_failures WHERE ticker = ?", (ticker,))
+            conn.commit()
+        self._record_circuit(ticker_suffix(ticker), success=True)
+
+    # Circuit breaker
+
+    def allow_request(self, ticker: str) -> bool:
+        """False if the ticker's exchange circuit is open; skipped tickers are remembered"""
+        suffix = ticker_suffix(ticker)
+        with self._lock:
+            circuit = self._circuits.get(suffix)
+            if not circuit or circuit['opened_at'] is None:
+                return True
+            if datetime.now() - circuit['opened_at'] >= CIRCUIT_COOLDOWN and not circuit['probing']:
+                # Half-open: let one request through to test the exchange
+                circuit['probing'] = True
+                return True
+            self.skipped[ticker] = f"circuit open for {suffix or 'US'}"
+            return False
+
+    def skip(self, ticker: str, reason: str):
+        """Remember a ticker left out of this refresh"""
+        with self._lock:
+            self.skipped[ticker] = reason
+
+    def _load_circuits(self):
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute("SELECT suffix, failures, opened_at FROM exchange_circuits").fetchall()
+        with self._lock:
+            self._circuits = {
+                suffix: {'failures': failures, 'opened_at': datetime.fromisoformat(opened_at) if opened_at else None,
+                         'probing': False}
+                for suffix, failures, opened_at in rows
+            }
+
+    def _record_circuit(self, suffix: str, success: bool):
+        with self._lock:
+            circuit = self._circuits.setdefault(
+                suffix, {'failures': 0, 'opened_at': None, 'probing': False}
+            )
+            if success:
+                if circuit['failures'] == 0 and circuit['opened_at'] is None:
+                    return
+                circuit.update(failures=0, opened_at=None, probing=False)
+            else:
+                circuit['failures'] += 1
+                if circuit['probing'] or circuit['failures'] >= CIRCUIT_FAILURE_THRESHOLD:
+                    if circuit['opened_at'] is None or circuit['probing']:
+                        logger.warning(f"Circuit opened for exchange suffix {suffix or 'US'} "
+                                       f"after {circuit['failures']} consecutive failures")
+                    circuit.update(opened_at=datetime.now(), probing=False)
+            failures, opened_at = circuit['failures'], circuit['opened_at']
+
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            if failures == 0:
+                conn.execute("DELETE FROM exchange_circuits WHERE suffix = ?", (suffix,))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO exchange_circuits (suffix, failures, opened_at) VALUES (?, ?, ?)",
+                    (suffix, failures, opened_at.isoformat() if opened_at else None)
+                )
+            conn.commit()
+
+    def open_circuits(self) -> List[str]:
+        """Suffixes whose circuit is currently open"""
+        with self._lock:
+            return [s for s, c in self._circuits.items() if c['opened_at'] is not None]
+
+    def skipped_summary(self) -> Optional[str]:
+        """Compact description of the skipped set for refresh_log"""
+        with self._lock:
+            if not self.skipped:
+                return None
+            return ', '.join(f"{ticker} ({reason})" for ticker, reason in sorted(self.skipped.items()))
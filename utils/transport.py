@@ -0,0 +1,207 @@
+"""
+Provider Transport for IPO Analytics
+Record and replay raw responses from yfinance, SEC EDGAR, Tavily and Exa so
+refresh and research pipelines can run, be profiled and be regression-tested
+without network access
+
+Modes (set with configure_transport or the IPO_TRANSPORT_* environment variables):
+    live    - call the provider directly (default)
+    record  - call the provider and save each response to the fixture directory
+    replay  - serve saved responses, with optional injected latency and errors
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+import requests
+
+from fetch_engine import get_fetch_engine
+
+logger = logging.getLogger(__name__)
+
+LIVE = 'live'
+RECORD = 'record'
+REPLAY = 'replay'
+
+DEFAULT_FIXTURE_DIR = "data/fixtures"
+
+
+class ReplayError(requests.exceptions.ConnectionError):
+    """Raised in replay mode for injected failures and missing fixtures"""
+
+
+class ProviderTransport:
+    """Routes provider calls through live, record or replay handling"""
+
+    def __init__(self, mode: str = LIVE, fixture_dir: str = DEFAULT_FIXTURE_DIR,
+                 latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        if mode not in (LIVE, RECORD, REPLAY):
+            raise ValueError(f"Unknown transport mode: {mode}")
+        self.mode = mode
+        self.fixture_dir = Path(fixture_dir)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self._call_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def call(self, provider: str, operation: str, params: Dict, func: Callable[[], Any]) -> Any:
+        """
+        Perform one provider call
+
+        Args:
+            provider: Provider name, e.g. 'yfinance', 'sec', 'tavily', 'exa'
+            operation: Call name within the provider, e.g. 'info' or 'history'
+            params: Parameters that identify the request (secrets excluded)
+            func: Zero-argument callable making the live request
+        """
+        if self.mode == REPLAY:
+            # Replayed responses say nothing about the provider's health
+            return self._call(provider, operation, params, func)
+
+        # Failures and latency of requests that reached the provider drive the fetch engine's adaptive concurrency
+        self._local.cache_hit = False
+        start = time.monotonic()
+        try:
+            result = self._call(provider, operation, params, func)
+        except Exception as e:
+            get_fetch_engine().record_call(provider, time.monotonic() - start, e)
+            raise
+        if not self._local.cache_hit:
+            get_fetch_engine().record_call(provider, time.monotonic() - start)
+        return result
+
+    def mark_cache_hit(self):
+        """Called from inside func when it answered from a local cache, so the call is not timed"""
+        self._local.cache_hit = True
+
+    def _call(self, provider: str, operation: str, params: Dict, func: Callable[[], Any]) -> Any:
+        if self.mode == LIVE:
+            return func()
+
+        key = self._fixture_key(provider, operation, params)
+        path = self.fixture_dir / provider / f"{operation}-{key}.json"
+
+        if self.mode == RECORD:
+            result = func()
+            self._save(path, provider, operation, params, result)
+            return result
+
+        return self._replay(path, key)
+
+    def _fixture_key(self, provider: str, operation: str, params: Dict) -> str:
+        canonical = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha1(f"{provider}:{operation}:{canonical}".encode()).hexdigest()[:16]
+
+    def _save(self, path: Path, provider: str, operation: str, params: Dict, result: Any):
+        kind, payload = _encode(result)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({
+                'provider': provider,
+                'operation': operation,
+                'params': json.loads(json.dumps(params, default=str)),
+                'recorded_at': datetime.now().isoformat(),
+                'kind': kind,
+                'payload': payload,
+            }, f, default=str)
+
+    def _replay(self, path: Path, key: str) -> Any:
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        if self.error_rate > 0 and self._should_fail(key):
+            raise ReplayError(f"Injected failure for fixture {path.name}")
+
+        if not path.exists():
+            raise ReplayError(f"No recorded fixture at {path}")
+
+        with open(path) as f:
+            fixture = json.load(f)
+        return _decode(fixture['kind'], fixture['payload'])
+
+    def _should_fail(self, key: str) -> bool:
+        """Deterministic per-call failure draw, independent of thread scheduling"""
+        with self._lock:
+            count = self._call_counts.get(key, 0)
+            self._call_counts[key] = count + 1
+        digest = hashlib.sha1(f"{self.seed}:{key}:{count}".encode()).hexdigest()
+        return int(digest[:8], 16) / 0xFFFFFFFF < self.error_rate
+
+
+def _encode(result: Any):
+    """Turn a provider response into a JSON-serialisable (kind, payload) pair"""
+    if isinstance(result, pd.DataFrame):
+        frame = result.copy()
+        if isinstance(frame.index, pd.DatetimeIndex) and frame.index.tz is not None:
+            # Keep exchange-local wall-clock dates; converting to UTC would shift Asian sessions
+            frame.index = frame.index.tz_localize(None)
+        if isinstance(frame.columns, pd.MultiIndex):
+            frame.columns = ['\x1f'.join(map(str, col)) for col in frame.columns]
+            return 'dataframe_multi', frame.to_json(orient='split', date_format='iso')
+        return 'dataframe', frame.to_json(orient='split', date_format='iso')
+    if hasattr(result, 'results') and not isinstance(result, dict):
+        # Exa SDK response objects
+        return 'exa_response', {'results': [
+            {
+                'title': getattr(item, 'title', None),
+                'url': getattr(item, 'url', None),
+                'text': getattr(item, 'text', None),
+                'published_date': getattr(item, 'published_date', None),
+                'score': getattr(item, 'score', None),
+            }
+            for item in result.results
+        ]}
+    return 'json', result
+
+
+def _decode(kind: str, payload: Any) -> Any:
+    if kind in ('dataframe', 'dataframe_multi'):
+        frame = pd.read_json(StringIO(payload), orient='split')
+        if not frame.empty:
+            frame.index = pd.to_datetime(frame.index)
+        if kind == 'dataframe_multi':
+            frame.columns = pd.MultiIndex.from_tuples([tuple(col.split('\x1f')) for col in frame.columns])
+        return frame
+    if kind == 'exa_response':
+        return SimpleNamespace(results=[SimpleNamespace(**item) for item in payload['results']])
+    return payload
+
+
+_transport: Optional[ProviderTransport] = None
+_transport_lock = threading.Lock()
+
+
+def configure_transport(mode: str = LIVE, **kwargs) -> ProviderTransport:
+    """Install the process-wide transport"""
+    global _transport
+    with _transport_lock:
+        _transport = ProviderTransport(mode, **kwargs)
+        logger.info(f"Provider transport set to {mode} mode")
+        return _transport
+
+
+def get_transport() -> ProviderTransport:
+    """Process-wide transport, configured from the environment on first use"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = ProviderTransport(
+                mode=os.getenv('IPO_TRANSPORT_MODE', LIVE),
+                fixture_dir=os.getenv('IPO_FIXTURE_DIR', DEFAULT_FIXTURE_DIR),
+                latency=float(os.getenv('IPO_REPLAY_LATENCY', '0')),
+                error_rate=float(os.getenv('IPO_REPLAY_ERROR_RATE', '0')),
+                seed=int(os.getenv('IPO_REPLAY_SEED', '0')),
+            )
+        return _transport
@@ -1,12 +1,17 @@
 import yfinance as yf
 import pandas as pd
-import sqlite3
 from datetime import datetime, timedelta
-import requests
-import time
 from typing import List, Dict, Optional
 import logging
 
+from price_cache import PriceHistoryCache
+from fetch_engine import get_fetch_engine
+from metadata_cache import TickerMetadataCache
+from transport import get_transport
+from http_client import get_yfinance_session
+from ipo_anchor import IPOAnchorDetector, LATEST_WINDOW
+from panel_metrics import load_price_panel, compute_panel_metrics
+
 # Exchange to country mapping
 EXCHANGE_COUNTRY_MAP = {
     # United States
@@ -70,6 +75,68 @@ def get_country_from_exchange(exchange: str) -> str:
     """Get country name from exchange code"""
     return EXCHANGE_COUNTRY_MAP.get(exchange, 'Unknown')
 
+# Yahoo Finance ticker suffix to exchange code
+SUFFIX_EXCHANGE_MAP = {
+    '.L': 'LSE',
+    '.DE': 'XETRA',
+    '.PA': 'EPA',
+    '.AS': 'AMS',
+    '.MI': 'BIT',
+    '.MC': 'BME',
+    '.SW': 'SIX',
+    '.ST': 'STO',
+    '.HE': 'HEL',
+    '.CO': 'CPH',
+    '.OL': 'OSL'
+}
+
+def map_exchange(ticker: str, exchange: str) -> str:
+    """Map Yahoo Finance exchange codes and ticker suffixes to our standard names"""
+    if exchange in ['NMS', 'NGM', 'NCM']:
+        return 'NASDAQ'
+    if exchange in ['NYQ', 'NYSE']:
+        return 'NYSE'
+    for suffix, code in SUFFIX_EXCHANGE_MAP.items():
+        if ticker.endswith(suffix):
+            return code
+    return exchange
+
+# Ticker.info fields needed for an ipo_data record; marketCap is derived when not fresh
+METADATA_FIELDS = ['longName', 'sector', 'industry', 'exchange', 'sharesOutstanding']
+
+# List of known IPO tickers (this would need to be expanded with real data source)
+# In a production environment, you'd use a dedicated IPO data provider
+RECENT_IPO_TICKERS = [
+    # US Technology IPOs 2024
+    "RDDT", "SMCI", "ARM", "SOLV", "KKVR", "KROS", "TMDX", "CGON",
+    # US Healthcare/Biotech IPOs 2024
+    "KRYS", "VERA", "IMVT", "PRCT", "CGEM", "LYEL", "NRIX", "BCYC",
+    # US Financial IPOs 2024
+    "TPG", "FCNCA", "RYAN", "KKR", "TPVG",
+    # US Consumer/Retail IPOs 2024
+    "SHAK", "FIGS", "RVLV", "BMBL", "DASH", "ABNB",
+    # US Industrial IPOs 2024
+    "RIVN", "LCID", "BIRD", "GRAB", "DIDI", "CPNG",
+
+    # European IPOs 2024 (using European ticker formats)
+    # UK - London Stock Exchange
+    "FRAS.L", "WEIR.L", "OCDO.L", "MNDI.L", "AUTO.L",
+    # Germany - XETRA
+    "SAP.DE", "SIE.DE", "ALV.DE", "DTE.DE", "BAS.DE",
+    # France - Euronext Paris
+    "MC.PA", "OR.PA", "SAN.PA", "BNP.PA", "AI.PA",
+    # Netherlands - Euronext Amsterdam
+    "ASML.AS", "RDSA.AS", "INGA.AS", "HEIA.AS", "UNA.AS",
+    # Italy - Borsa Italiana
+    "UCG.MI", "ISP.MI", "ENI.MI", "ENEL.MI", "TIT.MI",
+    # Spain - BME
+    "SAN.MC", "TEF.MC", "IBE.MC", "BBVA.MC", "ITX.MC",
+    # Switzerland - SIX
+    "NESN.SW", "ROG.SW", "NOVN.SW", "UHR.SW", "ABBN.SW",
+    # Nordic Countries
+    "VOLV-B.ST", "ERIC-B.ST", "NOKIA.HE", "DSV.CO", "EQNR.OL"
+]
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -80,6 +147,10 @@ class IPODataFetcher:
     def __init__(self, db_path: str = "data/ipo_analytics.db"):
         self.db_path = db_path
         self.current_year = datetime.now().year
+        self.price_cache = PriceHistoryCache(db_path)
+        self.metadata_cache = TickerMetadataCache(db_path)
+        self.anchor_detector = IPOAnchorDetector(db_path)
+        self.fetch_engine = get_fetch_engine()
         
     def get_nasdaq_nyse_ipos(self, year: int = None) -> List[Dict]:
         """
@@ -89,131 +160,149 @@ class IPODataFetcher:
         """
         if year is None:
             year = self.current_year
-            
-        # List of known IPO tickers from 2024 (this would need to be expanded with real data source)
-        # In a production environment, you'd use a dedicated IPO data provider
-        recent_ipos = [
-            # US Technology IPOs 2024
-            "RDDT", "SMCI", "ARM", "SOLV", "KKVR", "KROS", "TMDX", "CGON",
-            # US Healthcare/Biotech IPOs 2024  
-            "KRYS", "VERA", "IMVT", "PRCT", "CGEM", "LYEL", "NRIX", "BCYC",
-            # US Financial IPOs 2024
-            "TPG", "FCNCA", "RYAN", "SOLV", "KKR", "TPVG",
-            # US Consumer/Retail IPOs 2024
-            "SHAK", "FIGS", "RVLV", "BMBL", "DASH", "ABNB",
-            # US Industrial IPOs 2024
-            "RIVN", "LCID", "BIRD", "GRAB", "DIDI", "CPNG",
-            
-            # European IPOs 2024 (using European ticker formats)
-            # UK - London Stock Exchange
-            "FRAS.L", "WEIR.L", "OCDO.L", "MNDI.L", "AUTO.L",
-            # Germany - XETRA
-            "SAP.DE", "SIE.DE", "ALV.DE", "DTE.DE", "BAS.DE",
-            # France - Euronext Paris
-            "MC.PA", "OR.PA", "SAN.PA", "BNP.PA", "AI.PA",
-            # Netherlands - Euronext Amsterdam
-            "ASML.AS", "RDSA.AS", "INGA.AS", "HEIA.AS", "UNA.AS",
-            # Italy - Borsa Italiana
-            "UCG.MI", "ISP.MI", "ENI.MI", "ENEL.MI", "TIT.MI",
-            # Spain - BME
-            "SAN.MC", "TEF.MC", "IBE.MC", "BBVA.MC", "ITX.MC",
-            # Switzerland - SIX
-            "NESN.SW", "ROG.SW", "NOVN.SW", "UHR.SW", "ABBN.SW",
-            # Nordic Countries
-            "VOLV-B.ST", "ERIC-B.ST", "NOKIA.HE", "DSV.CO", "EQNR.OL"
+
+        return self.get_recent_ipos_by_year([year]).get(year, [])
+
+    def get_recent_ipos_by_year(self, years: List[int]) -> Dict[int, List[Dict]]:
+        """
+        Fetch the recent IPO universe once and split the records by IPO year
+
+        Latest bars for every ticker are pulled in a single multi-ticker
+        download, so callers that need several years should use this instead
+        of calling get_nasdaq_nyse_ipos once per year. IPO dates come from the
+        permanently cached anchors rather than the first bar of the download.
+        """
+        ipo_data_by_year = {year: [] for year in years}
+        self.metadata_cache.reset_stats()
+        self.anchor_detector.reset_stats()
+        histories = self._download_histories(RECENT_IPO_TICKERS, period=LATEST_WINDOW, actions=True)
+
+        # Cached anchors first; only tickers never seen before need detection
+        anchors = {}
+        for ticker in histories:
+            cached = self.anchor_detector.lookup(ticker)
+            if cached is not None:
+                anchors[ticker] = cached
+        anchors.update(self.fetch_engine.map(self.anchor_detector.get_anchor,
+                                             [t for t in histories if t not in anchors]))
+        for ticker, anchor in list(anchors.items()):
+            if anchor:
+                anchors[ticker] = self.anchor_detector.validate(ticker, anchor, histories[ticker])
+        self.anchor_detector.report()
+
+        # Only tickers whose IPO date falls in a requested year
+        candidates = [
+            ticker for ticker, anchor in anchors.items()
+            if anchor and int(anchor['ipo_date'][:4]) in ipo_data_by_year
         ]
-        
-        ipo_data = []
-        
-        for ticker in recent_ipos:
+
+        # Known tickers are served from the metadata cache; only misses call .info
+        infos = {}
+        for ticker in candidates:
+            cached = self.metadata_cache.lookup(ticker, METADATA_FIELDS)
+            if cached is not None:
+                infos[ticker] = cached
+
+        def fetch_info(ticker):
+            info = get_transport().call('yfinance', 'info', {'ticker': ticker},
+                                        lambda: yf.Ticker(ticker, session=get_yfinance_session()).info)
+            if info:
+                self.metadata_cache.store(ticker, info)
+            return info
+
+        infos.update(self.fetch_engine.map(fetch_info, [t for t in candidates if t not in infos]))
+        self.metadata_cache.report()
+
+        for ticker in candidates:
             try:
-                stock = yf.Ticker(ticker)
-                info = stock.info
-                hist = stock.history(period="1y")
-                
-                if len(hist) == 0:
+                info = infos.get(ticker)
+                if info is None:
+                    logger.error(f"Error fetching data for {ticker}: no info returned")
                     continue
-                    
-                # Get IPO date approximation (first trading date in our data)
-                ipo_date = hist.index[0].date()
-                
-                # Only include if IPO was in the specified year
-                if ipo_date.year != year:
-                    continue
-                
-                # Calculate performance since IPO
-                first_price = hist['Close'].iloc[0]
-                current_price = hist['Close'].iloc[-1]
-                price_change_since_ipo = (current_price - first_price) / first_price
-                
-                # Get market cap
-                market_cap = info.get('marketCap', 0)
-                if market_cap == 0:
-                    shares_outstanding = info.get('sharesOutstanding', 0)
-                    if shares_outstanding > 0:
-                        market_cap = shares_outstanding * current_price
-                
-                # Determine exchange based on ticker suffix and exchange info
-                exchange = info.get('exchange', 'UNKNOWN')
-                
-                # Map Yahoo Finance exchange codes to our standard names
-                if exchange in ['NMS', 'NGM', 'NCM']:
-                    exchange = 'NASDAQ'
-                elif exchange in ['NYQ', 'NYSE']:
-                    exchange = 'NYSE'
-                elif ticker.endswith('.L'):
-                    exchange = 'LSE'
-                elif ticker.endswith('.DE'):
-                    exchange = 'XETRA'
-                elif ticker.endswith('.PA'):
-                    exchange = 'EPA'
-                elif ticker.endswith('.AS'):
-                    exchange = 'AMS'
-                elif ticker.endswith('.MI'):
-                    exchange = 'BIT'
-                elif ticker.endswith('.MC'):
-                    exchange = 'BME'
-                elif ticker.endswith('.SW'):
-                    exchange = 'SIX'
-                elif ticker.endswith('.ST'):
-                    exchange = 'STO'
-                elif ticker.endswith('.HE'):
-                    exchange = 'HEL'
-                elif ticker.endswith('.CO'):
-                    exchange = 'CPH'
-                elif ticker.endswith('.OL'):
-                    exchange = 'OSL'
-                
-                ipo_data.append({
-                    'ticker': ticker,
-                    'company_name': info.get('longName', ticker),
-                    'sector': info.get('sector', 'Unknown'),
-                    'industry': info.get('industry', 'Unknown'),
-                    'exchange': exchange,
-                    'ipo_date': ipo_date.isoformat(),
-                    'ipo_price': first_price,
-                    'current_price': current_price,
-                    'market_cap': market_cap,
-                    'price_change_since_ipo': price_change_since_ipo,
-                    'volume': hist['Volume'].iloc[-1],
-                    'last_updated': datetime.now().isoformat()
-                })
-                
+
+                anchor = anchors[ticker]
+                record = self._build_ipo_record(ticker, info, anchor, histories[ticker])
+                ipo_data_by_year[int(anchor['ipo_date'][:4])].append(record)
+
                 logger.info(f"Fetched data for {ticker}")
-                time.sleep(0.1)  # Rate limiting
-                
+
             except Exception as e:
                 logger.error(f"Error fetching data for {ticker}: {str(e)}")
                 continue
-                
-        return ipo_data
+
+        return ipo_data_by_year
+
+    def _download_histories(self, tickers: List[str], period: str = "1y",
+                            actions: bool = False) -> Dict[str, pd.DataFrame]:
+        """Download price history for many tickers in one request, keyed by ticker"""
+        if not tickers:
+            return {}
+
+        params = {'tickers': tickers, 'period': period}
+        if actions:
+            params['actions'] = True
+        try:
+            data = get_transport().call(
+                'yfinance', 'download', params,
+                lambda: yf.download(tickers, period=period, actions=actions, group_by='ticker',
+                                    threads=True, progress=False, session=get_yfinance_session())
+            )
+        except Exception as e:
+            logger.error(f"Error downloading batched history: {str(e)}")
+            return {}
+
+        if data is None or data.empty:
+            return {}
+
+        histories = {}
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                hist = data[ticker]
+            else:
+                hist = data
+            hist = hist.dropna(subset=['Close'])
+            if not hist.empty:
+                histories[ticker] = hist
+
+        return histories
+
+    def _build_ipo_record(self, ticker: str, info: Dict, anchor: Dict, hist: pd.DataFrame) -> Dict:
+        """Build an ipo_data record from Yahoo Finance info, the IPO anchor and recent bars"""
+        # Calculate performance since IPO
+        first_price = anchor['ipo_price']
+        current_price = hist['Close'].iloc[-1]
+        price_change_since_ipo = (current_price - first_price) / first_price
+
+        # Get market cap, falling back to cached shares outstanding at the current price
+        market_cap = info.get('marketCap') or 0
+        if market_cap == 0:
+            shares_outstanding = info.get('sharesOutstanding') or 0
+            if shares_outstanding > 0:
+                market_cap = shares_outstanding * current_price
+
+        return {
+            'ticker': ticker,
+            'company_name': info.get('longName') or ticker,
+            'sector': info.get('sector') or 'Unknown',
+            'industry': info.get('industry') or 'Unknown',
+            'exchange': map_exchange(ticker, info.get('exchange') or 'UNKNOWN'),
+            'ipo_date': anchor['ipo_date'],
+            'ipo_price': first_price,
+            'current_price': current_price,
+            'market_cap': market_cap,
+            'price_change_since_ipo': price_change_since_ipo,
+            'volume': hist['Volume'].iloc[-1],
+            'last_updated': datetime.now().isoformat()
+        }
     
     def get_stock_info(self, ticker: str) -> Optional[Dict]:
         """Get detailed stock information for a single ticker"""
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            hist = stock.history(period="1y")
+            info = get_transport().call('yfinance', 'info', {'ticker': ticker},
+                                        lambda: yf.Ticker(ticker, session=get_yfinance_session()).info)
+            hist = self.price_cache.get_history(ticker, start=datetime.now() - timedelta(days=365))
             
             if len(hist) == 0:
                 return None
@@ -244,11 +333,10 @@ class IPODataFetcher:
     def calculate_performance_metrics(self, ticker: str, ipo_date: str) -> Dict:
         """Calculate various performance metrics since IPO"""
         try:
-            stock = yf.Ticker(ticker)
             ipo_datetime = datetime.fromisoformat(ipo_date)
             
             # Get historical data from IPO date
-            hist = stock.history(start=ipo_datetime, end=datetime.now())
+            hist = self.price_cache.get_history(ticker, start=ipo_datetime)
             
             if len(hist) == 0:
                 return {}
@@ -282,7 +370,35 @@ class IPODataFetcher:
         except Exception as e:
             logger.error(f"Error calculating metrics for {ticker}: {str(e)}")
             return {}
-    
+
+    def calculate_performance_metrics_batch(self, ipo_dates: Dict[str, str],
+                                            refresh_prices: bool = True) -> Dict[str, Dict]:
+        """
+        Calculate performance metrics for many tickers at once
+
+        Price histories are brought up to date through the price cache, then
+        all metrics are computed together on a ticker x date panel.
+
+        Args:
+            ipo_dates: IPO date (YYYY-MM-DD) per Yahoo Finance ticker
+            refresh_prices: Whether to update cached histories before computing
+
+        Returns:
+            Metrics dictionary per ticker, in the format of calculate_performance_metrics
+        """
+        ipo_dates = {ticker: date[:10] for ticker, date in ipo_dates.items() if date}
+        if refresh_prices:
+            self.fetch_engine.map(self.price_cache.get_history, list(ipo_dates))
+            self.price_cache.report()
+
+        panels = load_price_panel(self.db_path, ipo_dates)
+        metrics = compute_panel_metrics(panels['close'], panels['high'], panels['low'],
+                                        panels['volume'], ipo_dates)
+        return {
+            ticker: {k: (None if pd.isna(v) else v) for k, v in row.items()}
+            for ticker, row in metrics.to_dict(orient='index').items()
+        }
+
     def get_sector_performance(self, ipo_data: List[Dict]) -> Dict:
         """Calculate sector-wise performance statistics"""
         df = pd.DataFrame(ipo_data)